@@ -0,0 +1,357 @@
+"""
+artifacts.py
+------------
+Columnar I/O for the tabular artifacts under data/processed/.
+
+Artifacts are addressed by their usual path (e.g. ".../cleaned_reviews.csv");
+the extension only names the artifact. Each one is stored as Parquet
+(ARTIFACT_FORMAT=parquet, the default) or CSV (ARTIFACT_FORMAT=csv):
+
+1. write_artifact / ArtifactWriter: typed schema (_schemas), row groups of
+   ROW_GROUP_SIZE rows, written to a temp file and moved into place.
+   ARTIFACT_CSV_EXPORT=1 also writes a CSV copy for older tools; a CSV copy
+   that already exists is always rewritten with it, and writing the CSV
+   format removes any Parquet file, so the two formats never disagree.
+2. append_artifact: adds rows to an existing artifact. CSVs are appended in
+   place; Parquet files are immutable, so the new rows go to a part file
+   under <name>.parquet.parts/ (O(new rows) per append). Once there are more
+   than MAX_PARTS parts they are compacted into the main file.
+3. read_artifact: column projection, so a reader that needs only
+   Cleaned_Review never parses the original/translated text. Reads the
+   ARTIFACT_FORMAT file if it exists and the other format otherwise, so CSVs
+   from older runs keep working (with a warning if the other file is newer).
+4. iter_artifact_batches / export_csv: bounded-memory scans.
+
+artifact_files lists every file holding an artifact's rows (main file plus
+parts); hash those, not just resolve_artifact's file, to detect changes.
+"""
+
+import os
+import time
+import shutil
+import warnings
+import pandas as pd
+
+ARTIFACT_FORMAT = os.environ.get("ARTIFACT_FORMAT", "parquet")
+CSV_EXPORT = os.environ.get("ARTIFACT_CSV_EXPORT", "0") == "1"
+ROW_GROUP_SIZE = 64_000
+MAX_PARTS = 16  # appended Parquet parts kept before they are compacted into the main file
+FORMATS = [".parquet", ".csv"]
+# Readers of cleaned_reviews only need the review text (older files call it cleaned_text)
+REVIEW_TEXT_COLUMNS = ["Cleaned_Review", "cleaned_text"]
+
+
+def _schemas():
+    import pyarrow as pa
+
+    text = pa.string()
+    return {
+        "cleaned_reviews": pa.schema([
+            ("Rating", pa.int64()), ("Title", text), ("Original_Review", text),
+            ("Language", text), ("Translated_Review", text), ("Cleaned_Review", text),
+        ]),
+        "sentiment_results": pa.schema([
+            ("review", text), ("vader_compound", pa.float64()), ("vader_pos", pa.float64()),
+            ("vader_neg", pa.float64()), ("vader_neu", pa.float64()),
+            ("textblob_polarity", pa.float64()), ("sentiment", pa.dictionary(pa.int8(), text)),
+        ]),
+    }
+
+
+def artifact_paths(path):
+    """{".parquet": ..., ".csv": ...} for an artifact path with either extension."""
+    stem, ext = os.path.splitext(path)
+    if ext not in FORMATS:
+        stem = path
+    return {fmt: stem + fmt for fmt in FORMATS}
+
+
+def parts_dir(path):
+    """Directory of the part files appended to the artifact's Parquet file."""
+    return artifact_paths(path)[".parquet"] + ".parts"
+
+
+def _part_files(path):
+    directory = parts_dir(path)
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if name.startswith("part-") and name.endswith(".parquet")]
+
+
+def _modified(path):
+    """Last write to the artifact file at `path`, counting its parts."""
+    files = [path] + (_part_files(path) if path.endswith(".parquet") else [])
+    return max(os.stat(f).st_mtime for f in files)
+
+
+def resolve_artifact(path):
+    """The file backing the artifact (ARTIFACT_FORMAT first, then the other format), or None.
+
+    Warns when the other format's file was written later, i.e. something other
+    than this module changed it and the two may no longer hold the same rows.
+    """
+    paths = artifact_paths(path)
+    preferred = "." + ARTIFACT_FORMAT.lstrip(".")
+    found = [paths[fmt] for fmt in sorted(FORMATS, key=lambda f: f != preferred) if os.path.exists(paths[fmt])]
+    if len(found) == 2 and _modified(found[1]) > _modified(found[0]):
+        warnings.warn(f"{found[1]} is newer than {found[0]}, which is read instead; rerun the "
+                      f"stage that writes it or delete the stale file", stacklevel=2)
+    return found[0] if found else None
+
+
+def artifact_files(path):
+    """Every file holding the artifact's rows: the resolved file plus any appended parts."""
+    resolved = resolve_artifact(path)
+    if resolved is None:
+        return []
+    return [resolved] + (_part_files(resolved) if resolved.endswith(".parquet") else [])
+
+
+def _remove_parquet(path):
+    parquet_path = artifact_paths(path)[".parquet"]
+    if os.path.exists(parquet_path):
+        os.remove(parquet_path)
+    shutil.rmtree(parts_dir(path), ignore_errors=True)
+
+
+def artifact_schema(path, columns):
+    """Typed schema for the columns present, from SCHEMAS when the artifact is known."""
+    import pyarrow as pa
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    known = _schemas().get(name)
+    if known is None:
+        return None
+    fields = [known.field(c) if c in known.names else pa.field(c, pa.string()) for c in columns]
+    return pa.schema(fields)
+
+
+def _to_table(df, schema):
+    import pyarrow as pa
+
+    if schema is None:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    df = df.copy()
+    for field in schema:
+        if pa.types.is_integer(field.type):
+            df[field.name] = pd.to_numeric(df[field.name], errors="coerce").astype("Int64")
+        elif pa.types.is_string(field.type):
+            df[field.name] = df[field.name].astype("string")
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+# === Writing ===
+
+class ArtifactWriter:
+    """Write an artifact chunk by chunk; each chunk becomes one or more row groups.
+
+    Output goes to a temp file that replaces the artifact on close(), so
+    readers never see a half-written file. The new file holds every row, so
+    appended parts are dropped, as is a Parquet file when writing CSV.
+    """
+
+    def __init__(self, path, fmt=None, row_group_size=ROW_GROUP_SIZE, csv_export=None):
+        self.fmt = "." + (fmt or ARTIFACT_FORMAT).lstrip(".")
+        if self.fmt not in FORMATS:
+            raise ValueError(f"Unknown artifact format: {self.fmt}")
+        self.path = artifact_paths(path)[self.fmt]
+        self.csv_path = artifact_paths(path)[".csv"]
+        if csv_export is None:
+            # An existing CSV copy is kept in step rather than left stale
+            csv_export = CSV_EXPORT or (self.fmt == ".parquet" and os.path.exists(self.csv_path))
+        self.csv_export = csv_export
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self._tmp = f"{self.path}.tmp{os.getpid()}"
+        self._csv_tmp = f"{self.csv_path}.tmp{os.getpid()}"
+        self._writer = None
+        self._schema = None
+        self._csv_started = False
+        self.closed = False
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+    def write(self, df):
+        if self.fmt == ".parquet":
+            import pyarrow.parquet as pq
+
+            if self._writer is None:
+                self._schema = artifact_schema(self.path, list(df.columns))
+                table = _to_table(df, self._schema)
+                self._schema = table.schema
+                self._writer = pq.ParquetWriter(self._tmp, self._schema, compression="zstd")
+            else:
+                table = _to_table(df, self._schema)
+            self._writer.write_table(table, row_group_size=self.row_group_size)
+        if self.fmt == ".csv" or self.csv_export:
+            target = self._tmp if self.fmt == ".csv" else self._csv_tmp
+            df.to_csv(target, mode="a" if self._csv_started else "w",
+                      header=not self._csv_started, index=False, encoding="utf-8")
+            self._csv_started = True
+        self.rows += len(df)
+
+    def close(self, columns=None):
+        """Publish the artifact; `columns` names the header of an empty CSV."""
+        if self.closed:
+            return self.path
+        self.closed = True
+        if self._writer is not None:
+            self._writer.close()
+        elif self.fmt == ".parquet":
+            self.write(pd.DataFrame(columns=columns or []))
+            self._writer.close()
+        if self.fmt == ".csv" and not self._csv_started:
+            pd.DataFrame(columns=columns or []).to_csv(self._tmp, index=False)
+        if self.csv_export and self.fmt != ".csv":
+            if not self._csv_started:
+                pd.DataFrame(columns=columns or []).to_csv(self._csv_tmp, index=False)
+            os.replace(self._csv_tmp, self.csv_path)
+        os.replace(self._tmp, self.path)
+        if self.fmt == ".csv":
+            _remove_parquet(self.path)
+        else:
+            shutil.rmtree(parts_dir(self.path), ignore_errors=True)
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif not self.closed:
+            self.closed = True
+            if self._writer is not None:
+                self._writer.close()
+            for tmp in (self._tmp, self._csv_tmp):
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+
+def write_artifact(df, path, fmt=None, row_group_size=ROW_GROUP_SIZE, csv_export=None):
+    """Write `df` as the artifact at `path`; returns the file written."""
+    writer = ArtifactWriter(path, fmt, row_group_size, csv_export)
+    if len(df.columns):
+        writer.write(df)
+    return writer.close(columns=list(df.columns))
+
+
+def append_artifact(df, path, row_group_size=ROW_GROUP_SIZE, max_parts=MAX_PARTS):
+    """Add the rows of `df` to the end of an existing artifact; returns the file written.
+
+    Rows for a Parquet artifact become a new part file, and an existing CSV
+    copy is appended to as well.
+    """
+    resolved = resolve_artifact(path)
+    if resolved is None:
+        raise FileNotFoundError(f"No artifact at {path} (looked for .parquet and .csv)")
+    csv_copy = artifact_paths(path)[".csv"]
+    if os.path.exists(csv_copy) and len(df):
+        # The CSV first: the Parquet file read by default must stay the newer one
+        header = pd.read_csv(csv_copy, nrows=0).columns
+        df.reindex(columns=header).to_csv(csv_copy, mode="a", header=False, index=False, encoding="utf-8")
+    if resolved.endswith(".parquet") and len(df):
+        import pyarrow.parquet as pq
+
+        schema = pq.read_schema(resolved)
+        part = os.path.join(parts_dir(resolved), f"part-{time.time_ns()}-{os.getpid()}.parquet")
+        os.makedirs(os.path.dirname(part), exist_ok=True)
+        try:
+            table = _to_table(df.reindex(columns=schema.names), schema)
+            pq.write_table(table, part + ".tmp", row_group_size=row_group_size, compression="zstd")
+        except BaseException:
+            if os.path.exists(part + ".tmp"):
+                os.remove(part + ".tmp")
+            raise
+        os.replace(part + ".tmp", part)
+        if len(_part_files(resolved)) > max_parts:
+            compact_artifact(resolved)
+    return resolved
+
+
+def compact_artifact(path, batch_size=ROW_GROUP_SIZE):
+    """Rewrite a Parquet artifact and its parts as one file, streaming one batch at a time."""
+    resolved = resolve_artifact(path)
+    if resolved is None or not resolved.endswith(".parquet"):
+        return resolved
+    with ArtifactWriter(resolved, fmt="parquet", csv_export=False) as writer:
+        for batch in iter_artifact_batches(resolved, batch_size=batch_size):
+            writer.write(batch)
+        writer.close(columns=available_columns(resolved))
+    return resolved
+
+
+# === Reading ===
+
+def available_columns(path):
+    resolved = resolve_artifact(path)
+    if resolved is None:
+        raise FileNotFoundError(f"No artifact at {path} (looked for .parquet and .csv)")
+    if resolved.endswith(".parquet"):  # parts share the main file's schema
+        import pyarrow.parquet as pq
+        return pq.read_schema(resolved).names
+    return pd.read_csv(resolved, nrows=0).columns.tolist()
+
+
+def read_artifact(path, columns=None):
+    """Load an artifact as a DataFrame, reading only `columns` (missing ones are ignored)."""
+    resolved = resolve_artifact(path)
+    if resolved is None:
+        raise FileNotFoundError(f"No artifact at {path} (looked for .parquet and .csv)")
+    if columns is not None:
+        present = set(available_columns(resolved))
+        columns = [c for c in columns if c in present]
+    if resolved.endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        tables = [pq.read_table(f, columns=columns) for f in artifact_files(resolved)]
+        df = pa.concat_tables(tables).to_pandas()
+        # Plain object/float columns, as read_csv returns them
+        for col in df.columns:
+            if isinstance(df[col].dtype, (pd.StringDtype, pd.CategoricalDtype)):
+                df[col] = df[col].astype(object)
+        return df
+    return pd.read_csv(resolved, usecols=columns)
+
+
+def iter_artifact_batches(path, columns=None, batch_size=ROW_GROUP_SIZE):
+    """Yield DataFrames of at most `batch_size` rows without loading the whole artifact."""
+    resolved = resolve_artifact(path)
+    if resolved is None:
+        raise FileNotFoundError(f"No artifact at {path} (looked for .parquet and .csv)")
+    if resolved.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for file in artifact_files(resolved):
+            for batch in pq.ParquetFile(file).iter_batches(batch_size=batch_size, columns=columns):
+                yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(resolved, usecols=columns, chunksize=batch_size)
+
+
+def export_csv(path, batch_size=ROW_GROUP_SIZE):
+    """Write a CSV copy of an artifact for tools that cannot read Parquet."""
+    csv_path = artifact_paths(path)[".csv"]
+    resolved = resolve_artifact(path)
+    if resolved == csv_path:
+        return csv_path
+    tmp = f"{csv_path}.tmp{os.getpid()}"
+    for i, batch in enumerate(iter_artifact_batches(path, batch_size=batch_size)):
+        batch.to_csv(tmp, mode="a" if i else "w", header=(i == 0), index=False, encoding="utf-8")
+    os.replace(tmp, csv_path)
+    # Dated like the rows it copies, so resolve_artifact does not take it for a newer edit
+    modified = _modified(resolved)
+    os.utime(csv_path, (modified, modified))
+    return csv_path
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python src/analysis/artifacts.py export <artifact path> ...
+    if len(sys.argv) > 2 and sys.argv[1] == "export":
+        for artifact in sys.argv[2:]:
+            print(f"Exported {export_csv(artifact)}")
+    else:
+        print("Usage: python src/analysis/artifacts.py export <artifact path> ...")
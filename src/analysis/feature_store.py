@@ -0,0 +1,272 @@
+"""
+feature_store.py
+----------------
+Shared TF-IDF feature store for the analysis stages.
+
+The vectorizer is fitted once per corpus and saved under
+data/processed/features/<hash>/ (or $FEATURE_STORE_DIR/<hash>/) as:
+1. vocabulary.json  (terms in column order, corpus term counts and each
+                    term's rank in CountVectorizer's max_features selection)
+2. idf.npy          (IDF weight per term)
+3. data.npy, indices.npy, indptr.npy  (L2-normalised CSR matrix)
+
+The artifact is keyed by a hash of the review texts, the vectorizer settings
+and FEATURE_STORE_VERSION, so a changed corpus simply gets a new directory.
+Publishing one prunes the store directory down to the FEATURE_STORE_KEEP
+most recently used artifacts (reusing an artifact marks it used).
+Stages load it memory-mapped and may ask for a smaller max_features, which is
+served as a column projection of the shared matrix.
+
+Run as a script (the pipeline's "features" stage) it fits the store for
+cleaned_reviews once, before the stages that share it start side by side,
+and records the artifact in <store dir>/current.json.
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+# === Paths ===
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+FEATURES_DIR = os.environ.get("FEATURE_STORE_DIR", os.path.join(BASE_DIR, "data", "processed", "features"))
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+from analysis import metrics
+
+# === Store settings ===
+FEATURE_STORE_VERSION = 2
+MAX_FEATURES = 3000  # largest vocabulary any stage asks for
+KEEP_STORES = int(os.environ.get("FEATURE_STORE_KEEP", 2))  # artifacts kept per store directory
+STOP_WORDS = "english"
+DTYPE = np.float64
+
+CURRENT_FILE = "current.json"  # written by the features stage
+
+# In-process cache: (store dir, corpus hash, max_features) -> (vectorizer, tfidf_matrix)
+_loaded = {}
+
+
+def corpus_hash(reviews, max_features=MAX_FEATURES):
+    """Hash the review texts together with everything that shapes the fit."""
+    h = hashlib.sha256()
+    settings = {"version": FEATURE_STORE_VERSION, "max_features": max_features,
+                "stop_words": STOP_WORDS, "dtype": np.dtype(DTYPE).name}
+    h.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    for review in reviews:
+        encoded = str(review).encode("utf-8")
+        h.update(len(encoded).to_bytes(8, "little"))
+        h.update(encoded)
+    return h.hexdigest()[:16]
+
+
+def set_store_dir(store_dir):
+    """Make `store_dir` the default store for this process (e.g. one per product)."""
+    global FEATURES_DIR
+    FEATURES_DIR = store_dir
+
+
+def build_feature_store(reviews, store_dir=None, max_features=MAX_FEATURES):
+    """Fit the shared TF-IDF model on `reviews` and write it to disk.
+
+    Returns the artifact directory. An existing artifact for the same corpus
+    is reused as-is.
+    """
+    store_dir = store_dir or FEATURES_DIR
+    key = corpus_hash(reviews, max_features)
+    artifact_dir = os.path.join(store_dir, key)
+    meta_path = os.path.join(artifact_dir, "meta.json")
+    if os.path.exists(meta_path):
+        try:
+            os.utime(meta_path)  # most recently used, for prune_store
+        except OSError:
+            pass
+        return artifact_dir
+
+    print(f"Fitting shared TF-IDF feature store ({len(reviews)} reviews)...")
+    with metrics.measure("tfidf_fit", items=len(reviews)):
+        # Fit the full vocabulary and apply CountVectorizer's max_features rule by hand,
+        # keeping each term's rank so smaller projections select the same terms
+        counter = CountVectorizer(stop_words=STOP_WORDS, dtype=DTYPE)
+        counts = counter.fit_transform(reviews)
+        order = limit_order(np.asarray(counts.sum(axis=0)).ravel())
+        cols = np.sort(order[:max_features])
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = np.arange(len(order))
+        counts = counts[:, cols]
+        transformer = TfidfTransformer().fit(counts)
+        tfidf_matrix = transformer.transform(counts).tocsr()
+        tfidf_matrix.sort_indices()
+
+    terms = counter.get_feature_names_out()[cols].tolist()
+    term_counts = np.asarray(counts.sum(axis=0)).ravel().tolist()
+
+    # Write into a temp dir and rename, so concurrent stages never see a half-written store
+    os.makedirs(store_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=f".{key}-", dir=store_dir)
+    with open(os.path.join(tmp_dir, "vocabulary.json"), "w", encoding="utf-8") as f:
+        json.dump({"terms": terms, "term_counts": term_counts, "ranks": ranks[cols].tolist()}, f)
+    np.save(os.path.join(tmp_dir, "idf.npy"), transformer.idf_)
+    np.save(os.path.join(tmp_dir, "data.npy"), tfidf_matrix.data)
+    np.save(os.path.join(tmp_dir, "indices.npy"), tfidf_matrix.indices)
+    np.save(os.path.join(tmp_dir, "indptr.npy"), tfidf_matrix.indptr)
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": FEATURE_STORE_VERSION,
+            "hash": key,
+            "shape": list(tfidf_matrix.shape),
+            "max_features": max_features,
+            "stop_words": STOP_WORDS,
+        }, f, indent=2)
+
+    try:
+        os.replace(tmp_dir, artifact_dir)
+    except OSError:
+        # Another process published the same artifact first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    else:
+        prune_store(store_dir, current=key)
+
+    print(f"Saved feature store to {artifact_dir}")
+    return artifact_dir
+
+
+def prune_store(store_dir, keep=KEEP_STORES, current=None):
+    """Delete all but the `keep` most recently used artifacts (never `current`); returns those removed."""
+    artifacts = []
+    for name in os.listdir(store_dir):
+        meta_path = os.path.join(store_dir, name, "meta.json")
+        if not name.startswith(".") and os.path.exists(meta_path):
+            artifacts.append((os.stat(meta_path).st_mtime_ns, name))
+    removed = []
+    for _, name in sorted(artifacts, reverse=True)[keep:]:
+        if name != current:
+            shutil.rmtree(os.path.join(store_dir, name), ignore_errors=True)
+            removed.append(name)
+    return removed
+
+
+def limit_order(term_counts):
+    """Term indices in the order CountVectorizer(max_features=n) keeps them: the first n win.
+
+    Same expression as sklearn's _limit_features, including its default
+    (unstable) argsort, so tied counts at the cut-off resolve identically.
+    """
+    return (-np.asarray(term_counts)).argsort()
+
+
+def make_vectorizer(terms, idf):
+    """Rebuild a transform-only TfidfVectorizer from a stored vocabulary."""
+    vectorizer = TfidfVectorizer(vocabulary=terms, stop_words=STOP_WORDS, dtype=DTYPE)
+    vectorizer.idf_ = np.asarray(idf)
+    return vectorizer
+
+
+def _open_store(reviews, store_dir):
+    """(vocabulary dict, idf, memory-mapped full matrix) of the store for `reviews`."""
+    artifact_dir = build_feature_store(reviews, store_dir)
+    with open(os.path.join(artifact_dir, "vocabulary.json"), encoding="utf-8") as f:
+        vocab = json.load(f)
+    with open(os.path.join(artifact_dir, "meta.json"), encoding="utf-8") as f:
+        shape = tuple(json.load(f)["shape"])
+    idf = np.load(os.path.join(artifact_dir, "idf.npy"))
+    data = np.load(os.path.join(artifact_dir, "data.npy"), mmap_mode="r")
+    indices = np.load(os.path.join(artifact_dir, "indices.npy"), mmap_mode="r")
+    indptr = np.load(os.path.join(artifact_dir, "indptr.npy"), mmap_mode="r")
+    return vocab, idf, csr_matrix((data, indices, indptr), shape=shape, copy=False)
+
+
+def _columns(vocab, max_features):
+    """Stored columns CountVectorizer(max_features) keeps, or None when it keeps them all."""
+    if max_features is None or max_features > MAX_FEATURES:
+        raise ValueError(f"max_features must be <= {MAX_FEATURES}, got {max_features}")
+    if max_features >= len(vocab["terms"]):
+        return None
+    # CountVectorizer keeps the first max_features terms of its full-vocabulary
+    # ranking, which are always among the MAX_FEATURES stored ones
+    return np.flatnonzero(np.asarray(vocab["ranks"]) < max_features)
+
+
+def _vectorizer(vocab, idf, cols):
+    if cols is None:
+        return make_vectorizer(vocab["terms"], idf)
+    return make_vectorizer([vocab["terms"][i] for i in cols], idf[cols])
+
+
+def load_tfidf(reviews, max_features=MAX_FEATURES, store_dir=None):
+    """Return (vectorizer, tfidf_matrix) for `reviews`, fitting the store only if needed.
+
+    Equivalent to TfidfVectorizer(max_features=max_features,
+    stop_words="english").fit_transform(reviews): the columns CountVectorizer
+    would keep (by their stored selection rank) are projected out of the
+    shared matrix and rows are re-normalised. When no projection is needed
+    (max_features covers the stored vocabulary) the matrix is backed by
+    read-only memory maps; copy it before modifying it in place. A projected
+    matrix is built in memory; see load_tfidf_rows to read it in slices.
+    """
+    if max_features is None or max_features > MAX_FEATURES:
+        raise ValueError(f"max_features must be <= {MAX_FEATURES}, got {max_features}")
+
+    store_dir = store_dir or FEATURES_DIR
+    key = corpus_hash(reviews)
+    if (store_dir, key, max_features) in _loaded:
+        return _loaded[(store_dir, key, max_features)]
+
+    vocab, idf, tfidf_matrix = _open_store(reviews, store_dir)
+    cols = _columns(vocab, max_features)
+    if cols is not None:
+        tfidf_matrix = normalize(tfidf_matrix[:, cols], norm="l2", copy=False)
+
+    result = (_vectorizer(vocab, idf, cols), tfidf_matrix)
+    _loaded[(store_dir, key, max_features)] = result
+    return result
+
+
+class TfidfRows:
+    """Rows of a store matrix projected to fewer features, built one slice at a time.
+
+    rows[i:j] (or rows[index_array]) equals load_tfidf(...)[1][i:j]; only the
+    requested rows are read from the memory-mapped store and projected.
+    """
+
+    def __init__(self, matrix, cols):
+        self.matrix = matrix
+        self.cols = cols
+
+    @property
+    def shape(self):
+        return (self.matrix.shape[0], self.matrix.shape[1] if self.cols is None else len(self.cols))
+
+    def __getitem__(self, rows):
+        block = self.matrix[rows]
+        if self.cols is None:
+            return block
+        return normalize(block[:, self.cols], norm="l2", copy=False)
+
+
+def load_tfidf_rows(reviews, max_features=MAX_FEATURES, store_dir=None):
+    """Like load_tfidf, but returns (vectorizer, TfidfRows) so the matrix is never built whole."""
+    vocab, idf, tfidf_matrix = _open_store(reviews, store_dir or FEATURES_DIR)
+    cols = _columns(vocab, max_features)
+    return _vectorizer(vocab, idf, cols), TfidfRows(tfidf_matrix, cols)
+
+
+if __name__ == "__main__":
+    from analysis.artifacts import read_artifact, REVIEW_TEXT_COLUMNS
+
+    data_path = os.path.join(BASE_DIR, "data", "processed", "cleaned_reviews.csv")
+    df = read_artifact(data_path, columns=REVIEW_TEXT_COLUMNS)
+    text_col = "Cleaned_Review" if "Cleaned_Review" in df.columns else "cleaned_text"
+    reviews = df[text_col].dropna().tolist()
+    artifact_dir = build_feature_store(reviews)
+
+    # Stage output: names the artifact the analysis stages will load
+    current_path = os.path.join(FEATURES_DIR, CURRENT_FILE)
+    with open(current_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"hash": os.path.basename(artifact_dir), "reviews": len(reviews)}, f, indent=2)
+    os.replace(current_path + ".tmp", current_path)
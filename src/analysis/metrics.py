@@ -0,0 +1,207 @@
+"""
+metrics.py
+----------
+Timing and memory instrumentation shared by every stage.
+
+1. measure(step, items=...): times a block and appends one JSON line to
+   METRICS_FILE with wall time, CPU time (including reaped child processes,
+   e.g. a stage's worker pool), peak RSS and items/s.
+2. StepTotals: for hot paths that run once per batch (translation,
+   lemmatization), time is summed in memory and written as one line per
+   step. Worker processes return as_dict() with their results, the same
+   way language_detection returns its tier stats.
+3. profile(name): runs the block under cProfile when PIPELINE_PROFILE names
+   a directory (main.py --profile) and writes <name>.prof plus the top
+   functions by cumulative time as <name>.txt.
+
+Every record carries the stage (PIPELINE_STAGE, set by the pipeline runner)
+and the run ID (PIPELINE_RUN_ID), so one file holds many runs. METRICS=0
+turns recording off.
+
+    python src/analysis/metrics.py [RUN_ID]   # per-step summary (default: last run)
+"""
+
+import os
+import sys
+import json
+import time
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+METRICS_FILE = os.environ.get("METRICS_FILE", os.path.join(BASE_DIR, "data", "processed", "metrics.jsonl"))
+ENABLED = os.environ.get("METRICS", "1") != "0"
+PROFILE_DIR = os.path.join(BASE_DIR, "data", "processed", "profiles")
+PROFILE_TOP = 40  # functions listed in each <name>.txt
+
+
+def new_run():
+    """Start a run ID; processes started afterwards inherit it through the environment."""
+    os.environ["PIPELINE_RUN_ID"] = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+    return os.environ["PIPELINE_RUN_ID"]
+
+
+def run_id():
+    return os.environ.get("PIPELINE_RUN_ID") or new_run()
+
+
+def set_stage(name):
+    os.environ["PIPELINE_STAGE"] = name
+
+
+def current_stage():
+    return os.environ.get("PIPELINE_STAGE") or os.path.splitext(os.path.basename(sys.argv[0]))[0] or "interactive"
+
+
+def cpu_seconds():
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def peak_rss_mb(children=False):
+    """Peak resident set size of this process (or its largest reaped child) so far."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+            return None if children else psutil.Process().memory_info().peak_wset / 2**20
+        except (ImportError, AttributeError):
+            return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in bytes on macOS, KiB elsewhere
+    return usage.ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+def write_record(record, path=None):
+    if not ENABLED:
+        return
+    path = path or METRICS_FILE
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # One short line per write, so appends from concurrent stages do not interleave
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, default=str) + "\n")
+
+
+def make_record(step, wall, cpu, items=None, **fields):
+    peak, children_peak = peak_rss_mb(), peak_rss_mb(children=True)
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "run_id": run_id(),
+        "stage": current_stage(),
+        "step": step,
+        "pid": os.getpid(),
+        "wall_s": round(wall, 6),
+        "cpu_s": round(cpu, 6),
+        "peak_rss_mb": round(peak, 1) if peak is not None else None,
+        "children_peak_rss_mb": round(children_peak, 1) if children_peak else None,
+        "items": items,
+        "items_per_s": round(items / wall, 1) if items and wall > 0 else None,
+        **fields,
+    }
+
+
+@contextmanager
+def measure(step, items=None, **fields):
+    """Record the block as `step`. Yields the extra fields; set ["items"] there if only known later."""
+    extra = {"items": items, **fields}
+    wall, cpu = time.perf_counter(), cpu_seconds()
+    try:
+        yield extra
+    except BaseException as e:
+        extra["error"] = type(e).__name__
+        raise
+    finally:
+        write_record(make_record(step, time.perf_counter() - wall, cpu_seconds() - cpu, **extra))
+
+
+class StepTotals:
+    """Wall time, CPU time, items and calls summed per step, written once at the end."""
+
+    def __init__(self):
+        self.totals = {}
+
+    @contextmanager
+    def time(self, step, items=0):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.add(step, time.perf_counter() - wall, time.process_time() - cpu, items)
+
+    def add(self, step, wall, cpu, items=0, calls=1):
+        total = self.totals.setdefault(step, [0.0, 0.0, 0, 0])
+        total[0] += wall
+        total[1] += cpu
+        total[2] += items
+        total[3] += calls
+
+    def merge(self, totals):
+        """Add the as_dict() of another process."""
+        for step, values in totals.items():
+            self.add(step, *values)
+
+    def as_dict(self):
+        return {step: list(values) for step, values in self.totals.items()}
+
+    def reset(self):
+        self.totals.clear()
+
+    def record(self, **fields):
+        for step, (wall, cpu, items, calls) in self.totals.items():
+            write_record(make_record(step, wall, cpu, items, calls=calls, **fields))
+
+
+@contextmanager
+def profile(name, profile_dir=None):
+    """cProfile the block into `profile_dir` (default: $PIPELINE_PROFILE; off when unset)."""
+    profile_dir = profile_dir or os.environ.get("PIPELINE_PROFILE")
+    if not profile_dir:
+        yield
+        return
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(profile_dir, exist_ok=True)
+        profiler.dump_stats(os.path.join(profile_dir, f"{name}.prof"))
+        with open(os.path.join(profile_dir, f"{name}.txt"), "w", encoding="utf-8") as f:
+            pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(PROFILE_TOP)
+
+
+# === Reading ===
+
+def load_metrics(path=None, run=None):
+    """Records of one run (default: the last one in the file) as a DataFrame."""
+    import pandas as pd
+
+    path = path or METRICS_FILE
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if not records:
+        return pd.DataFrame()
+    run = run or records[-1]["run_id"]
+    return pd.DataFrame([r for r in records if r["run_id"] == run])
+
+
+def print_summary(run=None, path=None):
+    df = load_metrics(path, run)
+    if df.empty:
+        return
+    summary = df.groupby(["stage", "step"], sort=False).agg(
+        wall_s=("wall_s", "sum"), cpu_s=("cpu_s", "sum"),
+        peak_rss_mb=("peak_rss_mb", "max"), items=("items", lambda s: s.sum(min_count=1))).reset_index()
+    summary["items_per_s"] = (summary["items"] / summary["wall_s"]).where(summary["items"] > 0)
+    summary["items"] = summary["items"].astype("Int64")
+    print(f"\n=== Step Metrics (run {df['run_id'].iloc[0]}) ===")
+    print(summary.to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+
+
+if __name__ == "__main__":
+    print_summary(sys.argv[1] if len(sys.argv) > 1 else None)
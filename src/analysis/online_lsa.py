@@ -0,0 +1,253 @@
+"""
+online_lsa.py
+-------------
+Online LSA for topic_modeling.py (TOPIC_MODE=online).
+
+State kept under data/processed/lsa_state/:
+1. vocabulary.json + idf.npy   (TF-IDF vocabulary, frozen at the last full fit)
+2. components.npy              (topics x terms, the SVD basis)
+3. singular_values.npy
+4. review_keys.txt             (hash of every review already folded in)
+5. doc_topics.f32              (float32 topic weights, one row per key)
+6. meta.json                   (baseline residual, document count, version)
+
+New reviews are folded in batch by batch with an incremental SVD update.
+Stacking the current rank-k factorisation (S @ Vt) on top of the new TF-IDF
+rows and re-factorising that small matrix gives the rank-k basis of the whole
+corpus seen so far, without touching old documents. If a batch fits the
+basis much worse than the corpus it was fitted on, or too many of its tokens
+are out of vocabulary, the model is refit from scratch. "Much worse" is
+measured on the share of energy the basis captures (1 - relative residual):
+LSA on short reviews leaves most energy unexplained (a baseline residual of
+0.8 is normal), so a relative bound on the residual itself could never be
+reached.
+
+An update only projects the new reviews; their keys and weights are appended
+to review_keys.txt and doc_topics.f32, and older reviews keep the weights
+they got when they were added. After every update (and refit) the new
+components are matched to the previous ones (order and sign), so Topic_i
+keeps meaning the same topic and old weights stay comparable with new ones.
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+from scipy.sparse import vstack, csr_matrix
+from sklearn.decomposition import TruncatedSVD
+from scipy.optimize import linear_sum_assignment
+from sklearn.utils.extmath import randomized_svd, svd_flip
+
+from analysis.feature_store import load_tfidf, make_vectorizer
+from analysis import metrics
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+STATE_DIR = os.path.join(BASE_DIR, "data", "processed", "lsa_state")
+
+ONLINE_LSA_VERSION = 2
+MAX_FEATURES = 2000
+BATCH_SIZE = 5000          # new reviews folded in per update
+DRIFT_THRESHOLD = 0.25     # refit when a batch's captured energy falls 25% below the baseline's
+OOV_THRESHOLD = 0.2        # ... or when 20% of its tokens are out of vocabulary
+
+
+def review_key(review):
+    return hashlib.blake2b(str(review).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def relative_residual(matrix, components):
+    """Share of the matrix's energy the basis does not capture (0 = perfect fit)."""
+    total = matrix.multiply(matrix).sum()
+    if total == 0:
+        return 0.0
+    captured = np.square(matrix @ components.T).sum()
+    return float(max(total - captured, 0.0) / total)
+
+
+def drifted(residual, baseline, threshold=DRIFT_THRESHOLD):
+    """True when the basis captures `threshold` less of a batch's energy than of the corpus it was fit on."""
+    return residual - baseline > threshold * (1 - baseline)
+
+
+def oov_rate(vectorizer, reviews):
+    analyzer = vectorizer.build_analyzer()
+    vocab = vectorizer.vocabulary_
+    tokens = oov = 0
+    for review in reviews:
+        for token in analyzer(review):
+            tokens += 1
+            oov += token not in vocab
+    return oov / tokens if tokens else 0.0
+
+
+def align_components(components, reference):
+    """(order, signs) that match each reference topic with its closest new component.
+
+    Components are unit vectors, so |overlap| is the cosine between topics;
+    the best one-to-one matching keeps topic order, and flipping signs where
+    the overlap is negative keeps each topic's direction.
+    """
+    overlap = reference @ components.T
+    _, order = linear_sum_assignment(-np.abs(overlap))
+    signs = np.where(overlap[np.arange(len(order)), order] < 0, -1.0, 1.0)
+    return order, signs
+
+
+def reference_components(previous, vectorizer):
+    """Previous components in the term space of `vectorizer` (terms missing from it are dropped)."""
+    terms = previous["vectorizer"].get_feature_names_out()
+    index = vectorizer.vocabulary_
+    reference = np.zeros((len(previous["components"]), len(index)))
+    shared = [(i, index[t]) for i, t in enumerate(terms) if t in index]
+    if shared:
+        old_cols, new_cols = map(list, zip(*shared))
+        reference[:, new_cols] = previous["components"][:, old_cols]
+    return reference
+
+
+def fit_full(reviews, n_topics, state_dir=STATE_DIR, previous=None):
+    """Fit LSA from scratch on all reviews and save the state.
+
+    With a `previous` state, topics are ordered and signed to match it.
+    """
+    vectorizer, tfidf_matrix = load_tfidf(reviews, max_features=MAX_FEATURES)
+    lsa_model = TruncatedSVD(n_components=n_topics, random_state=42)
+    with metrics.measure("svd", items=tfidf_matrix.shape[0], mode="online_full"):
+        doc_topics = lsa_model.fit_transform(tfidf_matrix)
+    components, singular_values = lsa_model.components_, lsa_model.singular_values_
+    if previous is not None:
+        order, signs = align_components(components, reference_components(previous, vectorizer))
+        components, singular_values = components[order] * signs[:, None], singular_values[order]
+        doc_topics = doc_topics[:, order] * signs
+
+    state = {
+        "vectorizer": vectorizer,
+        "components": components,
+        "singular_values": singular_values,
+        "keys": [review_key(r) for r in reviews],
+        "doc_topics": doc_topics.astype(np.float32),
+        "baseline_residual": relative_residual(tfidf_matrix, components),
+        "n_docs": len(reviews),
+    }
+    save_state(state, state_dir)
+    return state
+
+
+def fold_in(state, new_matrix):
+    """Incremental rank-k SVD update with new TF-IDF rows."""
+    k = len(state["singular_values"])
+    stacked = vstack([csr_matrix(state["singular_values"][:, None] * state["components"]), new_matrix])
+    with metrics.measure("svd_fold_in", items=new_matrix.shape[0], mode="online"):
+        u, s, vt = randomized_svd(stacked, n_components=k, random_state=42)
+    _, vt = svd_flip(u, vt, u_based_decision=False)
+    order, signs = align_components(vt, state["components"])
+    state["components"], state["singular_values"] = vt[order] * signs[:, None], s[order]
+    state["n_docs"] += new_matrix.shape[0]
+    return state
+
+
+def update(reviews, n_topics, state_dir=STATE_DIR, batch_size=BATCH_SIZE):
+    """Bring the saved model up to date with `reviews`; returns (state, action)."""
+    state = load_state(state_dir)
+    if state is None or len(state["singular_values"]) != n_topics:
+        return fit_full(reviews, n_topics, state_dir), "full fit (no usable state)"
+
+    known = set(state["keys"])
+    new_reviews = [r for r in reviews if review_key(r) not in known]
+    if not new_reviews:
+        return state, "up to date"
+
+    previous = {"vectorizer": state["vectorizer"], "components": state["components"]}
+    vectorizer = state["vectorizer"]
+    n_saved = len(state["keys"])
+    new_weights = []
+    for start in range(0, len(new_reviews), batch_size):
+        batch = new_reviews[start:start + batch_size]
+        batch_matrix = vectorizer.transform(batch)
+        residual = relative_residual(batch_matrix, state["components"])
+        oov = oov_rate(vectorizer, batch)
+        if drifted(residual, state["baseline_residual"]) or oov > OOV_THRESHOLD:
+            print(f"Drift detected (residual {residual:.3f} vs baseline "
+                  f"{state['baseline_residual']:.3f}, OOV {oov:.1%}); refitting from scratch...")
+            return fit_full(reviews, n_topics, state_dir, previous), "full fit (drift)"
+        state = fold_in(state, batch_matrix)
+        state["keys"].extend(review_key(r) for r in batch)
+        new_weights.append(np.asarray(batch_matrix @ state["components"].T, dtype=np.float32))
+
+    # Only the new reviews are projected; older weights stay as they were
+    state["doc_topics"] = np.vstack([state["doc_topics"]] + new_weights)
+    save_state(state, state_dir, appended_from=n_saved)
+    return state, f"folded in {len(new_reviews)} new reviews"
+
+
+def transform(state, reviews):
+    """Per-review topic weights, looked up from the saved weights by review key.
+
+    Reviews the model has not seen (none after update()) are projected onto
+    the current basis.
+    """
+    rows = {key: i for i, key in enumerate(state["keys"])}
+    weights = np.zeros((len(reviews), len(state["singular_values"])), dtype=np.float32)
+    unseen = []
+    for i, review in enumerate(reviews):
+        row = rows.get(review_key(review))
+        if row is None:
+            unseen.append(i)
+        else:
+            weights[i] = state["doc_topics"][row]
+    if unseen:
+        matrix = state["vectorizer"].transform([reviews[i] for i in unseen])
+        weights[unseen] = matrix @ state["components"].T
+    return weights
+
+
+# === State I/O ===
+
+def save_state(state, state_dir=STATE_DIR, appended_from=None):
+    """Write the state; with `appended_from`, only keys and weights from that row on are appended."""
+    os.makedirs(state_dir, exist_ok=True)
+    vectorizer = state["vectorizer"]
+    with open(os.path.join(state_dir, "vocabulary.json"), "w", encoding="utf-8") as f:
+        json.dump(vectorizer.get_feature_names_out().tolist(), f)
+    np.save(os.path.join(state_dir, "idf.npy"), vectorizer.idf_)
+    np.save(os.path.join(state_dir, "components.npy"), state["components"])
+    np.save(os.path.join(state_dir, "singular_values.npy"), state["singular_values"])
+    start = appended_from or 0
+    mode = "a" if appended_from is not None else "w"
+    with open(os.path.join(state_dir, "review_keys.txt"), mode, encoding="utf-8") as f:
+        f.writelines(k + "\n" for k in state["keys"][start:])
+    with open(os.path.join(state_dir, "doc_topics.f32"), mode + "b") as f:
+        np.ascontiguousarray(state["doc_topics"][start:], dtype=np.float32).tofile(f)
+    with open(os.path.join(state_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": ONLINE_LSA_VERSION,
+            "baseline_residual": state["baseline_residual"],
+            "n_docs": state["n_docs"],
+        }, f, indent=2)
+
+
+def load_state(state_dir=STATE_DIR):
+    meta_path = os.path.join(state_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("version") != ONLINE_LSA_VERSION:
+        return None
+    with open(os.path.join(state_dir, "vocabulary.json"), encoding="utf-8") as f:
+        terms = json.load(f)
+    with open(os.path.join(state_dir, "review_keys.txt"), encoding="utf-8") as f:
+        keys = [line.strip() for line in f if line.strip()]
+    singular_values = np.load(os.path.join(state_dir, "singular_values.npy"))
+    doc_topics = np.fromfile(os.path.join(state_dir, "doc_topics.f32"), dtype=np.float32)
+    if len(doc_topics) != len(keys) * len(singular_values) or meta["n_docs"] != len(keys):
+        return None  # interrupted append; refit
+    return {
+        "vectorizer": make_vectorizer(terms, np.load(os.path.join(state_dir, "idf.npy"))),
+        "components": np.load(os.path.join(state_dir, "components.npy")),
+        "singular_values": singular_values,
+        "keys": keys,
+        "doc_topics": doc_topics.reshape(len(keys), len(singular_values)),
+        "baseline_residual": meta["baseline_residual"],
+        "n_docs": meta["n_docs"],
+    }
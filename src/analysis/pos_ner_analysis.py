@@ -1,91 +1,179 @@
+import csv
+import os
+import sys
 import pandas as pd
-import nltk
-from nltk import pos_tag, word_tokenize
 from collections import Counter
-import matplotlib.pyplot as plt
-import spacy
+from concurrent.futures import ProcessPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+from analysis.sketches import SpaceSavingCounter
+from analysis.artifacts import read_artifact, REVIEW_TEXT_COLUMNS
+from analysis import metrics
+
+DATA_FILE = os.path.join(BASE_DIR, "data", "processed", "cleaned_reviews.csv")
+POS_OUTPUT = os.path.join(BASE_DIR, "data", "processed", "pos_counts.csv")
+
+# === POS settings ===
+POS_BATCH_SIZE = 500  # reviews tagged per worker task
+POS_WORKERS = int(os.environ.get("POS_WORKERS", os.cpu_count() or 1))
+# Set to track only the top words approximately (Space-Saving) instead of every word
+POS_SKETCH_CAPACITY = int(os.environ.get("POS_SKETCH_CAPACITY", 0)) or None
+
+# === NER settings ===
+NER_BATCH_SIZE = 256  # texts per nlp.pipe batch
+NER_N_PROCESS = int(os.environ.get("NER_N_PROCESS", 1))  # worker processes for nlp.pipe
+# NER only needs tok2vec + ner; skip the rest of the pipeline
+NER_DISABLED = ["tagger", "parser", "attribute_ruler", "lemmatizer"]
+NER_OUTPUT = os.path.join(BASE_DIR, "data", "processed", "ner_entities.csv")
+
+def text_column(df):
+    return "Cleaned_Review" if "Cleaned_Review" in df.columns else "cleaned_text"
 
 # === NLTK Downloads ===
-nltk.download('punkt', quiet=True)
-nltk.download('averaged_perceptron_tagger', quiet=True)
+def download_resources():
+    import nltk
+    nltk.download('punkt', quiet=True)
+    nltk.download('averaged_perceptron_tagger', quiet=True)
 
 # === Load spaCy model ===
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    # If not installed, install and load
-    import os
-    os.system("python -m spacy download en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
-
-# === Load Cleaned Data ===
-print("Loading cleaned reviews...")
-df = pd.read_csv("flipkart_product-review-analysis/data/processed/cleaned_reviews.csv")
-
-# Handle possible different column names
-text_col = "Cleaned_Review" if "Cleaned_Review" in df.columns else "cleaned_text"
-df = df.dropna(subset=[text_col])
-reviews = df[text_col].tolist()
+def load_nlp():
+    import spacy
+    try:
+        return spacy.load("en_core_web_sm", disable=NER_DISABLED)
+    except OSError:
+        # If not installed, install and load
+        os.system("python -m spacy download en_core_web_sm")
+        return spacy.load("en_core_web_sm", disable=NER_DISABLED)
 
 # === POS Tagging ===
-print("Performing POS tagging...")
-pos_counts = Counter()
-all_pos_tags = []
-
-for text in reviews:
-    if not isinstance(text, str) or not text.strip():
-        continue
-    tokens = word_tokenize(text)
-    tags = pos_tag(tokens)
-    all_pos_tags.extend(tags)
-    for _, tag in tags:
-        pos_counts[tag] += 1
-
-# === Display Top POS Tags ===
-print("\nTop 10 POS Tags:")
-for tag, count in pos_counts.most_common(10):
-    print(f"{tag}: {count}")
-
-# === Extract adjectives and verbs for analysis ===
-adjectives = [word for word, tag in all_pos_tags if tag.startswith('JJ')]
-verbs = [word for word, tag in all_pos_tags if tag.startswith('VB')]
-
-print(f"\nCommon adjectives describing product: {Counter(adjectives).most_common(10)}")
-print(f"Common verbs used: {Counter(verbs).most_common(10)}")
+def tag_batch(texts):
+    """Tag a batch of reviews and return its (tag, adjective, verb) counters."""
+    from nltk import pos_tag_sents, word_tokenize
+
+    batch_pos, batch_adj, batch_verb = Counter(), Counter(), Counter()
+    texts = [t for t in texts if isinstance(t, str) and t.strip()]
+    for tags in pos_tag_sents([word_tokenize(t) for t in texts]):
+        for word, tag in tags:
+            batch_pos[tag] += 1
+            if tag.startswith('JJ'):
+                batch_adj[word] += 1
+            elif tag.startswith('VB'):
+                batch_verb[word] += 1
+    return batch_pos, batch_adj, batch_verb
+
+def new_word_counter():
+    return SpaceSavingCounter(POS_SKETCH_CAPACITY) if POS_SKETCH_CAPACITY else Counter()
+
+def count_pos(reviews, workers=POS_WORKERS):
+    """Return (pos_counts, adjective_counts, verb_counts) over all reviews.
+
+    Counters are updated batch by batch, so memory depends on vocabulary size,
+    not on the number of tokens in the corpus. The worker pool lives only for
+    this call (never at import time, so spawn-based platforms can import the
+    module in workers) and has at most one process per batch.
+    """
+    pos_counts = Counter()
+    adjective_counts = new_word_counter()
+    verb_counts = new_word_counter()
+
+    def merge_batches(batch_results):
+        for batch_pos, batch_adj, batch_verb in batch_results:
+            pos_counts.update(batch_pos)
+            adjective_counts.update(batch_adj)
+            verb_counts.update(batch_verb)
+
+    batches = (reviews[i:i + POS_BATCH_SIZE] for i in range(0, len(reviews), POS_BATCH_SIZE))
+    workers = min(workers, -(-len(reviews) // POS_BATCH_SIZE))
+    with metrics.measure("pos_tagging", items=len(reviews), workers=workers):
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                merge_batches(executor.map(tag_batch, batches))
+        else:
+            merge_batches(map(tag_batch, batches))
+    return pos_counts, adjective_counts, verb_counts
+
+def pos_counts_frame(pos_counts):
+    return pd.DataFrame(pos_counts.items(), columns=["POS_Tag", "Count"])
 
 # === NER (Named Entity Recognition) using spaCy ===
-print("\nPerforming Named Entity Recognition with spaCy...")
-entities = []
-
-for text in reviews[:200]:  # sample 200 to save time
-    if not isinstance(text, str) or not text.strip():
-        continue
-    doc = nlp(text)
-    for ent in doc.ents:
-        entities.append((ent.text, ent.label_))
-
-# === Show Top Named Entities ===
-entity_counts = Counter([label for _, label in entities])
-print("\nEntity Type Counts:", entity_counts)
-
-print("\nSample Entities Found:")
-for entity, label in entities[:15]:
-    print(f"{entity} ({label})")
+def extract_entities(reviews, output_path=NER_OUTPUT, nlp=None):
+    """Run NER over the whole corpus, batched through nlp.pipe.
+
+    Entities are streamed to `output_path` as they come; returns
+    (entity_counts, sample_entities) with up to 15 sample (text, label) pairs.
+    """
+    nlp = nlp or load_nlp()
+    entity_counts = Counter()
+    sample_entities = []
+    ner_texts = (text for text in reviews if isinstance(text, str) and text.strip())
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", newline="", encoding="utf-8") as f, \
+            metrics.measure("spacy_ner", n_process=NER_N_PROCESS) as record:
+        writer = csv.writer(f)
+        writer.writerow(["Entity", "Type"])
+        record["items"] = 0
+        for doc in nlp.pipe(ner_texts, batch_size=NER_BATCH_SIZE, n_process=NER_N_PROCESS):
+            record["items"] += 1
+            rows = [(ent.text, ent.label_) for ent in doc.ents]
+            writer.writerows(rows)
+            entity_counts.update(label for _, label in rows)
+            if len(sample_entities) < 15:
+                sample_entities.extend(rows[:15 - len(sample_entities)])
+    return entity_counts, sample_entities
 
 # === Visualization ===
-plt.figure(figsize=(8, 4))
-plt.bar([x for x, _ in pos_counts.most_common(10)],
-        [y for _, y in pos_counts.most_common(10)])
-plt.title("Top 10 POS Tags in Reviews")
-plt.xlabel("POS Tag")
-plt.ylabel("Count")
-plt.tight_layout()
-plt.show()
-
-# === Save POS counts to CSV ===
-pos_df = pd.DataFrame(pos_counts.items(), columns=["POS_Tag", "Count"])
-pos_df.to_csv("flipkart_product-review-analysis/data/processed/pos_counts.csv", index=False)
-
-# === Save Named Entities to CSV ===
-ner_df = pd.DataFrame(entities, columns=["Entity", "Type"])
-ner_df.to_csv("flipkart_product-review-analysis/data/processed/ner_entities.csv", index=False)
+def plot_pos_counts(pos_counts, show=False):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(8, 4))
+    plt.bar([x for x, _ in pos_counts.most_common(10)],
+            [y for _, y in pos_counts.most_common(10)])
+    plt.title("Top 10 POS Tags in Reviews")
+    plt.xlabel("POS Tag")
+    plt.ylabel("Count")
+    plt.tight_layout()
+    if show:
+        plt.show()
+    plt.close()
+
+def main():
+    download_resources()
+    nlp = load_nlp()
+
+    # === Load Cleaned Data ===
+    print("Loading cleaned reviews...")
+    df = read_artifact(DATA_FILE, columns=REVIEW_TEXT_COLUMNS)
+    text_col = text_column(df)
+    reviews = df.dropna(subset=[text_col])[text_col].tolist()
+
+    print("Performing POS tagging...")
+    pos_counts, adjective_counts, verb_counts = count_pos(reviews)
+
+    # === Display Top POS Tags ===
+    print("\nTop 10 POS Tags:")
+    for tag, count in pos_counts.most_common(10):
+        print(f"{tag}: {count}")
+
+    # === Adjectives and verbs for analysis ===
+    print(f"\nCommon adjectives describing product: {adjective_counts.most_common(10)}")
+    print(f"Common verbs used: {verb_counts.most_common(10)}")
+
+    print("\nPerforming Named Entity Recognition with spaCy...")
+    entity_counts, sample_entities = extract_entities(reviews, nlp=nlp)
+
+    # === Show Top Named Entities ===
+    print("\nEntity Type Counts:", entity_counts)
+
+    print("\nSample Entities Found:")
+    for entity, label in sample_entities:
+        print(f"{entity} ({label})")
+
+    plot_pos_counts(pos_counts, show=True)
+
+    # === Save POS counts to CSV ===
+    pos_counts_frame(pos_counts).to_csv(POS_OUTPUT, index=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+qa_index.py
+-----------
+Persistent inverted index for the QA system.
+
+Built once at pipeline time from the shared TF-IDF features and saved under
+data/processed/qa_index/:
+1. vocabulary.json + idf.npy   (to vectorize questions)
+2. postings (CSC data/indices/indptr) with per-term max weight
+3. reviews.json                (texts to show as answers)
+4. POS tokens per review       (noun/adjective token ids, CSR-style offsets)
+
+Queries are scored term-at-a-time with MaxScore pruning: once the remaining
+query terms cannot lift an unseen review above the current top-k threshold,
+only existing candidates are updated, and candidates that can no longer reach
+the threshold are dropped.
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import nltk
+import numpy as np
+from nltk import word_tokenize, pos_tag_sents
+from scipy.sparse import csc_matrix
+
+# === Paths ===
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+from analysis.feature_store import load_tfidf, make_vectorizer
+from analysis.artifacts import read_artifact, artifact_files, REVIEW_TEXT_COLUMNS
+from analysis import metrics
+
+DATA_PATH = os.path.join(BASE_DIR, "data", "processed", "cleaned_reviews.csv")
+QA_INDEX_DIR = os.path.join(BASE_DIR, "data", "processed", "qa_index")
+
+QA_INDEX_VERSION = 2
+MAX_FEATURES = 3000
+
+# POS kinds stored per answer-summary token
+NOUN, ADJ = 0, 1
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def source_hash(data_path):
+    """Hash of every file holding the reviews (appended Parquet parts included)."""
+    return "".join(file_hash(path) for path in artifact_files(data_path))
+
+
+def tag_reviews(reviews):
+    """Yield [(lowercased word, NOUN|ADJ), ...] per review, tagged in context."""
+    tagged = pos_tag_sents([word_tokenize(r) for r in reviews])
+    for tags in tagged:
+        yield [(w.lower(), NOUN if t.startswith("NN") else ADJ)
+               for w, t in tags if t.startswith("NN") or t.startswith("JJ")]
+
+
+def build_pos_arrays(reviews):
+    """Encode noun/adjective tokens of every review as flat id/kind arrays with offsets."""
+    vocab, ids, kinds, indptr = {}, [], [], [0]
+    for tokens in tag_reviews(reviews):
+        for word, kind in tokens:
+            ids.append(vocab.setdefault(word, len(vocab)))
+            kinds.append(kind)
+        indptr.append(len(ids))
+    return (list(vocab), np.array(ids, dtype=np.int32), np.array(kinds, dtype=np.int8),
+            np.array(indptr, dtype=np.int64))
+
+
+class QAIndex:
+    """Top-k cosine retrieval over L2-normalised TF-IDF postings."""
+
+    def __init__(self, vectorizer, postings, upper_bounds, reviews, pos_vocab, pos_ids, pos_kinds, pos_indptr):
+        self.vectorizer = vectorizer
+        self.postings = postings  # csc_matrix, one column of (review, weight) per term
+        self.upper_bounds = upper_bounds  # max weight in each posting list
+        self.reviews = reviews
+        self.pos_vocab = pos_vocab
+        self.pos_ids = pos_ids  # noun/adjective token ids, all reviews back to back
+        self.pos_kinds = pos_kinds  # NOUN or ADJ for each entry of pos_ids
+        self.pos_indptr = pos_indptr  # review i owns pos_ids[pos_indptr[i]:pos_indptr[i + 1]]
+
+    def pos_tokens(self, review_indices):
+        """Return (token_ids, kinds) of the given reviews, concatenated in order."""
+        spans = [slice(self.pos_indptr[i], self.pos_indptr[i + 1]) for i in review_indices]
+        if not spans:
+            return np.array([], dtype=np.int32), np.array([], dtype=np.int8)
+        return (np.concatenate([self.pos_ids[s] for s in spans]),
+                np.concatenate([self.pos_kinds[s] for s in spans]))
+
+    def pad_results(self, docs, scores, top_n):
+        """Fill up to `top_n` with zero-score reviews, as the full cosine ranking did.
+
+        A question sharing no (or too few) terms with the reviews still gets
+        answers; like the original argsort over all-zero similarities, the
+        fillers are the last reviews, newest index first.
+        """
+        if len(docs) >= top_n:
+            return docs, scores
+        chosen = set(docs.tolist())
+        fill = [i for i in range(len(self.reviews) - 1, -1, -1) if i not in chosen][:top_n - len(docs)]
+        return (np.concatenate([docs, np.array(fill, dtype=np.int64)]),
+                np.concatenate([scores, np.zeros(len(fill))]))
+
+    def search(self, question, top_n=3):
+        """Return (review_indices, scores) of the `top_n` best matches, best first."""
+        return self.search_vector(self.vectorizer.transform([question]), top_n)
+
+    def search_vector(self, question_vec, top_n=3):
+        question_vec = question_vec.tocsr()
+        terms, weights = question_vec.indices, question_vec.data
+        if len(terms) == 0:
+            return self.pad_results(np.array([], dtype=np.int64), np.array([]), top_n)
+
+        # Highest-impact terms first, so the threshold rises as early as possible
+        bounds = weights * self.upper_bounds[terms]
+        order = np.argsort(-bounds, kind="stable")
+        terms, weights, bounds = terms[order], weights[order], bounds[order]
+        remaining = np.append(np.cumsum(bounds[::-1])[::-1], 0.0)
+
+        indptr, indices, data = self.postings.indptr, self.postings.indices, self.postings.data
+        cand_docs = np.array([], dtype=indices.dtype)
+        cand_scores = np.array([], dtype=data.dtype)
+        threshold = 0.0
+        accepting_new = True
+
+        for i, (term, weight) in enumerate(zip(terms, weights)):
+            docs = indices[indptr[term]:indptr[term + 1]]
+            vals = data[indptr[term]:indptr[term + 1]] * weight
+
+            if accepting_new:
+                all_docs = np.concatenate([cand_docs, docs])
+                cand_docs, inverse = np.unique(all_docs, return_inverse=True)
+                cand_scores = np.bincount(inverse, weights=np.concatenate([cand_scores, vals]))
+            elif len(docs):
+                # Posting lists are sorted by review index
+                pos = np.minimum(np.searchsorted(docs, cand_docs), len(docs) - 1)
+                hit = docs[pos] == cand_docs
+                cand_scores[hit] += vals[pos[hit]]
+
+            rest = remaining[i + 1]
+            if len(cand_scores) >= top_n:
+                threshold = max(threshold, np.partition(cand_scores, -top_n)[-top_n])
+                if rest < threshold:
+                    accepting_new = False
+                keep = cand_scores + rest >= threshold
+                cand_docs, cand_scores = cand_docs[keep], cand_scores[keep]
+
+        best = np.lexsort((cand_docs, -cand_scores))[:top_n]
+        return self.pad_results(cand_docs[best].astype(np.int64), cand_scores[best], top_n)
+
+    def search_batch(self, questions, top_n=3):
+        """Score a batch of questions with one sparse product against all reviews.
+
+        Returns one (review_indices, scores) pair per question, as in `search`.
+        """
+        question_vecs = self.vectorizer.transform(questions)
+        scores = (question_vecs @ self.postings.T).tocsr()
+        results = []
+        for i in range(scores.shape[0]):
+            docs = scores.indices[scores.indptr[i]:scores.indptr[i + 1]]
+            vals = scores.data[scores.indptr[i]:scores.indptr[i + 1]]
+            if len(vals) > top_n:
+                keep = vals >= np.partition(vals, -top_n)[-top_n]
+                docs, vals = docs[keep], vals[keep]
+            best = np.lexsort((docs, -vals))[:top_n]
+            results.append(self.pad_results(docs[best].astype(np.int64), vals[best], top_n))
+        return results
+
+
+def build_qa_index(data_path=DATA_PATH, index_dir=QA_INDEX_DIR, max_features=MAX_FEATURES):
+    print("Building QA retrieval index...")
+    df = read_artifact(data_path, columns=REVIEW_TEXT_COLUMNS)
+    text_col = "Cleaned_Review" if "Cleaned_Review" in df.columns else "cleaned_text"
+    reviews = df[text_col].dropna().tolist()
+
+    vectorizer, tfidf_matrix = load_tfidf(reviews, max_features=max_features)
+    postings = csc_matrix(tfidf_matrix)
+    postings.sort_indices()
+    upper_bounds = np.asarray(postings.max(axis=0).todense()).ravel()
+
+    print("Tagging reviews for answer summaries...")
+    nltk.download('punkt', quiet=True)
+    nltk.download('averaged_perceptron_tagger', quiet=True)
+    with metrics.measure("pos_tagging", items=len(reviews)):
+        pos_vocab, pos_ids, pos_kinds, pos_indptr = build_pos_arrays(reviews)
+
+    parent = os.path.dirname(index_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".qa_index-", dir=parent)
+    with open(os.path.join(tmp_dir, "vocabulary.json"), "w", encoding="utf-8") as f:
+        json.dump(vectorizer.get_feature_names_out().tolist(), f)
+    with open(os.path.join(tmp_dir, "reviews.json"), "w", encoding="utf-8") as f:
+        json.dump(reviews, f, ensure_ascii=False)
+    np.save(os.path.join(tmp_dir, "idf.npy"), vectorizer.idf_)
+    np.save(os.path.join(tmp_dir, "upper_bounds.npy"), upper_bounds)
+    np.save(os.path.join(tmp_dir, "data.npy"), postings.data)
+    np.save(os.path.join(tmp_dir, "indices.npy"), postings.indices)
+    np.save(os.path.join(tmp_dir, "indptr.npy"), postings.indptr)
+    with open(os.path.join(tmp_dir, "pos_vocab.json"), "w", encoding="utf-8") as f:
+        json.dump(pos_vocab, f, ensure_ascii=False)
+    np.save(os.path.join(tmp_dir, "pos_ids.npy"), pos_ids)
+    np.save(os.path.join(tmp_dir, "pos_kinds.npy"), pos_kinds)
+    np.save(os.path.join(tmp_dir, "pos_indptr.npy"), pos_indptr)
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": QA_INDEX_VERSION,
+            "source_hash": source_hash(data_path),
+            "shape": list(postings.shape),
+            "max_features": max_features,
+        }, f, indent=2)
+
+    shutil.rmtree(index_dir, ignore_errors=True)
+    os.replace(tmp_dir, index_dir)
+    print(f"Saved QA index to {index_dir}")
+    return index_dir
+
+
+def load_qa_index(data_path=DATA_PATH, index_dir=QA_INDEX_DIR):
+    """Load the saved index, rebuilding it first if it is missing or stale."""
+    meta_path = os.path.join(index_dir, "meta.json")
+    meta = None
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+    if (meta is None or meta["version"] != QA_INDEX_VERSION
+            or meta["source_hash"] != source_hash(data_path)):
+        build_qa_index(data_path, index_dir)
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+
+    with open(os.path.join(index_dir, "vocabulary.json"), encoding="utf-8") as f:
+        terms = json.load(f)
+    with open(os.path.join(index_dir, "reviews.json"), encoding="utf-8") as f:
+        reviews = json.load(f)
+    idf = np.load(os.path.join(index_dir, "idf.npy"))
+    upper_bounds = np.load(os.path.join(index_dir, "upper_bounds.npy"))
+    data = np.load(os.path.join(index_dir, "data.npy"), mmap_mode="r")
+    indices = np.load(os.path.join(index_dir, "indices.npy"), mmap_mode="r")
+    indptr = np.load(os.path.join(index_dir, "indptr.npy"), mmap_mode="r")
+    postings = csc_matrix((data, indices, indptr), shape=tuple(meta["shape"]), copy=False)
+
+    with open(os.path.join(index_dir, "pos_vocab.json"), encoding="utf-8") as f:
+        pos_vocab = json.load(f)
+    pos_ids = np.load(os.path.join(index_dir, "pos_ids.npy"), mmap_mode="r")
+    pos_kinds = np.load(os.path.join(index_dir, "pos_kinds.npy"), mmap_mode="r")
+    pos_indptr = np.load(os.path.join(index_dir, "pos_indptr.npy"))
+
+    return QAIndex(make_vectorizer(terms, idf), postings, upper_bounds, reviews,
+                   pos_vocab, pos_ids, pos_kinds, pos_indptr)
+
+
+if __name__ == "__main__":
+    build_qa_index()
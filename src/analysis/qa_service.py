@@ -0,0 +1,223 @@
+"""
+qa_service.py
+-------------
+Non-interactive front ends for the QA system. The retrieval index is loaded
+once per process and questions are answered in batches, each batch being a
+single sparse product against the review matrix.
+
+Modes:
+1. JSON-lines batch:  one {"id": ..., "question": ...} object per stdin line,
+   one answer object per stdout line.
+       python src/analysis/qa_service.py --jsonl < questions.jsonl
+2. HTTP server:       POST /answer with {"question": ...} or {"questions": [...]}.
+   Concurrent requests are micro-batched for up to --max-wait-ms.
+       python src/analysis/qa_service.py --http --port 8000
+"""
+
+import os
+import sys
+import json
+import asyncio
+import argparse
+import contextlib
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+from analysis.question_answering import answer_questions, get_qa_index
+
+MAX_BODY_BYTES = 1 << 20
+
+
+# === JSON-lines batch mode ===
+
+def parse_question(request, line_no):
+    """(request_id, question) from one decoded JSON line; raises ValueError if malformed."""
+    if isinstance(request, str):
+        return line_no, request
+    if not isinstance(request, dict) or "question" not in request:
+        raise ValueError("expected a string or an object with 'question'")
+    if not isinstance(request["question"], str):
+        raise ValueError("'question' must be a string")
+    return request.get("id", line_no), request["question"]
+
+
+def run_jsonl(infile, outfile, batch_size=64, top_n=3):
+    def write(record):
+        outfile.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def flush(batch):
+        try:
+            answers = answer_questions([q for _, q in batch], top_n)
+        except Exception:
+            # Answer one by one, so a failing question only costs its own line
+            answers = []
+            for _, question in batch:
+                try:
+                    answers.extend(answer_questions([question], top_n))
+                except Exception as e:
+                    answers.append({"error": f"{type(e).__name__}: {e}"})
+        for (request_id, _), answer in zip(batch, answers):
+            write({"id": request_id, **answer})
+        outfile.flush()
+
+    batch = []
+    for line_no, line in enumerate(infile, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request_id, question = parse_question(json.loads(line), line_no)
+        except ValueError as e:
+            # Keep output in input order
+            if batch:
+                flush(batch)
+                batch = []
+            write({"id": line_no, "error": f"bad request: {e}"})
+            continue
+        batch.append((request_id, question))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+
+# === HTTP mode ===
+
+class MicroBatcher:
+    """Collects questions from concurrent requests and answers them together."""
+
+    def __init__(self, max_batch=64, max_wait_ms=5, top_n=3):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.top_n = top_n
+        self.queue = asyncio.Queue()
+
+    async def submit(self, question):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((question, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            questions = [q for q, _ in batch]
+            try:
+                answers = await loop.run_in_executor(None, answer_questions, questions, self.top_n)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), answer in zip(batch, answers):
+                if not future.done():
+                    future.set_result(answer)
+
+
+async def _send(writer, status, payload):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+              500: "Internal Server Error"}[status]
+    writer.write(
+        f"HTTP/1.1 {status} {reason}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: close\r\n\r\n".encode("ascii") + body
+    )
+    await writer.drain()
+
+
+async def _handle(reader, writer, batcher):
+    try:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if len(request_line) < 2:
+            return await _send(writer, 400, {"error": "malformed request"})
+        method, path = request_line[0], request_line[1]
+        if method == "GET" and path == "/health":
+            return await _send(writer, 200, {"status": "ok"})
+        if method != "POST" or path != "/answer":
+            return await _send(writer, 404, {"error": "use POST /answer"})
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            return await _send(writer, 400, {"error": "invalid Content-Length"})
+        if length < 0:
+            return await _send(writer, 400, {"error": "invalid Content-Length"})
+        if length > MAX_BODY_BYTES:
+            return await _send(writer, 413, {"error": "request body too large"})
+        try:
+            payload = json.loads(await reader.readexactly(length))
+        except ValueError as e:
+            return await _send(writer, 400, {"error": f"invalid JSON: {e}"})
+        except asyncio.IncompleteReadError:
+            return await _send(writer, 400, {"error": "request body shorter than Content-Length"})
+
+        if isinstance(payload, dict) and "questions" in payload:
+            questions = payload["questions"]
+            if not isinstance(questions, list) or not all(isinstance(q, str) for q in questions):
+                return await _send(writer, 400, {"error": "'questions' must be a list of strings"})
+            answers = await asyncio.gather(*(batcher.submit(q) for q in questions))
+            return await _send(writer, 200, answers)
+        if isinstance(payload, dict) and "question" in payload:
+            if not isinstance(payload["question"], str):
+                return await _send(writer, 400, {"error": "'question' must be a string"})
+            return await _send(writer, 200, await batcher.submit(payload["question"]))
+        return await _send(writer, 400, {"error": "expected 'question' or 'questions'"})
+    except Exception as e:
+        await _send(writer, 500, {"error": str(e)})
+    finally:
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=8000, max_batch=64, max_wait_ms=5, top_n=3):
+    batcher = MicroBatcher(max_batch, max_wait_ms, top_n)
+    batch_task = asyncio.create_task(batcher.run())
+    server = await asyncio.start_server(lambda r, w: _handle(r, w, batcher), host, port)
+    print(f"QA service listening on http://{host}:{port}/answer", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batch_task.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch / HTTP question answering over reviews")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--jsonl", action="store_true", help="read JSON-lines questions from stdin")
+    mode.add_argument("--http", action="store_true", help="run an HTTP server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--batch-size", type=int, default=64, help="max questions per batch")
+    parser.add_argument("--max-wait-ms", type=float, default=5, help="HTTP micro-batch window")
+    parser.add_argument("--top-n", type=int, default=3)
+    args = parser.parse_args()
+
+    # Load the index up front; keep progress messages off stdout (it carries the answers)
+    with contextlib.redirect_stdout(sys.stderr):
+        get_qa_index()
+
+    if args.jsonl:
+        run_jsonl(sys.stdin, sys.stdout, args.batch_size, args.top_n)
+    else:
+        asyncio.run(serve(args.host, args.port, args.batch_size, args.max_wait_ms, args.top_n))
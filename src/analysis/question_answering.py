@@ -1,37 +1,33 @@
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
-import nltk
-from nltk import word_tokenize, pos_tag
 from collections import Counter
 import os
+import sys
 
 # === Setup ===
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+from analysis.qa_index import load_qa_index, tag_reviews, NOUN, ADJ
+
 data_path = os.path.join(BASE_DIR, "data", "processed", "cleaned_reviews.csv")
 
-print("Loading cleaned reviews...")
-df = pd.read_csv(data_path)
-text_col = "Cleaned_Review" if "Cleaned_Review" in df.columns else "cleaned_text"
-reviews = df[text_col].dropna().tolist()
+# === Retrieval Index (loaded on first use, rebuilt only if cleaned_reviews.csv changed) ===
+qa_index = None
 
-# === Build TF-IDF Matrix ===
-print("Building TF-IDF matrix for reviews...")
-vectorizer = TfidfVectorizer(max_features=3000, stop_words='english')
-tfidf_matrix = vectorizer.fit_transform(reviews)
+def get_qa_index():
+    global qa_index
+    if qa_index is None:
+        print("Loading QA retrieval index...")
+        qa_index = load_qa_index(data_path)
+    return qa_index
 
 # === Utility: Generate short answer from top reviews ===
-def summarize_reviews(relevant_reviews, aspect=None):
-    words = []
-    for r in relevant_reviews:
-        tokens = word_tokenize(r)
-        tags = pos_tag(tokens)
-        words.extend([w.lower() for w, t in tags if t.startswith("JJ") or t.startswith("NN")])
-    
+def compose_answer(words, kinds, aspect=None):
+    """Build the answer sentence from in-context noun/adjective tokens."""
     common = Counter(words).most_common(6)
-    nouns = [w for w, _ in common if pos_tag([w])[0][1].startswith("NN")]
-    adjs = [w for w, _ in common if pos_tag([w])[0][1].startswith("JJ")]
+    noun_counts = Counter(w for w, k in zip(words, kinds) if k == NOUN)
+    adj_counts = Counter(w for w, k in zip(words, kinds) if k == ADJ)
+    # A word tagged both ways is classified by its more frequent tag
+    nouns = [w for w, _ in common if noun_counts[w] >= adj_counts[w]]
+    adjs = [w for w, _ in common if adj_counts[w] > noun_counts[w]]
 
     noun_part = ", ".join(nouns[:2]) if nouns else "the product"
     adj_part = ", ".join(adjs[:2]) if adjs else "good"
@@ -41,12 +37,35 @@ def summarize_reviews(relevant_reviews, aspect=None):
     else:
         return f"Customers often mention {noun_part} and describe it as {adj_part}."
 
-# === Core QA Function ===
+def summarize_reviews(relevant_reviews, aspect=None):
+    """Summarize arbitrary review texts (tags them on the fly)."""
+    tokens = [t for tagged in tag_reviews(relevant_reviews) for t in tagged]
+    return compose_answer([w for w, _ in tokens], [k for _, k in tokens], aspect)
+
+def summarize_indexed_reviews(index, review_indices, aspect=None):
+    """Summarize indexed reviews from their POS tags precomputed at index-build time."""
+    ids, kinds = index.pos_tokens(review_indices)
+    return compose_answer([index.pos_vocab[i] for i in ids.tolist()], kinds.tolist(), aspect)
+
+# === Core QA Functions ===
+def answer_questions(questions, top_n=3):
+    """Answer a batch of questions with a single sparse product against the index."""
+    index = get_qa_index()
+    answers = []
+    for question, (top_indices, scores) in zip(questions, index.search_batch(questions, top_n)):
+        top_reviews = [index.reviews[i] for i in top_indices]
+        answers.append({
+            "question": question,
+            "answer": summarize_indexed_reviews(index, top_indices),
+            "reviews": top_reviews,
+            "scores": [round(float(s), 4) for s in scores],
+        })
+    return answers
+
 def answer_question(question, top_n=3):
-    question_vec = vectorizer.transform([question])
-    similarities = cosine_similarity(question_vec, tfidf_matrix).flatten()
-    top_indices = np.argsort(similarities)[-top_n:][::-1]
-    top_reviews = [reviews[i] for i in top_indices]
+    index = get_qa_index()
+    top_indices, _ = index.search(question, top_n)
+    top_reviews = [index.reviews[i] for i in top_indices]
 
     print(f"\nQuestion: {question}")
     print(f"\nMost Relevant Reviews:")
@@ -54,16 +73,18 @@ def answer_question(question, top_n=3):
         print(f"{i}. {review[:200]}...")
 
     # Generate short heuristic "answer"
-    answer_summary = summarize_reviews(top_reviews)
+    answer_summary = summarize_indexed_reviews(index, top_indices)
     print(f"Answer Summary: {answer_summary}\n")
 
 # === Interactive Mode ===
-print("\nClassical QA System (TF-IDF + Similarity)")
-print("Type your question (or 'exit' to quit):\n")
+if __name__ == "__main__":
+    get_qa_index()
+    print("\nClassical QA System (TF-IDF + Similarity)")
+    print("Type your question (or 'exit' to quit):\n")
 
-while True:
-    user_q = input("Your question: ").strip()
-    if user_q.lower() in ['exit', 'quit', 'q']:
-        print("Exiting QA system.")
-        break
-    answer_question(user_q)
+    while True:
+        user_q = input("Your question: ").strip()
+        if user_q.lower() in ['exit', 'quit', 'q']:
+            print("Exiting QA system.")
+            break
+        answer_question(user_q)
@@ -1,79 +1,241 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-import nltk
-from textblob import TextBlob
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import version
+import hashlib
+import string
+import time
 import os
+import sys
 
-# === Download necessary resources ===
-nltk.download('vader_lexicon', quiet=True)
-
-# === Load Cleaned Reviews ===
-print("Loading cleaned reviews...")
-df = pd.read_csv("flipkart_product-review-analysis/data/processed/cleaned_reviews.csv")
-
-text_col = "Cleaned_Review" if "Cleaned_Review" in df.columns else "cleaned_text"
-df = df.dropna(subset=[text_col])
-reviews = df[text_col].tolist()
-
-# === Initialize VADER ===
-analyzer = SentimentIntensityAnalyzer()
-
-# === Analyze Sentiment ===
-print("Performing sentiment analysis...")
-sentiment_scores = []
-for review in reviews:
-    scores = analyzer.polarity_scores(review)
-    blob = TextBlob(review)
-    sentiment_scores.append({
-        "review": review,
-        "vader_compound": scores["compound"],
-        "vader_pos": scores["pos"],
-        "vader_neg": scores["neg"],
-        "vader_neu": scores["neu"],
-        "textblob_polarity": blob.sentiment.polarity,
-    })
-
-sentiment_df = pd.DataFrame(sentiment_scores)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+from analysis.artifacts import read_artifact, write_artifact, resolve_artifact, artifact_paths, REVIEW_TEXT_COLUMNS
+from analysis import metrics
+
+# === Settings ===
+USE_VADER = os.environ.get("SENTIMENT_VADER", "1") != "0"
+USE_TEXTBLOB = os.environ.get("SENTIMENT_TEXTBLOB", "1") != "0"
+SENTIMENT_CHUNK_SIZE = 1000  # reviews per worker task
+SENTIMENT_WORKERS = int(os.environ.get("SENTIMENT_WORKERS", os.cpu_count() or 1))
+DATA_FILE = os.path.join(BASE_DIR, "data", "processed", "cleaned_reviews.csv")
+PLOT_FILE = os.path.join(BASE_DIR, "results", "sentiment_distribution.png")
+# Artifact name; stored as Parquet or CSV depending on ARTIFACT_FORMAT
+RESULTS_FILE = os.path.join(BASE_DIR, "data", "processed", "sentiment_results.csv")
+CACHE_DIR = os.path.join(BASE_DIR, "data", "processed", "sentiment_cache")
+MAX_CACHE_ENTRIES = int(os.environ.get("SENTIMENT_CACHE_MAX", 1_000_000))  # scores kept on compaction
+MAX_CACHE_PARTS = 32  # new-score part files before they are merged into one
+
+# Bump when scoring logic changes; library versions and enabled analyzers are
+# part of the cache version too, so any of them changing starts a fresh cache
+SENTIMENT_CACHE_VERSION = 1
+
+def text_column(df):
+    return "Cleaned_Review" if "Cleaned_Review" in df.columns else "cleaned_text"
+
+def download_resources():
+    import nltk
+    nltk.download('vader_lexicon', quiet=True)
+
+# === Scoring (runs in worker processes) ===
+analyzer = None
+lexicon = None
+NEUTRAL_SCORES = {"compound": 0.0, "pos": 0.0, "neg": 0.0, "neu": 1.0}
+
+def init_analyzer():
+    """Build VADER and its compiled lexicon once per process."""
+    global analyzer, lexicon
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+    analyzer = SentimentIntensityAnalyzer()
+    lexicon = frozenset(analyzer.lexicon)
+
+def vader_scores(review):
+    # Fast path: VADER gives every token zero valence unless it is a lexicon
+    # word, so a review with no lexicon hit always scores as fully neutral
+    # (VADER itself ignores one-character tokens)
+    tokens = [t for t in review.lower().split() if len(t) > 1]
+    if tokens and lexicon.isdisjoint(tokens) and lexicon.isdisjoint(t.strip(string.punctuation) for t in tokens):
+        return NEUTRAL_SCORES
+    return analyzer.polarity_scores(review)
+
+def score_chunk(chunk, use_vader=USE_VADER, use_textblob=USE_TEXTBLOB):
+    """Score one chunk of reviews; returns a dict of equal-length columns."""
+    if use_vader and analyzer is None:
+        init_analyzer()
+    columns = {"review": chunk}
+    if use_vader:
+        scores = [vader_scores(review) for review in chunk]
+        for key in ["compound", "pos", "neg", "neu"]:
+            columns[f"vader_{key}"] = np.fromiter((s[key] for s in scores), dtype=float, count=len(chunk))
+    if use_textblob:
+        from textblob import TextBlob
+        columns["textblob_polarity"] = np.fromiter(
+            (TextBlob(review).sentiment.polarity for review in chunk), dtype=float, count=len(chunk))
+    return columns
+
+def score_reviews(reviews, chunk_size=SENTIMENT_CHUNK_SIZE, workers=SENTIMENT_WORKERS):
+    chunks = [reviews[i:i + chunk_size] for i in range(0, len(reviews), chunk_size)]
+    with metrics.measure("sentiment_scoring", items=len(reviews), workers=workers):
+        if workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_analyzer if USE_VADER else None) as executor:
+                results = list(executor.map(score_chunk, chunks))
+        else:
+            results = [score_chunk(chunk) for chunk in chunks]
+    if not results:
+        return pd.DataFrame(columns=list(score_chunk([]).keys()))
+    return pd.DataFrame({col: np.concatenate([r[col] for r in results]) for col in results[0]})
+
+# === Score Cache (keyed by hash of the cleaned review) ===
+def analyzer_version():
+    parts = [f"v{SENTIMENT_CACHE_VERSION}",
+             f"vader={version('nltk')}" if USE_VADER else "novader",
+             f"textblob={version('textblob')}" if USE_TEXTBLOB else "notextblob"]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:12]
+
+def review_key(review):
+    return hashlib.blake2b(review.encode("utf-8"), digest_size=16).hexdigest()
+
+def cache_path(cache_dir=CACHE_DIR):
+    """Directory of score parts for the current analyzer version."""
+    return os.path.join(cache_dir, f"scores_{analyzer_version()}")
+
+def cache_parts(cache_dir=CACHE_DIR):
+    """Score part files, oldest first (a pre-parts single-file cache counts as the oldest)."""
+    parts_dir = cache_path(cache_dir)
+    legacy = resolve_artifact(parts_dir + ".csv")
+    # One entry per part, whichever of its .parquet / .csv files the reader picks
+    stems = sorted({os.path.splitext(name)[0] for name in os.listdir(parts_dir)
+                    if name.startswith("part-") and ".tmp" not in name}) if os.path.isdir(parts_dir) else []
+    return ([legacy] if legacy else []) + [resolve_artifact(os.path.join(parts_dir, stem + ".csv")) for stem in stems]
+
+def load_score_cache(cache_dir=CACHE_DIR):
+    parts = cache_parts(cache_dir)
+    if not parts:
+        return None
+    cache = pd.concat([read_artifact(part) for part in parts], ignore_index=True)
+    return cache.drop_duplicates(subset="key", keep="last").set_index("key")
+
+def write_cache_part(scores, cache_dir=CACHE_DIR):
+    """Add `scores` (indexed by key) as a new part; returns the file written."""
+    part = os.path.join(cache_path(cache_dir), f"part-{time.time_ns()}-{os.getpid()}.csv")
+    return write_artifact(scores.reset_index(), part)
+
+def compact_score_cache(cache, parts, keep_keys, cache_dir=CACHE_DIR, max_entries=MAX_CACHE_ENTRIES):
+    """Merge `parts` into one part; a cache over `max_entries` is trimmed to 80% of it.
+
+    Trimming below the bound leaves room for the next runs' new scores, so a
+    full cache is not rewritten on every run. Scores of `keep_keys` (the
+    reviews just served) are kept first, then the most recently added ones.
+    Parts added by other processes meanwhile are left alone.
+    """
+    if len(cache) > max_entries:
+        used = cache.index.isin(keep_keys)
+        cache = pd.concat([cache[~used], cache[used]]).iloc[-(max_entries * 4 // 5):]
+    write_cache_part(cache, cache_dir)
+    for part in parts:
+        for path in artifact_paths(part).values():
+            if os.path.exists(path):
+                os.remove(path)
+
+def score_reviews_cached(reviews, cache_dir=CACHE_DIR):
+    """Score only reviews missing from the cache, then serve every row from it.
+
+    New scores are written as a separate part file, so a run costs O(new
+    reviews) in writes. Parts are compacted into one once there are more than
+    MAX_CACHE_PARTS of them or the cache outgrows MAX_CACHE_ENTRIES.
+    """
+    keys = pd.Index([review_key(r) for r in reviews])
+    parts = cache_parts(cache_dir)
+    cache = load_score_cache(cache_dir)
+    missing = ~keys.isin(cache.index) if cache is not None else np.ones(len(keys), dtype=bool)
+
+    # Score each new distinct review once
+    new_keys, first = np.unique(np.asarray(keys[missing]), return_index=True)
+    new_reviews = [r for r, m in zip(reviews, missing) if m]
+    print(f"Sentiment cache: {len(reviews) - int(missing.sum())} hits, {len(new_keys)} reviews to score")
+    if len(new_keys):
+        new_scores = score_reviews([new_reviews[i] for i in first]).drop(columns="review")
+        new_scores.index = pd.Index(new_keys, name="key")
+        parts.append(write_cache_part(new_scores, cache_dir))
+        cache = new_scores if cache is None else pd.concat([cache, new_scores])
+
+    scores = cache.loc[keys].reset_index(drop=True)
+    scores.insert(0, "review", reviews)
+    if len(parts) > MAX_CACHE_PARTS or len(cache) > MAX_CACHE_ENTRIES:
+        compact_score_cache(cache, parts, keys, cache_dir, MAX_CACHE_ENTRIES)
+    return scores, len(new_keys)
 
 # === Classify sentiment ===
-def classify_sentiment(value):
-    if value >= 0.05:
-        return "Positive"
-    elif value <= -0.05:
-        return "Negative"
-    else:
-        return "Neutral"
-
-sentiment_df["sentiment"] = sentiment_df["vader_compound"].apply(classify_sentiment)
-
-# === Summary Statistics ===
-print("\nSentiment Distribution:")
-print(sentiment_df["sentiment"].value_counts())
-
-# === Visualization ===
-plt.figure(figsize=(6, 4))
-sentiment_df["sentiment"].value_counts().plot(kind='bar', color=['green', 'red', 'gray'])
-plt.title("Overall Sentiment Distribution")
-plt.xlabel("Sentiment")
-plt.ylabel("Number of Reviews")
-plt.tight_layout()
-
-# Save to results folder
-os.makedirs("results", exist_ok=True)
-plt.savefig("flipkart_product-review-analysis/results/sentiment_distribution.png")
-plt.show()
-
-# === Save Sentiment Data ===
-os.makedirs("data/processed", exist_ok=True)
-sentiment_df.to_csv("flipkart_product-review-analysis/data/processed/sentiment_results.csv", index=False)
-
-print("\nSentiment analysis complete!")
-print("Results saved to: data/processed/sentiment_results.csv and results/sentiment_distribution.png")
-
-# === Show Sample Output ===
-print("\nExample Positive Reviews:")
-print(sentiment_df[sentiment_df['sentiment'] == 'Positive'].sample(3)['review'].tolist())
-
-print("\nExample Negative Reviews:")
-print(sentiment_df[sentiment_df['sentiment'] == 'Negative'].sample(3)['review'].tolist())
+def classify_sentiment(values):
+    values = np.asarray(values)
+    return np.select([values >= 0.05, values <= -0.05], ["Positive", "Negative"], default="Neutral")
+
+# === Stage API ===
+def analyze_sentiment(df, verbose=True, cache_dir=CACHE_DIR):
+    """Score and classify every review in `df`; returns one row per review."""
+    if not (USE_VADER or USE_TEXTBLOB):
+        raise ValueError("SENTIMENT_VADER=0 and SENTIMENT_TEXTBLOB=0 leave no analyzer to classify "
+                         "sentiment with; enable at least one")
+    text_col = text_column(df)
+    reviews = df.dropna(subset=[text_col])[text_col].tolist()
+    download_resources()
+
+    start = time.perf_counter()
+    sentiment_df, n_scored = score_reviews_cached(reviews, cache_dir)
+    elapsed = time.perf_counter() - start
+    if verbose:
+        print(f"Scored {n_scored} new reviews in {elapsed:.2f}s "
+              f"({n_scored / max(elapsed, 1e-9):,.0f} reviews/s)")
+
+    score_col = "vader_compound" if USE_VADER else "textblob_polarity"
+    sentiment_df["sentiment"] = classify_sentiment(sentiment_df[score_col])
+    return sentiment_df
+
+def plot_sentiment_distribution(sentiment_df, path=PLOT_FILE, show=False):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(6, 4))
+    sentiment_df["sentiment"].value_counts().plot(kind='bar', color=['green', 'red', 'gray'])
+    plt.title("Overall Sentiment Distribution")
+    plt.xlabel("Sentiment")
+    plt.ylabel("Number of Reviews")
+    plt.tight_layout()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    plt.savefig(path)
+    if show:
+        plt.show()
+    plt.close()
+
+def save_sentiment(sentiment_df, path=RESULTS_FILE):
+    """Write the results artifact; returns the file written."""
+    return write_artifact(sentiment_df, path)
+
+def main():
+    print("Loading cleaned reviews...")
+    df = read_artifact(DATA_FILE, columns=REVIEW_TEXT_COLUMNS)
+
+    print("Performing sentiment analysis...")
+    sentiment_df = analyze_sentiment(df)
+
+    # === Summary Statistics ===
+    print("\nSentiment Distribution:")
+    print(sentiment_df["sentiment"].value_counts())
+
+    # === Visualization ===
+    plot_sentiment_distribution(sentiment_df, show=True)
+
+    # === Save Sentiment Data ===
+    results_path = save_sentiment(sentiment_df)
+
+    print("\nSentiment analysis complete!")
+    print(f"Results saved to: {results_path} and results/sentiment_distribution.png")
+
+    # === Show Sample Output ===
+    print("\nExample Positive Reviews:")
+    print(sentiment_df[sentiment_df['sentiment'] == 'Positive'].sample(3)['review'].tolist())
+
+    print("\nExample Negative Reviews:")
+    print(sentiment_df[sentiment_df['sentiment'] == 'Negative'].sample(3)['review'].tolist())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+sketches.py
+-----------
+Bounded-memory frequency counters for very large vocabularies.
+
+SpaceSavingCounter keeps at most `capacity` items (Metwally et al.,
+"Efficient Computation of Frequent and Top-k Elements in Data Streams").
+When a new item arrives and the table is full, the item with the smallest
+count is replaced and the newcomer inherits that count as its error bound.
+Any item whose true frequency exceeds total / capacity is guaranteed to be
+kept, and reported counts overestimate by at most the stored error.
+
+It mirrors the parts of collections.Counter the analysis code uses
+(update, most_common, items), so either can be plugged in.
+"""
+
+import heapq
+
+
+class SpaceSavingCounter:
+    def __init__(self, capacity=10_000):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self._heap = []  # (count, item), may hold stale entries
+
+    def _push(self, item):
+        heapq.heappush(self._heap, (self.counts[item], item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(c, i) for i, c in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return count, item
+
+    def add(self, item, count=1):
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+        else:
+            min_count, evicted = self._pop_min()
+            del self.counts[evicted]
+            del self.errors[evicted]
+            self.counts[item] = min_count + count
+            self.errors[item] = min_count
+        self._push(item)
+
+    def update(self, items):
+        """Add an iterable of items, or a mapping of item -> count."""
+        if hasattr(items, "items"):
+            for item, count in items.items():
+                self.add(item, count)
+        else:
+            for item in items:
+                self.add(item)
+
+    def most_common(self, n=None):
+        ranked = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)
+        return ranked if n is None else ranked[:n]
+
+    def items(self):
+        return self.counts.items()
+
+    def error(self, item):
+        """Upper bound on how much `item`'s count is overestimated."""
+        return self.errors.get(item, 0)
+
+    def __len__(self):
+        return len(self.counts)
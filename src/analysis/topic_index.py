@@ -0,0 +1,121 @@
+"""
+topic_index.py
+--------------
+Per-review LSA topic weights written by topic_modeling.py, and lookups on them.
+
+Artifact in data/processed/lsa_doc_topics.npy: one record per review with
+1. id        int64 review ID (the row number of the review in cleaned_reviews.csv)
+2. weights   float32 (n_topics,) topic weights
+
+IDs and weights share one file, so a single rename publishes both and a
+reader can never pair weights with the IDs of another run. It is a plain
+.npy file, so it is memory-mapped on load and readers (dashboard, QA) can
+filter by topic without refitting the SVD. The older layout (weights here,
+IDs in lsa_doc_topic_ids.npy) is still read, with a row-count check.
+
+A review's dominant topic is the one where its weight stands out most
+against that topic's weights over all reviews (per-topic z-score). Raw LSA
+weights are not comparable across topics: the first component is the
+corpus-wide "general" direction, on which almost every review scores
+highest, so a raw argmax puts nearly everything in topic 1.
+"""
+
+import os
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PROCESSED_DIR = os.path.join(BASE_DIR, "data", "processed")
+MATRIX_FILE = "lsa_doc_topics.npy"
+IDS_FILE = "lsa_doc_topic_ids.npy"  # older two-file layout
+
+
+def _save_atomic(path, array):
+    tmp_path = path + ".tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def save_doc_topics(review_ids, topic_matrix, processed_dir=PROCESSED_DIR):
+    review_ids = np.asarray(review_ids, dtype=np.int64)
+    topic_matrix = np.asarray(topic_matrix, dtype=np.float32)
+    if len(review_ids) != topic_matrix.shape[0]:
+        raise ValueError("review_ids and topic_matrix must have the same number of rows")
+    records = np.empty(len(review_ids), dtype=[("id", np.int64), ("weights", np.float32, (topic_matrix.shape[1],))])
+    records["id"] = review_ids
+    records["weights"] = topic_matrix
+    os.makedirs(processed_dir, exist_ok=True)
+    _save_atomic(os.path.join(processed_dir, MATRIX_FILE), records)
+    # An IDs file from the older layout would no longer match
+    ids_path = os.path.join(processed_dir, IDS_FILE)
+    if os.path.exists(ids_path):
+        os.remove(ids_path)
+    return os.path.join(processed_dir, MATRIX_FILE)
+
+
+class TopicIndex:
+    def __init__(self, review_ids, topic_matrix):
+        self.review_ids = review_ids
+        self.topic_matrix = topic_matrix
+        self._dominant = None
+        self._positions = None
+
+    @property
+    def n_topics(self):
+        return self.topic_matrix.shape[1]
+
+    def row(self, review_id):
+        """Matrix row of a review ID (raises KeyError for unknown IDs)."""
+        if self._positions is None:
+            # IDs are row numbers, so a direct position table is small and dense
+            ids = np.asarray(self.review_ids)
+            self._positions = np.full(int(ids.max()) + 1 if len(ids) else 0, -1, dtype=np.int64)
+            self._positions[ids[::-1]] = np.arange(len(ids))[::-1]  # first row wins for repeated IDs
+        if not 0 <= review_id < len(self._positions) or self._positions[review_id] < 0:
+            raise KeyError(review_id)
+        return int(self._positions[review_id])
+
+    def weights(self, review_id):
+        """Topic weights of one review (raises KeyError for unknown IDs)."""
+        return np.asarray(self.topic_matrix[self.row(review_id)])
+
+    def dominant_topics(self):
+        """0-based dominant topic of every review (highest per-topic z-score), aligned to review_ids."""
+        if self._dominant is None:
+            weights = np.asarray(self.topic_matrix, dtype=np.float64)
+            if not len(weights):
+                return np.zeros(0, dtype=np.int64)
+            std = weights.std(axis=0)
+            self._dominant = ((weights - weights.mean(axis=0)) / np.where(std > 0, std, 1.0)).argmax(axis=1)
+        return self._dominant
+
+    def topic_counts(self):
+        """Number of reviews whose dominant topic is each topic."""
+        return np.bincount(self.dominant_topics(), minlength=self.n_topics)
+
+    def reviews_for_topic(self, topic, top_n=None, min_weight=None, dominant_only=False):
+        """Review IDs for a 0-based topic, strongest weight first."""
+        if not 0 <= topic < self.n_topics:
+            raise IndexError(f"topic {topic} out of range (0..{self.n_topics - 1})")
+        weights = np.asarray(self.topic_matrix[:, topic])
+        mask = np.ones(len(weights), dtype=bool)
+        if min_weight is not None:
+            mask &= weights >= min_weight
+        if dominant_only:
+            mask &= self.dominant_topics() == topic
+        rows = np.flatnonzero(mask)
+        rows = rows[np.argsort(-weights[rows], kind="stable")]
+        if top_n is not None:
+            rows = rows[:top_n]
+        return self.review_ids[rows], weights[rows]
+
+
+def load_topic_index(processed_dir=PROCESSED_DIR, mmap=True):
+    mode = "r" if mmap else None
+    records = np.load(os.path.join(processed_dir, MATRIX_FILE), mmap_mode=mode)
+    if records.dtype.names:
+        return TopicIndex(np.asarray(records["id"]), records["weights"])
+    review_ids = np.load(os.path.join(processed_dir, IDS_FILE))
+    if len(review_ids) != records.shape[0]:
+        raise ValueError(f"{IDS_FILE} has {len(review_ids)} rows but {MATRIX_FILE} has "
+                         f"{records.shape[0]}; rerun the topics stage")
+    return TopicIndex(review_ids, records)
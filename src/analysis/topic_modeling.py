@@ -1,44 +1,102 @@
 import pandas as pd
 import os
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.decomposition import TruncatedSVD
+import sys
 
 # === Project Root Path ===
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+from analysis.topic_index import save_doc_topics
+from analysis.artifacts import read_artifact, REVIEW_TEXT_COLUMNS
+from analysis import metrics
 
-# === Load Cleaned Reviews ===
-print("Loading cleaned reviews...")
-df = pd.read_csv(os.path.join(BASE_DIR, "data", "processed", "cleaned_reviews.csv"))
-
-text_col = "Cleaned_Review" if "Cleaned_Review" in df.columns else "cleaned_text"
-df = df.dropna(subset=[text_col])
-reviews = df[text_col].tolist()
-
-# === TF-IDF Vectorization ===
-print("Creating TF-IDF matrix...")
-vectorizer = TfidfVectorizer(max_features=2000, stop_words='english')
-tfidf_matrix = vectorizer.fit_transform(reviews)
-
-# === LSA (TruncatedSVD) ===
-print("Performing Topic Modeling (LSA)...")
-n_topics = 5  # number of topics you want to extract
-lsa_model = TruncatedSVD(n_components=n_topics, random_state=42)
-lsa_topic_matrix = lsa_model.fit_transform(tfidf_matrix)
-
-# === Top Keywords per Topic ===
-terms = vectorizer.get_feature_names_out()
-topics = []
-print("\n=== Top Words per Topic ===")
-for i, comp in enumerate(lsa_model.components_):
-    terms_in_topic = [terms[idx] for idx in comp.argsort()[-10:][::-1]]
-    print(f"Topic {i+1}: {', '.join(terms_in_topic)}")
-    topics.append(terms_in_topic)
-
-# === Save Topic Results ===
-os.makedirs(os.path.join(BASE_DIR, "data", "processed"), exist_ok=True)
-topics_df = pd.DataFrame(topics).transpose()
-topics_df.columns = [f"Topic_{i+1}" for i in range(n_topics)]
+data_path = os.path.join(BASE_DIR, "data", "processed", "cleaned_reviews.csv")
 topics_path = os.path.join(BASE_DIR, "data", "processed", "lsa_topics.csv")
-topics_df.to_csv(topics_path, index=False)
 
-print(f"\nTopics saved to: {topics_path}")
+# "batch" refits from scratch every run; "online" folds new reviews into the saved basis
+TOPIC_MODE = os.environ.get("TOPIC_MODE", "batch")
+N_TOPICS = 5  # number of topics you want to extract
+TOP_WORDS = 10
+
+
+def text_column(df):
+    return "Cleaned_Review" if "Cleaned_Review" in df.columns else "cleaned_text"
+
+
+# === Stage API ===
+def fit_topics(df, n_topics=N_TOPICS, mode=TOPIC_MODE, verbose=True, state_dir=None):
+    """LSA topics for the reviews in `df`.
+
+    Returns (topics_df, review_ids, lsa_topic_matrix): the top words per topic
+    (one Topic_i column each), the `df` index of every scored review, and the
+    per-review topic weights aligned to those IDs. `state_dir` overrides
+    where online mode keeps its model.
+    """
+    text_col = text_column(df)
+    df = df.dropna(subset=[text_col])
+    reviews = df[text_col].tolist()
+
+    if mode == "online":
+        from analysis import online_lsa
+
+        # === Online LSA (incremental SVD updates) ===
+        state, action = online_lsa.update(reviews, n_topics, state_dir=state_dir or online_lsa.STATE_DIR)
+        if verbose:
+            print(f"Online LSA: {action} ({state['n_docs']} reviews in model)")
+        vectorizer, components = state["vectorizer"], state["components"]
+        lsa_topic_matrix = online_lsa.transform(state, reviews)
+    else:
+        from sklearn.decomposition import TruncatedSVD
+        from analysis.feature_store import load_tfidf
+
+        # === TF-IDF + LSA (TruncatedSVD) ===
+        vectorizer, tfidf_matrix = load_tfidf(reviews, max_features=2000)
+        lsa_model = TruncatedSVD(n_components=n_topics, random_state=42)
+        with metrics.measure("svd", items=tfidf_matrix.shape[0], mode="batch"):
+            lsa_topic_matrix = lsa_model.fit_transform(tfidf_matrix)
+        components = lsa_model.components_
+
+    # === Top Keywords per Topic ===
+    terms = vectorizer.get_feature_names_out()
+    topics = []
+    if verbose:
+        print("\n=== Top Words per Topic ===")
+    for i, comp in enumerate(components):
+        terms_in_topic = [terms[idx] for idx in comp.argsort()[-TOP_WORDS:][::-1]]
+        if verbose:
+            print(f"Topic {i+1}: {', '.join(terms_in_topic)}")
+        topics.append(terms_in_topic)
+
+    topics_df = pd.DataFrame(topics).transpose()
+    topics_df.columns = [f"Topic_{i+1}" for i in range(n_topics)]
+    return topics_df, df.index.to_numpy(), lsa_topic_matrix
+
+
+def save_topics(topics_df, review_ids, lsa_topic_matrix, processed_dir=None):
+    """Write lsa_topics.csv and the per-review topic weights (lsa_doc_topics.npy); returns both paths.
+
+    Files go next to topics_path unless `processed_dir` is given.
+    """
+    processed_dir = processed_dir or os.path.dirname(topics_path)
+    os.makedirs(processed_dir, exist_ok=True)
+    path = os.path.join(processed_dir, os.path.basename(topics_path))
+    topics_df.to_csv(path, index=False)
+    # Row numbers in cleaned_reviews.csv serve as review IDs
+    weights_path = save_doc_topics(review_ids, lsa_topic_matrix, processed_dir)
+    return path, weights_path
+
+
+def main():
+    print("Loading cleaned reviews...")
+    df = read_artifact(data_path, columns=REVIEW_TEXT_COLUMNS)
+
+    print(f"Performing Topic Modeling (LSA, {TOPIC_MODE})...")
+    topics_df, review_ids, lsa_topic_matrix = fit_topics(df)
+
+    # === Save Topic Results ===
+    topics_file, weights_file = save_topics(topics_df, review_ids, lsa_topic_matrix)
+    print(f"\nTopics saved to: {topics_file}")
+    print(f"Per-review topic weights saved to: {weights_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,114 @@
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 import os
+import sys
 
 # === PATH SETUP ===
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+from analysis.artifacts import read_artifact, REVIEW_TEXT_COLUMNS
+
 data_path = os.path.join(BASE_DIR, "data", "processed", "cleaned_reviews.csv")
+output_path = os.path.join(BASE_DIR, "data", "processed", "word_similarity.csv")
+
+# === Define Key Product Features to Explore ===
+TARGET_WORDS = ["camera", "battery", "screen", "performance", "price"]
+MAX_FEATURES = 3000
 
-print("🔹 Loading cleaned reviews...")
-df = pd.read_csv(data_path)
 
-text_col = "Cleaned_Review" if "Cleaned_Review" in df.columns else "cleaned_text"
-reviews = df[text_col].dropna().tolist()
+def text_column(df):
+    return "Cleaned_Review" if "Cleaned_Review" in df.columns else "cleaned_text"
 
-# === TF-IDF Vectorization ===
-print("🔹 Creating TF-IDF model...")
-vectorizer = TfidfVectorizer(max_features=3000, stop_words="english")
-tfidf_matrix = vectorizer.fit_transform(reviews)
-terms = vectorizer.get_feature_names_out()
 
-# Create a mapping of word → vector index
-word_vectors = {word: tfidf_matrix[:, i].toarray().flatten() for i, word in enumerate(terms)}
+# === Term Similarity Engine ===
+class TermSimilarity:
+    """Rows of the term-by-document matrix are L2-normalised once, so cosine
+    similarity for any batch of target words is a single sparse product."""
+
+    def __init__(self, vectorizer, tfidf_matrix):
+        from sklearn.preprocessing import normalize
+
+        self.terms = vectorizer.get_feature_names_out()
+        self.term_matrix = normalize(tfidf_matrix.T.tocsr(), norm="l2")
+        self.term_index = {word: i for i, word in enumerate(self.terms)}
+
+    @classmethod
+    def from_reviews(cls, reviews, max_features=MAX_FEATURES):
+        from analysis.feature_store import load_tfidf
+
+        return cls(*load_tfidf(reviews, max_features=max_features))
+
+    def _top_k(self, row, exclude, top_n):
+        """Top-n (index, score) pairs from one sparse similarity row, best first."""
+        mask = row.indices != exclude
+        indices, scores = row.indices[mask], row.data[mask]
+        # Round away float noise so equal similarities tie exactly
+        rounded = np.round(scores, 12)
+        if len(scores) > top_n:
+            kth = -np.partition(-rounded, top_n - 1)[top_n - 1]
+            keep = rounded >= kth  # keep boundary ties so vocabulary order decides
+            indices, scores, rounded = indices[keep], scores[keep], rounded[keep]
+        # Highest score first, ties in vocabulary order
+        order = np.lexsort((indices, -rounded))[:top_n]
+        pairs = list(zip(indices[order].tolist(), scores[order].tolist()))
+
+        # Pad with zero-similarity terms when the word co-occurs with too few others
+        if len(pairs) < top_n:
+            seen = set(indices.tolist()) | {exclude}
+            for i in range(self.term_matrix.shape[0]):
+                if len(pairs) >= top_n:
+                    break
+                if i not in seen:
+                    pairs.append((i, 0.0))
+        return pairs
+
+    def find_similar_words_batch(self, words, top_n=5):
+        """Return {word: [(similar_word, score), ...]} for every word in the vocabulary."""
+        found = [w for w in words if w in self.term_index]
+        if not found:
+            return {}
+        rows = [self.term_index[w] for w in found]
+        similarities = (self.term_matrix[rows] @ self.term_matrix.T).tocsr()
+        return {
+            word: [(self.terms[i], score) for i, score in self._top_k(similarities[j], rows[j], top_n)]
+            for j, word in enumerate(found)
+        }
+
+    def find_similar_words(self, word, top_n=5):
+        return self.find_similar_words_batch([word], top_n).get(word, [])
+
+
+# === Stage API ===
+def word_similarity(df, target_words=TARGET_WORDS, top_n=5, verbose=True):
+    """Similar words for each target word, as a Target/Similar_Word/Cosine_Similarity frame."""
+    reviews = df[text_column(df)].dropna().tolist()
+    engine = TermSimilarity.from_reviews(reviews)
+
+    results = []
+    similar_words = engine.find_similar_words_batch(target_words, top_n)
+    for target in target_words:
+        similar = similar_words.get(target, [])
+        if similar:
+            if verbose:
+                print(f"{target.upper()} → {[w for w, _ in similar]}")
+            for w, score in similar:
+                results.append({"Target": target, "Similar_Word": w, "Cosine_Similarity": round(score, 4)})
+        elif verbose:
+            print(f"{target.upper()} → Not found in vocabulary.")
+    return pd.DataFrame(results, columns=["Target", "Similar_Word", "Cosine_Similarity"])
+
+
+def main():
+    print("🔹 Loading cleaned reviews...")
+    df = read_artifact(data_path, columns=REVIEW_TEXT_COLUMNS)
+
+    print("\n🔹 Computing word similarities...\n")
+    similarity_df = word_similarity(df)
+
+    # === Save Results ===
+    similarity_df.to_csv(output_path, index=False)
+    print(f"\nSaved word similarity results to: {output_path}")
 
-# === Define Key Product Features to Explore ===
-target_words = ["camera", "battery", "screen", "performance", "price"]
-
-def find_similar_words(word, top_n=5):
-    if word not in word_vectors:
-        return []
-    similarities = {}
-    target_vec = word_vectors[word]
-    for w, vec in word_vectors.items():
-        if w == word:
-            continue
-        sim = cosine_similarity([target_vec], [vec])[0][0]
-        similarities[w] = sim
-    return sorted(similarities.items(), key=lambda x: x[1], reverse=True)[:top_n]
-
-# === Compute Similar Words ===
-results = []
-print("\n🔹 Computing word similarities...\n")
-for target in target_words:
-    similar = find_similar_words(target)
-    if similar:
-        print(f"{target.upper()} → {[w for w, _ in similar]}")
-        for w, score in similar:
-            results.append({"Target": target, "Similar_Word": w, "Cosine_Similarity": round(score, 4)})
-    else:
-        print(f"{target.upper()} → Not found in vocabulary.")
-
-# === Save Results ===
-output_path = os.path.join(BASE_DIR, "data", "processed", "word_similarity.csv")
-pd.DataFrame(results).to_csv(output_path, index=False)
 
-print(f"\nSaved word similarity results to: {output_path}")
+if __name__ == "__main__":
+    main()
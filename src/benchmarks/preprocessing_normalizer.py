@@ -0,0 +1,78 @@
+"""
+preprocessing_normalizer.py
+---------------------------
+Micro-benchmark of the text normalizer in clean_translate.py against the
+previous implementation (BeautifulSoup on every review, separate regex
+passes, separate stopword / lemmatization list comprehensions).
+
+Runs both over the bundled raw CSV, checks they produce identical output and
+reports time per review.
+
+Usage:
+    python src/benchmarks/preprocessing_normalizer.py [repeats]
+"""
+
+import os
+import re
+import sys
+import time
+import pandas as pd
+from bs4 import BeautifulSoup
+from nltk import word_tokenize
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+from preprocessing import clean_translate as ct
+
+RAW_FILE = os.path.join(BASE_DIR, "data", "raw", "Samsung_washing_machine_reviews.csv")
+
+
+# === Previous implementation ===
+
+def legacy_clean_text(text):
+    text = BeautifulSoup(text, "html.parser").get_text()
+    text = re.sub(r"http\S+|www\S+|https\S+", "", text, flags=re.MULTILINE)
+    text = re.sub(r"[^A-Za-z0-9\s]", "", text)
+    text = text.lower().strip()
+    return text
+
+
+def legacy_preprocess_text(text):
+    tokens = word_tokenize(text)
+    tokens = [t for t in tokens if t not in ct.stop_words]
+    tokens = [ct.lemmatizer.lemmatize(t) for t in tokens]
+    return " ".join(tokens)
+
+
+# === Benchmark ===
+
+def time_pass(clean, preprocess, reviews):
+    start = time.perf_counter()
+    out = [preprocess(clean(r)) for r in reviews]
+    return time.perf_counter() - start, out
+
+
+def main(repeats=5):
+    reviews = pd.read_csv(RAW_FILE)["Review"].astype(str).tolist()
+    ct.lemmatizer.lemmatize("warmup")  # exclude the one-off WordNet load
+
+    legacy_times, fast_times = [], []
+    for _ in range(repeats):
+        ct.lemmatize.cache_clear()  # every pass starts cold
+        t, legacy_out = time_pass(legacy_clean_text, legacy_preprocess_text, reviews)
+        legacy_times.append(t)
+        t, fast_out = time_pass(ct.clean_text, ct.preprocess_text, reviews)
+        fast_times.append(t)
+
+    mismatches = sum(a != b for a, b in zip(legacy_out, fast_out))
+    legacy_best, fast_best = min(legacy_times), min(fast_times)
+    print(f"Normalizer benchmark: {len(reviews)} reviews, best of {repeats}")
+    print(f"  legacy : {legacy_best * 1e6 / len(reviews):8.1f} µs/review")
+    print(f"  fast   : {fast_best * 1e6 / len(reviews):8.1f} µs/review")
+    print(f"  speedup: {legacy_best / fast_best:.2f}x")
+    print(f"  lemmatizer cache: {ct.lemmatize.cache_info()}")
+    print(f"  output mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
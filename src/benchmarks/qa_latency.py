@@ -0,0 +1,77 @@
+"""
+qa_latency.py
+-------------
+Compares QA retrieval latency of the saved inverted index (qa_index.py)
+against the brute-force path (cosine similarity over the full TF-IDF matrix
+followed by a full argsort).
+
+Questions are sampled from the review texts themselves, so every query hits
+the vocabulary. Reports p50/p99 latency in milliseconds and how often both
+paths agree on the top-ranked review.
+
+Usage:
+    python src/benchmarks/qa_latency.py [n_questions]
+"""
+
+import os
+import sys
+import time
+import random
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+from analysis.qa_index import load_qa_index
+
+TOP_N = 3
+
+
+def sample_questions(reviews, n, seed=42):
+    rng = random.Random(seed)
+    questions = []
+    while len(questions) < n:
+        words = rng.choice(reviews).split()
+        if len(words) < 3:
+            continue
+        start = rng.randrange(0, max(1, len(words) - 5))
+        questions.append(" ".join(words[start:start + rng.randint(3, 6)]))
+    return questions
+
+
+def percentiles(times):
+    ms = np.array(times) * 1000
+    return np.percentile(ms, 50), np.percentile(ms, 99)
+
+
+def main(n_questions=1000):
+    qa_index = load_qa_index()
+    tfidf_matrix = qa_index.postings.tocsr()
+    questions = sample_questions(qa_index.reviews, n_questions)
+    question_vecs = [qa_index.vectorizer.transform([q]) for q in questions]
+
+    brute_times, index_times, agree = [], [], 0
+    for vec in question_vecs:
+        start = time.perf_counter()
+        similarities = cosine_similarity(vec, tfidf_matrix).flatten()
+        brute_top = np.argsort(similarities)[-TOP_N:][::-1]
+        brute_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        index_top, _ = qa_index.search_vector(vec, TOP_N)
+        index_times.append(time.perf_counter() - start)
+
+        if len(index_top) and np.isclose(similarities[index_top[0]], similarities[brute_top[0]]):
+            agree += 1
+
+    print(f"QA retrieval latency over {n_questions} questions "
+          f"({tfidf_matrix.shape[0]} reviews, {tfidf_matrix.shape[1]} terms)")
+    print(f"{'Path':<12}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+    for name, times in [("brute-force", brute_times), ("index", index_times)]:
+        p50, p99 = percentiles(times)
+        print(f"{name:<12}{p50:>12.3f}{p99:>12.3f}")
+    print(f"Top-1 score agreement: {agree}/{n_questions}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,339 @@
+"""
+run_benchmarks.py
+-----------------
+Times each stage on synthetic corpora (see synthetic_corpus.py) and compares
+the results against a saved baseline.
+
+Each (stage, size) runs in a fresh process, so peak RSS and in-memory caches
+are per benchmark. Only the stage's own work is timed; loading the corpus
+and building inputs that belong to another stage (e.g. the TF-IDF store
+for LSA) happen before the clock starts. Stages:
+
+    preprocess       preprocess_reviews on the raw corpus
+    sentiment        analyze_sentiment with a cold score cache
+    tfidf            build_feature_store
+    similarity       TermSimilarity + find_similar_words for TARGET_WORDS
+    lsa              fit_topics (batch)
+    summarization    summarize (KMeans, SUMMARY_MODE)
+    qa_index         build_qa_index
+    answer_question  answer_question for QUESTIONS on a loaded index
+
+Results go to data/benchmarks/history.jsonl; sub-step metrics from the stages
+(analysis/metrics.py) go to data/benchmarks/metrics.jsonl. A stage whose
+best wall time is more than --threshold slower than the baseline is flagged
+and the run exits with status 1.
+
+No baseline is shipped, since timings only compare on the same machine.
+Record one first with --update-baseline (per size; other entries are kept),
+then later runs are compared against it:
+
+    python src/benchmarks/run_benchmarks.py --sizes 10k 100k --update-baseline
+    python src/benchmarks/run_benchmarks.py --sizes 10k 100k [--stages lsa summarization]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+from contextlib import contextmanager, redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(BASE_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic_corpus import SEED, generate_corpus, parse_size, size_label
+
+# === Settings ===
+BENCH_DIR = os.path.join(BASE_DIR, "data", "benchmarks")
+WORK_DIR = os.path.join(BENCH_DIR, "work")
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+HISTORY_FILE = os.path.join(BENCH_DIR, "history.jsonl")
+METRICS_FILE = os.path.join(BENCH_DIR, "metrics.jsonl")
+THRESHOLD = 0.25  # flag stages more than 25% slower than the baseline
+MIN_SECONDS = 0.05  # baseline times below this are too noisy to compare
+QUESTIONS = [
+    "How is the washing performance?",
+    "Is the machine noisy?",
+    "How is the installation service?",
+    "Is it value for money?",
+    "How good is the build quality?",
+    "Does the dryer work well?",
+    "How much water does it use?",
+    "Is the delivery fast?",
+]
+
+
+# === Benchmarks (run in a fresh worker process each) ===
+
+def _cleaned(corpus):
+    from analysis.artifacts import read_artifact
+
+    return read_artifact(corpus["cleaned"])
+
+
+def _prepare_features(df):
+    """Build the TF-IDF store untimed, then drop it from memory so the stage loads it as usual."""
+    from analysis import feature_store
+
+    feature_store.build_feature_store(df["Cleaned_Review"].dropna().tolist())
+    feature_store._loaded.clear()
+
+
+def bench_preprocess(corpus, work_dir, timer):
+    from preprocessing import clean_translate
+
+    with timer(items=corpus["size"]):
+        clean_translate.preprocess_reviews(corpus["raw"], os.path.join(work_dir, "cleaned_reviews.csv"))
+
+
+def bench_sentiment(corpus, work_dir, timer):
+    from analysis import sentiment_analysis
+
+    df = _cleaned(corpus)
+    with timer(items=len(df)):
+        sentiment_analysis.analyze_sentiment(df, verbose=False, cache_dir=os.path.join(work_dir, "sentiment_cache"))
+
+
+def bench_tfidf(corpus, work_dir, timer):
+    from analysis import feature_store
+
+    reviews = _cleaned(corpus)["Cleaned_Review"].dropna().tolist()
+    with timer(items=len(reviews)):
+        feature_store.build_feature_store(reviews, store_dir=os.path.join(work_dir, "tfidf"))
+
+
+def bench_similarity(corpus, work_dir, timer):
+    from analysis import vector_semantics
+
+    df = _cleaned(corpus)
+    _prepare_features(df)
+    words = vector_semantics.TARGET_WORDS
+    with timer(items=len(words)):
+        similarity = vector_semantics.TermSimilarity.from_reviews(df["Cleaned_Review"].dropna().tolist())
+        for word in words:
+            similarity.find_similar_words(word)
+
+
+def bench_lsa(corpus, work_dir, timer):
+    from analysis import topic_modeling
+
+    df = _cleaned(corpus)
+    _prepare_features(df)
+    with timer(items=len(df)):
+        topic_modeling.fit_topics(df, mode="batch", verbose=False)
+
+
+def bench_summarization(corpus, work_dir, timer):
+    from summarization import review_summarization
+
+    df = _cleaned(corpus)
+    _prepare_features(df)
+    with timer(items=len(df)):
+        review_summarization.summarize(df, verbose=False)
+
+
+def bench_qa_index(corpus, work_dir, timer):
+    from analysis import qa_index
+
+    df = _cleaned(corpus)
+    _prepare_features(df)
+    with timer(items=len(df)):
+        qa_index.build_qa_index(corpus["cleaned"], os.path.join(work_dir, "qa_index"))
+
+
+def bench_answer_question(corpus, work_dir, timer):
+    from analysis import qa_index, question_answering
+
+    _prepare_features(_cleaned(corpus))
+    question_answering.qa_index = qa_index.load_qa_index(corpus["cleaned"], os.path.join(work_dir, "qa_index"))
+    with timer(items=len(QUESTIONS)):
+        for question in QUESTIONS:
+            question_answering.answer_question(question)
+
+
+BENCHMARKS = {
+    "preprocess": bench_preprocess,
+    "sentiment": bench_sentiment,
+    "tfidf": bench_tfidf,
+    "similarity": bench_similarity,
+    "lsa": bench_lsa,
+    "summarization": bench_summarization,
+    "qa_index": bench_qa_index,
+    "answer_question": bench_answer_question,
+}
+# Outputs a stage writes under its work dir; removed before each repeat so no run is a cache hit
+FRESH_OUTPUTS = {"sentiment": "sentiment_cache", "tfidf": "tfidf", "qa_index": "qa_index"}
+
+
+def run_benchmark(stage, corpus, repeat):
+    """Worker entry point: run one stage `repeat` times; returns the timing summary."""
+    from analysis import metrics
+
+    metrics.set_stage(f"bench:{stage}@{size_label(corpus['size'])}")
+    work_dir = os.path.join(WORK_DIR, f"{size_label(corpus['size'])}-{corpus['seed']}")
+    os.makedirs(work_dir, exist_ok=True)
+    runs = []
+
+    @contextmanager
+    def timer(items):
+        wall, cpu = time.perf_counter(), metrics.cpu_seconds()
+        yield
+        runs.append({"wall_s": time.perf_counter() - wall, "cpu_s": metrics.cpu_seconds() - cpu, "items": items})
+
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        for _ in range(repeat):
+            if stage in FRESH_OUTPUTS:
+                shutil.rmtree(os.path.join(work_dir, FRESH_OUTPUTS[stage]), ignore_errors=True)
+            BENCHMARKS[stage](corpus, work_dir, timer)
+
+    walls = sorted(r["wall_s"] for r in runs)
+    best = min(runs, key=lambda r: r["wall_s"])
+    return {
+        "wall_s": round(best["wall_s"], 4),
+        "median_wall_s": round(walls[len(walls) // 2], 4),
+        "cpu_s": round(best["cpu_s"], 4),
+        "peak_rss_mb": metrics.peak_rss_mb(),
+        "items": best["items"],
+        "items_per_s": round(best["items"] / best["wall_s"], 1) if best["wall_s"] > 0 else None,
+        "repeat": repeat,
+    }
+
+
+def init_worker(feature_dir):
+    # Benchmark artifacts and caches stay out of data/processed
+    os.environ["FEATURE_STORE_DIR"] = feature_dir
+    os.environ["METRICS_FILE"] = METRICS_FILE
+    os.environ["TRANSLATION_CACHE"] = os.path.join(WORK_DIR, "translation_cache.sqlite")
+    os.environ.setdefault("TRANSLATION_BACKEND", "identity")  # no network calls in timings
+    os.environ.setdefault("MPLBACKEND", "Agg")
+
+
+# === Baseline ===
+
+def benchmark_key(stage, size):
+    return f"{stage}@{size_label(size)}"
+
+
+def load_baseline(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(results, path=BASELINE_FILE):
+    """Merge `results` into the baseline file (other stages/sizes keep their entries)."""
+    baseline = load_baseline(path)
+    baseline.update({key: result for key, result in results.items() if "error" not in result})
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """{key: (ratio, flagged)} for every result that has a comparable baseline."""
+    comparison = {}
+    for key, result in results.items():
+        base = baseline.get(key)
+        if "error" in result or not base or base["wall_s"] < MIN_SECONDS:
+            continue
+        ratio = result["wall_s"] / base["wall_s"]
+        comparison[key] = (ratio, ratio > 1 + threshold)
+    return comparison
+
+
+def machine_info():
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), "processor": platform.processor()}
+
+
+# === Runner ===
+
+def run_benchmarks(sizes, stages=None, repeat=1, seed=SEED, threshold=THRESHOLD,
+                   baseline_file=BASELINE_FILE, update_baseline=False):
+    """Run every stage on every size; returns ({key: result}, {key: (ratio, flagged)})."""
+    from analysis import metrics
+
+    stages = stages or list(BENCHMARKS)
+    run = metrics.new_run()
+    results = {}
+    context = mp.get_context("spawn")
+    for size in map(parse_size, sizes):
+        print(f"\n=== {size_label(size)} reviews ===")
+        corpus = {**generate_corpus(size, seed), "size": size, "seed": seed}
+        feature_dir = os.path.join(WORK_DIR, f"{size_label(size)}-{seed}", "features")
+        for stage in stages:
+            key = benchmark_key(stage, size)
+            with ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=init_worker,
+                                     initargs=(feature_dir,)) as pool:
+                try:
+                    results[key] = pool.submit(run_benchmark, stage, corpus, repeat).result()
+                except Exception as e:  # a stage that cannot run here must not stop the others
+                    results[key] = {"error": f"{type(e).__name__}: {' '.join(str(e).split())}"[:200]}
+            result = results[key]
+            if "error" in result:
+                print(f"✖  {key}: {result['error']}")
+            else:
+                print(f"✔  {key}: {result['wall_s']:.3f}s ({result['items_per_s'] or 0:,.0f} items/s, "
+                      f"peak {result['peak_rss_mb'] or 0:,.0f} MB)")
+
+    baseline = load_baseline(baseline_file)
+    comparison = compare(results, baseline, threshold)
+    print_results(results, baseline, comparison, threshold)
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    with open(HISTORY_FILE, "a", encoding="utf-8") as f:
+        for key, result in results.items():
+            f.write(json.dumps({"run_id": run, "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "benchmark": key,
+                                "seed": seed, "machine": machine_info(), **result}) + "\n")
+    if update_baseline:
+        save_baseline(results, baseline_file)
+        print(f"\nBaseline updated: {baseline_file}")
+    return results, comparison
+
+
+def print_results(results, baseline, comparison, threshold=THRESHOLD):
+    print("\n=== Benchmark Results ===")
+    print(f"{'benchmark':<28}{'wall s':>10}{'baseline s':>12}{'change':>9}  status")
+    for key, result in results.items():
+        if "error" in result:
+            print(f"{key:<28}{'-':>10}{'-':>12}{'-':>9}  error")
+            continue
+        base = baseline.get(key, {}).get("wall_s")
+        ratio, flagged = comparison.get(key, (None, False))
+        change = f"{ratio - 1:+.0%}" if ratio is not None else "-"
+        base = f"{base:.3f}" if base is not None else "-"
+        status = "REGRESSION" if flagged else ("ok" if ratio is not None else "no baseline")
+        print(f"{key:<28}{result['wall_s']:>10.3f}{base:>12}{change:>9}  {status}")
+    flagged = [key for key, (_, bad) in comparison.items() if bad]
+    if flagged:
+        print(f"\n{len(flagged)} benchmark(s) more than {threshold:.0%} slower than baseline: {', '.join(flagged)}")
+    if not baseline:
+        print("\nNo baseline yet, so nothing was compared; rerun with --update-baseline to record one.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic corpora")
+    parser.add_argument("--sizes", nargs="+", default=["10k"], help="corpus sizes, e.g. 10k 100k 1m")
+    parser.add_argument("--stages", nargs="+", choices=list(BENCHMARKS), help="default: all")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per benchmark; the fastest counts")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slowdown, e.g. 0.25")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true", help="save these results as the baseline")
+    args = parser.parse_args()
+
+    _, comparison = run_benchmarks(args.sizes, args.stages, max(1, args.repeat), args.seed,
+                                   args.threshold, args.baseline, args.update_baseline)
+    sys.exit(1 if any(flagged for _, flagged in comparison.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+synthetic_corpus.py
+-------------------
+Synthetic review corpora at benchmark scale, seeded from the bundled data.
+
+A small per-rating model is fitted on the bundled reviews:
+1. the rating distribution,
+2. per rating: word frequencies (mixed with the overall frequencies, so rare
+   ratings still have a full vocabulary), review lengths and titles.
+Reviews are then sampled from it. A small share of tokens (TYPO_RATE) is
+turned into new misspellings, so the vocabulary keeps growing with corpus
+size the way real review text does.
+
+Two corpora are written per size, under data/benchmarks/corpora/<size>-<seed>/:
+- raw_reviews.csv      (Rating, Title, Review) from the raw reviews, the
+                       input of preprocess_reviews
+- cleaned_reviews      (Rating, Title, Cleaned_Review) from the cleaned
+                       reviews, the input of every analysis stage, stored
+                       through analysis/artifacts.py
+A corpus is reused while its meta.json matches (size, seed, generator
+version, seed-data hash).
+
+    python src/benchmarks/synthetic_corpus.py 10k 100k 1m [--seed 42]
+"""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+from collections import Counter
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+from analysis.artifacts import ArtifactWriter, artifact_files, read_artifact
+
+# === Settings ===
+RAW_SEED_FILE = os.path.join(BASE_DIR, "data", "raw", "Samsung_washing_machine_reviews.csv")
+CLEANED_SEED_FILE = os.path.join(BASE_DIR, "data", "processed", "cleaned_reviews.csv")
+CORPORA_DIR = os.path.join(BASE_DIR, "data", "benchmarks", "corpora")
+GENERATOR_VERSION = 1
+SEED = 42
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+CHUNK_SIZE = 100_000  # reviews generated and written at a time
+RATING_MIX = 0.5  # weight of the rating's own word frequencies vs the overall ones
+TYPO_RATE = 0.01
+
+
+def parse_size(size):
+    """10_000 from "10k", "10000" or 10000."""
+    if isinstance(size, int):
+        return size
+    key = str(size).lower().replace("_", "")
+    if key in SIZES:
+        return SIZES[key]
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(key[-1], 1)
+    return int(float(key.rstrip("km")) * multiplier)
+
+
+def size_label(n):
+    for label, value in SIZES.items():
+        if value == n:
+            return label
+    return str(n)
+
+
+class CorpusModel:
+    """Rating-conditioned unigram model of review text."""
+
+    def __init__(self, ratings, rating_probs, vocab, word_probs, lengths, titles):
+        self.ratings = ratings            # distinct ratings
+        self.rating_probs = rating_probs  # P(rating)
+        self.vocab = vocab                # object array of words
+        self.word_probs = word_probs      # {rating: P(word | rating)}
+        self.lengths = lengths            # {rating: observed review lengths in words}
+        self.titles = titles              # {rating: observed titles}
+
+    @classmethod
+    def fit(cls, df, text_col):
+        df = df.dropna(subset=[text_col])
+        df = df.assign(Rating=pd.to_numeric(df["Rating"], errors="coerce")).dropna(subset=["Rating"])
+        df["Rating"] = df["Rating"].astype(int)
+        tokens = df[text_col].astype(str).str.split()
+
+        overall = Counter(word for words in tokens for word in words)
+        vocab = np.array(sorted(overall), dtype=object)
+        index = {word: i for i, word in enumerate(vocab)}
+        overall_probs = np.array([overall[w] for w in vocab], dtype=float)
+        overall_probs /= overall_probs.sum()
+
+        rating_counts = df["Rating"].value_counts().sort_index()
+        word_probs, lengths, titles = {}, {}, {}
+        for rating in rating_counts.index:
+            mask = (df["Rating"] == rating).to_numpy()
+            counts = np.zeros(len(vocab))
+            for words in tokens[mask]:
+                for word in words:
+                    counts[index[word]] += 1
+            own = counts / counts.sum() if counts.sum() else overall_probs
+            word_probs[rating] = RATING_MIX * own + (1 - RATING_MIX) * overall_probs
+            lengths[rating] = np.maximum(tokens[mask].str.len().to_numpy(), 1)
+            titles[rating] = df.loc[mask, "Title"].fillna("").astype(str).to_numpy(dtype=object)
+        return cls(rating_counts.index.to_numpy(), (rating_counts / rating_counts.sum()).to_numpy(),
+                   vocab, word_probs, lengths, titles)
+
+    def sample(self, n, rng, text_col):
+        """DataFrame of `n` synthetic reviews with Rating, Title and `text_col`."""
+        ratings = rng.choice(self.ratings, size=n, p=self.rating_probs)
+        titles = np.empty(n, dtype=object)
+        texts = np.empty(n, dtype=object)
+        for rating in self.ratings:
+            rows = np.flatnonzero(ratings == rating)
+            if not len(rows):
+                continue
+            titles[rows] = rng.choice(self.titles[rating], size=len(rows))
+            lengths = rng.choice(self.lengths[rating], size=len(rows))
+            words = self.vocab[rng.choice(len(self.vocab), size=int(lengths.sum()), p=self.word_probs[rating])]
+            self._add_typos(words, rng)
+            ends = np.cumsum(lengths)
+            texts[rows] = [" ".join(words[end - length:end]) for end, length in zip(ends, lengths)]
+        return pd.DataFrame({"Rating": ratings, "Title": titles, text_col: texts})
+
+    @staticmethod
+    def _add_typos(words, rng):
+        """Misspell TYPO_RATE of the words in place (drop or double one letter)."""
+        for i in np.flatnonzero(rng.random(len(words)) < TYPO_RATE):
+            word = words[i]
+            if len(word) < 3:
+                continue
+            pos = int(rng.integers(1, len(word)))
+            if rng.random() < 0.5:
+                words[i] = word[:pos] + word[pos + 1:]
+            else:
+                words[i] = word[:pos] + word[pos] + word[pos:]
+
+
+def seed_hash():
+    h = hashlib.sha256()
+    for path in [RAW_SEED_FILE] + artifact_files(CLEANED_SEED_FILE):
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+def corpus_paths(n, seed=SEED, corpora_dir=CORPORA_DIR):
+    corpus_dir = os.path.join(corpora_dir, f"{size_label(n)}-{seed}")
+    return {
+        "dir": corpus_dir,
+        "raw": os.path.join(corpus_dir, "raw_reviews.csv"),
+        "cleaned": os.path.join(corpus_dir, "cleaned_reviews.csv"),
+        "meta": os.path.join(corpus_dir, "meta.json"),
+    }
+
+
+def generate_corpus(n, seed=SEED, corpora_dir=CORPORA_DIR, force=False):
+    """Write (or reuse) the raw and cleaned corpora of `n` reviews; returns their paths."""
+    paths = corpus_paths(n, seed, corpora_dir)
+    meta = {"version": GENERATOR_VERSION, "size": n, "seed": seed, "seed_hash": seed_hash(),
+            "typo_rate": TYPO_RATE, "rating_mix": RATING_MIX}
+    if not force and os.path.exists(paths["meta"]):
+        with open(paths["meta"], encoding="utf-8") as f:
+            if json.load(f) == meta:
+                return paths
+
+    os.makedirs(paths["dir"], exist_ok=True)
+    if os.path.exists(paths["meta"]):
+        os.remove(paths["meta"])  # the corpus is incomplete until meta.json is back
+    raw_model = CorpusModel.fit(pd.read_csv(RAW_SEED_FILE), "Review")
+    cleaned_model = CorpusModel.fit(read_artifact(CLEANED_SEED_FILE, columns=["Rating", "Title", "Cleaned_Review"]),
+                                    "Cleaned_Review")
+    # Separate streams, so each corpus is the same whatever the chunk size
+    raw_rng, cleaned_rng = (np.random.default_rng([seed, stream]) for stream in (0, 1))
+
+    raw_tmp = paths["raw"] + ".tmp"
+    with ArtifactWriter(paths["cleaned"]) as cleaned_out:
+        for start in range(0, n, CHUNK_SIZE):
+            count = min(CHUNK_SIZE, n - start)
+            raw_model.sample(count, raw_rng, "Review").to_csv(
+                raw_tmp, mode="a" if start else "w", header=not start, index=False, encoding="utf-8")
+            cleaned_out.write(cleaned_model.sample(count, cleaned_rng, "Cleaned_Review"))
+            print(f"Generated {start + count}/{n} reviews...")
+        cleaned_out.close(columns=["Rating", "Title", "Cleaned_Review"])
+    os.replace(raw_tmp, paths["raw"])
+
+    with open(paths["meta"], "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic review corpora for benchmarks")
+    parser.add_argument("sizes", nargs="*", default=["10k"], help="e.g. 10k 100k 1m or a number")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--force", action="store_true", help="regenerate even if the corpus exists")
+    args = parser.parse_args()
+    for size in args.sizes:
+        paths = generate_corpus(parse_size(size), args.seed, force=args.force)
+        print(f"{size}: {paths['dir']}")
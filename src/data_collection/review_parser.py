@@ -0,0 +1,154 @@
+"""
+review_parser.py
+----------------
+Offline parsing of Flipkart review pages, kept apart from fetching so it can
+be run against saved HTML (e.g. a page saved from the browser):
+
+    python src/data_collection/review_parser.py saved_page.html
+
+EXTRACT_SCRIPT is the in-browser equivalent: injected once per page, it
+expands every review and returns the same rows as JSON. Also holds the URL
+helpers the scraper uses to address products and pages.
+"""
+
+import re
+import sys
+import json
+from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+import soupsieve
+from bs4 import BeautifulSoup
+
+# === Selectors (Flipkart review page markup) ===
+CARD_SELECTOR = "div.col.EPCmJX.Ma1fCG"
+RATING_SELECTOR = "div.XQDdHH"
+TITLE_SELECTOR = "p.z9E0IG"
+REVIEW_SELECTOR = "div.ZmyHeo > div > div"
+READ_MORE_SELECTOR = "span.b4x-fr"
+NEXT_TEXT = "Next"
+
+COLUMNS = ["Rating", "Title", "Review"]
+
+# Compiled once at import instead of on every select() call
+_CARD = soupsieve.compile(CARD_SELECTOR)
+_RATING = soupsieve.compile(RATING_SELECTOR)
+_TITLE = soupsieve.compile(TITLE_SELECTOR)
+_REVIEW = soupsieve.compile(REVIEW_SELECTOR)
+_READ_MORE = soupsieve.compile(READ_MORE_SELECTOR)
+
+
+def _text(element):
+    return element.get_text().strip() if element is not None else ""
+
+
+def _soup(html):
+    return BeautifulSoup(html, "html.parser") if isinstance(html, str) else html
+
+
+def parse_reviews(html):
+    """Return [{"Rating", "Title", "Review"}, ...] for every review card on the page."""
+    reviews = []
+    for card in _CARD.select(_soup(html)):
+        review = _REVIEW.select_one(card)
+        text = ""
+        if review is not None:
+            for read_more in _READ_MORE.select(review):
+                read_more.decompose()
+            # Line breaks as the browser's innerText renders them
+            for br in review.find_all("br"):
+                br.replace_with("\n")
+            text = review.get_text().replace("READ MORE", "").strip()
+        if text:
+            reviews.append({
+                "Rating": _text(_RATING.select_one(card)),
+                "Title": _text(_TITLE.select_one(card)),
+                "Review": text,
+            })
+    return reviews
+
+
+def has_next_page(html):
+    return any(span.get_text(strip=True) == NEXT_TEXT for span in _soup(html).find_all("span"))
+
+
+def parse_page(html):
+    """(reviews, has_next) from a single parse of the page."""
+    soup = _soup(html)
+    return parse_reviews(soup), has_next_page(soup)
+
+
+# === In-browser extraction ===
+# Run with execute_async_script: clicks every "Read More", waits (up to
+# arguments[0] ms) for the expanded text to render, then returns
+# {"reviews": [...], "has_next": bool} as one JSON string, so a page costs
+# a single WebDriver round trip however many cards it has.
+EXTRACT_SCRIPT = """
+const done = arguments[arguments.length - 1];
+const timeoutMs = arguments[0];
+const sel = %s;
+const text = el => el ? el.innerText.trim() : "";
+document.querySelectorAll(sel.card + " " + sel.readMore).forEach(b => b.click());
+const started = Date.now();
+(function collect() {
+    if (document.querySelector(sel.card + " " + sel.readMore) && Date.now() - started < timeoutMs) {
+        return setTimeout(collect, 50);
+    }
+    const reviews = [];
+    document.querySelectorAll(sel.card).forEach(card => {
+        const body = card.querySelector(sel.review);
+        const review = body ? body.innerText.replace(/READ MORE/g, "").trim() : "";
+        if (review) {
+            reviews.push({Rating: text(card.querySelector(sel.rating)),
+                          Title: text(card.querySelector(sel.title)), Review: review});
+        }
+    });
+    const hasNext = Array.from(document.querySelectorAll("span"))
+        .some(span => span.textContent.trim() === sel.next);
+    done(JSON.stringify({reviews: reviews, has_next: hasNext}));
+})();
+""" % json.dumps({
+    "card": CARD_SELECTOR, "rating": RATING_SELECTOR, "title": TITLE_SELECTOR,
+    "review": REVIEW_SELECTOR, "readMore": READ_MORE_SELECTOR, "next": NEXT_TEXT,
+})
+
+
+def load_extracted(payload):
+    """(reviews, has_next) from the JSON string EXTRACT_SCRIPT returns."""
+    data = json.loads(payload)
+    reviews = [{c: str(r.get(c, "")) for c in COLUMNS} for r in data.get("reviews", [])]
+    return reviews, bool(data.get("has_next"))
+
+
+# === URL helpers ===
+
+def product_id(url):
+    """Stable ID for a product URL: the pid query parameter, else the itm... path segment."""
+    parts = urlparse(url)
+    pid = parse_qs(parts.query).get("pid")
+    if pid:
+        return pid[0]
+    match = re.search(r"/(itm[0-9a-z]+)", parts.path)
+    if match:
+        return match.group(1)
+    return re.sub(r"[^A-Za-z0-9]+", "_", parts.path).strip("_") or parts.netloc
+
+
+def page_url(url, page):
+    """`url` with its page query parameter set to `page`."""
+    parts = urlparse(url)
+    query = parse_qs(parts.query)
+    query["page"] = [str(page)]
+    return urlunparse(parts._replace(query=urlencode(query, doseq=True)))
+
+
+def host(url):
+    return urlparse(url).netloc
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        reviews, has_next = parse_page(html)
+        print(f"{path}: {len(reviews)} reviews, next page: {has_next}")
+        for review in reviews[:5]:
+            print(f"  [{review['Rating']}] {review['Title']}: {review['Review'][:100]}")
@@ -1,124 +1,326 @@
+"""
+scrape.py
+---------
+Concurrent Flipkart review scraper.
+
+1. Takes a list of product review URLs (--urls-file, one per line, or
+   positional arguments; defaults to the Samsung washing machine page).
+2. A bounded pool of headless Chrome workers scrapes products side by side;
+   each worker owns one driver and walks its product page by page via the
+   page= query parameter.
+3. Requests to the same host are spaced by at least MIN_INTERVAL seconds
+   (plus jitter) across all workers, instead of fixed sleeps per page.
+4. Each page's reviews are appended to the product's partition,
+   data/products/<product_id>/raw/reviews.csv (see src/products.py), as
+   soon as it is parsed. scrape_checkpoint.json records the last finished
+   page and the file size after it, so an interrupted crawl resumes from the
+   next page (anything written after the checkpoint is truncated).
+5. Each page is read in one WebDriver round trip. By default
+   (--extract js) review_parser.EXTRACT_SCRIPT runs in the browser, expands
+   every review and returns all rows as one JSON payload; --extract html
+   instead parses driver.page_source locally with precompiled selectors,
+   which also works offline against saved pages.
+"""
+
+import os
 import csv
+import sys
+import json
 import time
 import random
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-import os
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from review_parser import COLUMNS, CARD_SELECTOR, READ_MORE_SELECTOR, EXTRACT_SCRIPT, \
+    parse_page, load_extracted, product_id, page_url, host
 
 # === CONFIGURATION ===
-CHROMEDRIVER_PATH = r"C:\Users\Ketan Agrawal\Downloads\chromedriver-win64\chromedriver.exe"
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 URL = "https://www.flipkart.com/samsung-9-kg-5-star-ai-ecobubble-super-speed-wi-fi-hygiene-steam-digital-inverter-motor-fully-automatic-front-load-washing-machine-in-built-heater-grey/product-reviews/itm6c8a617aef39c?pid=WMNH7SPNGXDGUKVE&lid=LSTWMNH7SPNGXDGUKVEZAHO0B&marketplace=FLIPKART"
-OUTPUT_FILE = os.path.join("flipkart_product-review-analysis\data", "raw", "Samsung_washing_machine_reviews.csv")
-TARGET_COUNT = 500
-
-# === BROWSER SETUP ===
-options = Options()
-options.add_argument("--start-maximized")
-options.add_argument("--disable-blink-features=AutomationControlled")
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-dev-shm-usage")
-options.add_argument("--disable-gpu")
-options.add_argument("--lang=en-US,en;q=0.9")
-options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-# options.add_argument("--headless")
-
-# Automatically download the correct ChromeDriver version
-driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-
-def scrape_flipkart_reviews():
-    print("Opening Flipkart reviews page...")
-    driver.get(URL)
-
-    WebDriverWait(driver, 25).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, "div.ZmyHeo"))
-    )
-    time.sleep(2)
-
-    reviews_data = []
-    page = 1
-
-    while len(reviews_data) < TARGET_COUNT:
-        print(f"\nScraping Page {page}... ({len(reviews_data)}/{TARGET_COUNT})")
-        time.sleep(random.uniform(2, 4))
-
-        # Re-fetch review blocks and buttons on the current page
-        review_blocks = driver.find_elements(By.CSS_SELECTOR, "div.col.EPCmJX.Ma1fCG")  # per-card wrapper
-        read_more_buttons = driver.find_elements(By.CSS_SELECTOR, "div.col.EPCmJX.Ma1fCG span.b4x-fr")
-
-        # Click all "Read More" buttons
-        for btn in read_more_buttons:
+OUTPUT_DIR = os.path.join(BASE_DIR, "data", "products")
+CHECKPOINT_FILE = os.path.join(OUTPUT_DIR, "scrape_checkpoint.json")
+TARGET_COUNT = 500  # reviews per product
+WORKERS = int(os.environ.get("SCRAPE_WORKERS", 3))
+MIN_INTERVAL = float(os.environ.get("SCRAPE_MIN_INTERVAL", 2.0))  # seconds between requests per host
+JITTER = 1.0
+PAGE_TIMEOUT = 25
+EXPAND_TIMEOUT = 3  # seconds to wait for "Read More" text to render
+EXTRACT_MODE = os.environ.get("SCRAPE_EXTRACT", "js")  # "js" or "html"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+
+# === Rate limiting ===
+
+class HostRateLimiter:
+    """Hands out request slots per host, at least `interval` (+ jitter) seconds apart."""
+
+    def __init__(self, interval=MIN_INTERVAL, jitter=JITTER):
+        self.interval = interval
+        self.jitter = jitter
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        key = host(url)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(key, now))
+            self._next_slot[key] = slot + self.interval + random.uniform(0, self.jitter)
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# === Checkpoint ===
+
+class Checkpoint:
+    """Per-product progress, rewritten atomically after every page."""
+
+    def __init__(self, path=CHECKPOINT_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.products = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.products = json.load(f)
+
+    def get(self, pid):
+        with self._lock:
+            return dict(self.products.get(pid, {}))
+
+    def update(self, pid, **fields):
+        with self._lock:
+            self.products.setdefault(pid, {}).update(fields)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.products, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+# === Output ===
+
+class ReviewSink:
+    """Append-only CSV for one product, flushed to disk after every page."""
+
+    def __init__(self, path, resume_offset=None):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if resume_offset and os.path.exists(path):
+            self.file = open(path, "r+", newline="", encoding="utf-8")
+            self.file.truncate(resume_offset)  # drop rows written after the last checkpoint
+            self.file.seek(resume_offset)
+        else:
+            self.file = open(path, "w", newline="", encoding="utf-8")
+            csv.writer(self.file).writerow(COLUMNS)
+        self.writer = csv.writer(self.file)
+
+    def write_page(self, reviews):
+        self.writer.writerows([r[c] for c in COLUMNS] for r in reviews)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def output_path(pid, output_dir=OUTPUT_DIR):
+    return os.path.join(output_dir, pid, "raw", "reviews.csv")
+
+
+# === Fetching (Selenium) ===
+
+class PageTimeout(Exception):
+    """No review cards appeared in time (blocked, slow or past the last page)."""
+
+
+def make_driver(headless=True):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    options = Options()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--lang=en-US,en;q=0.9")
+    options.add_argument(f"--user-agent={USER_AGENT}")
+    return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+
+
+def fetch_page(driver, url, timeout=PAGE_TIMEOUT, mode=EXTRACT_MODE):
+    """Load one review page and return (reviews, has_next) with every review expanded."""
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    driver.get(url)
+    try:
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, CARD_SELECTOR)))
+    except TimeoutException:
+        # Not the same as an empty last page: the product is left unfinished so a rerun retries it
+        raise PageTimeout(f"no reviews after {timeout}s: {url}")
+
+    if mode == "js":
+        # Expand + extract in the page: one round trip instead of several per card
+        driver.set_script_timeout(EXPAND_TIMEOUT + 5)
+        return load_extracted(driver.execute_async_script(EXTRACT_SCRIPT, EXPAND_TIMEOUT * 1000))
+
+    # One script call clicks every button instead of one round trip (and sleep) per button
+    selector = f"{CARD_SELECTOR} {READ_MORE_SELECTOR}"
+    driver.execute_script(
+        "document.querySelectorAll(arguments[0]).forEach(b => b.click());", selector)
+    try:
+        WebDriverWait(driver, EXPAND_TIMEOUT).until(
+            lambda d: d.execute_script("return document.querySelectorAll(arguments[0]).length", selector) == 0)
+    except TimeoutException:
+        pass  # some cards have no expandable text; parse what is there
+    return parse_page(driver.page_source)
+
+
+# === Crawl ===
+
+class DriverPool:
+    """One driver per worker thread, created on first use."""
+
+    def __init__(self, headless=True):
+        self.headless = headless
+        self._local = threading.local()
+        self._drivers = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        driver = getattr(self._local, "driver", None)
+        if driver is None:
+            driver = self._local.driver = make_driver(self.headless)
+            with self._lock:
+                self._drivers.append(driver)
+        return driver
+
+    def quit_all(self):
+        for driver in self._drivers:
             try:
-                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", btn)
-                driver.execute_script("arguments[0].click();", btn)
-                time.sleep(0.2)
+                driver.quit()
             except Exception:
-                continue
+                pass
+
+
+def scrape_product(url, fetch, limiter, checkpoint, target_count=TARGET_COUNT, output_dir=OUTPUT_DIR):
+    """Scrape one product from its checkpoint onwards; `fetch(url)` returns (reviews, has_next).
 
-        # Re-fetch elements again after DOM update
-        review_blocks = driver.find_elements(By.CSS_SELECTOR, "div.col.EPCmJX.Ma1fCG")
+    The product is marked done only once the target is reached or a page
+    reports no next page. Errors from `fetch` (e.g. PageTimeout) propagate
+    with the checkpoint at the last finished page.
+    """
+    pid = product_id(url)
+    state = checkpoint.get(pid)
+    if state.get("done"):
+        print(f"[{pid}] already complete ({state.get('reviews', 0)} reviews), skipping.")
+        return pid, state.get("reviews", 0)
 
-        count_this_page = 0
-        for i in range(len(review_blocks)):
-            if len(reviews_data) >= TARGET_COUNT:
+    page = state.get("last_page", 0) + 1
+    count = state.get("reviews", 0)
+    sink = ReviewSink(output_path(pid, output_dir), resume_offset=state.get("offset"))
+    if page > 1:
+        print(f"[{pid}] resuming at page {page} ({count} reviews so far)")
+    done = count >= target_count
+    try:
+        while not done:
+            target = page_url(url, page)
+            limiter.wait(target)
+            started = time.perf_counter()
+            reviews, has_next = fetch(target)
+            elapsed = time.perf_counter() - started
+            reviews = reviews[:target_count - count]
+            if not reviews:
+                if has_next:
+                    print(f"[{pid}] page {page}: no reviews but a next page, stopping (rerun to retry).")
+                else:
+                    print(f"[{pid}] page {page}: no reviews, last page.")
+                done = not has_next
                 break
-            try:
-                block = review_blocks[i]
+            offset = sink.write_page(reviews)
+            count += len(reviews)
+            checkpoint.update(pid, url=url, last_page=page, reviews=count, offset=offset)
+            print(f"[{pid}] page {page}: {len(reviews)} reviews ({count}/{target_count}) in {elapsed:.1f}s")
+            done = count >= target_count or not has_next
+            page += 1
+    finally:
+        sink.close()
+    if done:
+        checkpoint.update(pid, url=url, done=True)
+    return pid, count
 
-                # rating: <div class="XQDdHH ...">5<img ...>
-                try:
-                    rating = block.find_element(By.CSS_SELECTOR, "div.XQDdHH").text.strip()
-                except Exception:
-                    rating = ""
 
-                # title: <p class="z9E0IG">The best in the Range! Go for it...</p>
-                try:
-                    title = block.find_element(By.CSS_SELECTOR, "p.z9E0IG").text.strip()
-                except Exception:
-                    title = ""
+def scrape_products(urls, workers=WORKERS, target_count=TARGET_COUNT, headless=True,
+                    output_dir=OUTPUT_DIR, checkpoint_file=CHECKPOINT_FILE, fetch=None,
+                    extract=EXTRACT_MODE):
+    """Scrape every URL with a bounded worker pool; returns {product_id: review count or error}.
+
+    `fetch(url) -> (reviews, has_next)` replaces the Selenium fetcher, e.g.
+    `lambda url: parse_page(saved_html[url])` to replay saved pages.
+    """
+    limiter = HostRateLimiter()
+    checkpoint = Checkpoint(checkpoint_file)
+    pool = None
+    if fetch is None:
+        pool = DriverPool(headless)
+        fetch = lambda target: fetch_page(pool.get(), target, mode=extract)
 
-                # review text: <div class="ZmyHeo"><div><div class=""> ... </div></div></div>
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {executor.submit(scrape_product, url, fetch, limiter, checkpoint,
+                                       target_count, output_dir): url for url in urls}
+            for future in as_completed(futures):
                 try:
-                    review_el = block.find_element(By.CSS_SELECTOR, "div.ZmyHeo > div > div")
-                    review = (review_el.get_attribute("innerText") or review_el.text).replace("READ MORE", "").strip()
-                except Exception:
-                    review = ""
-
-                if review:
-                    reviews_data.append([rating, title, review])
-                    count_this_page += 1
-            except Exception:
-                continue
+                    pid, count = future.result()
+                    results[pid] = count
+                except Exception as e:  # one broken product must not stop the others
+                    pid = product_id(futures[future])
+                    results[pid] = e
+                    print(f"[{pid}] failed: {e!r} (rerun to resume)")
+    finally:
+        if pool is not None:
+            pool.quit_all()
+    return results
 
-        print(f"Collected {count_this_page} reviews from page {page}.")
 
-        # Navigate to next page
-        try:
-            next_button = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, "//span[text()='Next']"))
-            )
-            driver.execute_script("arguments[0].scrollIntoView();", next_button)
-            driver.execute_script("arguments[0].click();", next_button)
-            page += 1
-            time.sleep(random.uniform(2, 4))  # wait for page load
-        except Exception:
-            print("No more pages found or Next button missing.")
-            break
+def read_urls(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
 
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-    with open(OUTPUT_FILE, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["Rating", "Title", "Review"])
-        writer.writerows(reviews_data)
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape Flipkart product reviews")
+    parser.add_argument("urls", nargs="*", help="product review URLs")
+    parser.add_argument("--urls-file", help="file with one product review URL per line")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="parallel browser workers")
+    parser.add_argument("--max-reviews", type=int, default=TARGET_COUNT, help="reviews per product")
+    parser.add_argument("--headed", action="store_true", help="show the browser windows")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start over")
+    parser.add_argument("--extract", choices=["js", "html"], default=EXTRACT_MODE,
+                        help="js: one in-page extraction script per page; html: parse page_source locally")
+    args = parser.parse_args()
 
-    print(f"\nDone! Scraped {len(reviews_data)} total reviews.")
-    print(f"Saved to {OUTPUT_FILE}")
-    driver.quit()
+    urls = list(args.urls)
+    if args.urls_file:
+        urls += read_urls(args.urls_file)
+    urls = urls or [URL]
+    if args.restart and os.path.exists(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
 
-if __name__ == "__main__":
-    scrape_flipkart_reviews()
+    results = scrape_products(urls, workers=args.workers, target_count=args.max_reviews,
+                              headless=not args.headed, extract=args.extract)
+    print("\nDone!")
+    for pid, result in results.items():
+        status = f"{result} reviews -> {output_path(pid)}" if isinstance(result, int) else f"failed ({result!r})"
+        print(f"  {pid}: {status}")
@@ -1,11 +1,33 @@
 import os
+import sys
+import argparse
 import subprocess
 
-def run_script(script_path):
-    print(f"\nRunning {script_path} ...")
-    os.system(f"python {script_path}")
+from pipeline import STAGES_BY_NAME, SRC_DIR, run_pipeline, run_in_memory
+from products import run_products, product_status
+from analysis.metrics import PROFILE_DIR
 
-def main():
+QA_SCRIPT = os.path.join(SRC_DIR, "analysis", "question_answering.py")
+
+# Menu choice -> pipeline stage
+MENU_STAGES = {
+    "1": "preprocess",
+    "2": "pos_ner",
+    "3": "sentiment",
+    "4": "semantics",
+    "6": "summarization",
+    "8": "topics",
+    "9": "dashboard",
+}
+
+
+def run_interactive_qa():
+    run_pipeline(["qa_index"])  # (re)build the retrieval index only if the reviews changed
+    print(f"\nRunning {QA_SCRIPT} ...")
+    subprocess.run([sys.executable, QA_SCRIPT])
+
+
+def menu():
     while True:
         print("\nProduct Review Analysis Pipeline")
         print("===================================")
@@ -17,29 +39,61 @@ def main():
         print("5️) Interactive QA System")
         print("6️) Summarization")
         print("7️) Run Full Pipeline (All Steps)")
+        print("8️) Topic Modeling (LSA)")
+        print("9️) Dashboard")
         print("0️) Exit")
 
 
         choice = input("\nEnter your choice: ").strip()
 
-        scripts = {
-            "1": "flipkart_product-review-analysis/src/preprocessing/clean_translate.py",
-            "2": "flipkart_product-review-analysis/src/analysis/pos_ner_analysis.py",
-            "3": "flipkart_product-review-analysis/src/analysis/sentiment_analysis.py",
-            "4": "flipkart_product-review-analysis/src/analysis/vector_semantics.py",
-            "5": "flipkart_product-review-analysis/src/analysis/question_answering.py",
-            "6": "flipkart_product-review-analysis/src/summarization/review_summarization.py"
-        }
-
         if choice == "7":
-            for script in list(scripts.values())[:-1]:  # run all except summarization
-                run_script(script)
-            run_script(scripts["6"])  # summarization last
-        elif choice in scripts:
-            run_script(scripts[choice])
+            run_pipeline()  # independent stages run in parallel, up-to-date ones are skipped
+        elif choice == "5":
+            run_interactive_qa()
+        elif choice in MENU_STAGES:
+            # Upstream stages run only if stale; the chosen one always runs
+            run_pipeline([MENU_STAGES[choice]], force=[MENU_STAGES[choice]])
         else:
             print("Exiting...")
-            break 
+            break
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Product review analysis pipeline")
+    parser.add_argument("--run", nargs="*", metavar="STAGE",
+                        help=f"run these stages and their dependencies (default: all); "
+                             f"stages: {', '.join(STAGES_BY_NAME)}")
+    parser.add_argument("--force", action="store_true", help="rerun stages even if up to date")
+    parser.add_argument("--workers", type=int, default=None, help="parallel stage processes")
+    parser.add_argument("--in-process", action="store_true",
+                        help="run all analysis stages in this process, passing data in memory")
+    parser.add_argument("--profile", nargs="?", const=PROFILE_DIR, metavar="DIR",
+                        help="run each stage under cProfile, writing <stage>.prof/.txt to DIR "
+                             "(default: data/processed/profiles)")
+    parser.add_argument("--products", nargs="*", metavar="PRODUCT_ID",
+                        help="analyse product partitions under data/products in parallel "
+                             "(default: all) and write the cross-product rollup")
+    args = parser.parse_args()
+
+    if args.profile:
+        os.environ["PIPELINE_PROFILE"] = os.path.abspath(args.profile)  # read by every stage process
+
+    if args.products is not None:
+        kwargs = {"workers": args.workers} if args.workers else {}
+        reports = run_products(args.products, force=args.force, **kwargs)
+        sys.exit(1 if any(product_status(r) != "ok" for r in reports.values()) else 0)
+
+    if args.in_process:
+        report, _ = run_in_memory()
+        sys.exit(1 if any(status == "failed" for status, _ in report.values()) else 0)
+
+    if args.run is None:
+        menu()
+        return
+    kwargs = {"workers": args.workers} if args.workers else {}
+    report = run_pipeline(args.run or None, force=args.force, **kwargs)
+    if any(status in ("failed", "blocked") for status, _ in report.values()):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
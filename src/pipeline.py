@@ -0,0 +1,439 @@
+"""
+pipeline.py
+-----------
+DAG runner for the analysis pipeline.
+
+Every stage declares the files it reads and writes. Dependencies come from
+those declarations: a stage depends on whichever stage writes one of its
+inputs. Stages whose dependencies are done run concurrently in a process
+pool, so POS/NER, sentiment and the shared TF-IDF feature store build run
+side by side once cleaned_reviews.csv exists, followed by semantics, topics,
+the QA index and summarization, which all load that store. Each worker caps
+the stage's own pools (SENTIMENT_WORKERS, POS_WORKERS) at its share of the
+cores.
+
+Make-style skipping: after a successful run the content hashes of the
+stage's inputs, and of its script plus every module under src/ the script
+imports, are stored in pipeline_state.json. A stage is skipped when those
+hashes are unchanged and its outputs still exist. Each stage's output goes to data/processed/pipeline_logs/<stage>.log.
+
+Every run gets a run ID. Each stage records its total wall/CPU time and peak
+RSS, and its named sub-steps (TF-IDF fit, SVD, KMeans, ...) record theirs,
+to data/processed/metrics.jsonl (see analysis/metrics.py). A per-step summary
+is printed after the timing report. With PIPELINE_PROFILE set (main.py
+--profile), each stage also runs under cProfile.
+"""
+
+import os
+import sys
+import json
+import time
+import ast
+import hashlib
+import runpy
+from contextlib import redirect_stdout, redirect_stderr
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import multiprocessing as mp
+
+from analysis import metrics
+
+# === Paths & Settings ===
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(BASE_DIR, "src")
+DATA_DIR = os.path.join(BASE_DIR, "data")
+PROCESSED_DIR = os.path.join(DATA_DIR, "processed")
+RESULTS_DIR = os.path.join(BASE_DIR, "results")
+STATE_FILE = os.path.join(PROCESSED_DIR, "pipeline_state.json")
+LOG_DIR = os.path.join(PROCESSED_DIR, "pipeline_logs")
+
+PIPELINE_WORKERS = int(os.environ.get("PIPELINE_WORKERS", min(4, os.cpu_count() or 1)))
+
+
+def processed(name):
+    return os.path.join(PROCESSED_DIR, name)
+
+
+@dataclass
+class Stage:
+    name: str
+    script: str
+    inputs: list
+    # Each output is a path, or a tuple of paths of which any one will do
+    outputs: list
+    deps: list = field(default_factory=list)
+
+    @property
+    def script_path(self):
+        return os.path.join(SRC_DIR, self.script)
+
+
+# Tabular artifacts may be stored as Parquet or CSV (see analysis/artifacts.py)
+CLEANED = (processed("cleaned_reviews.parquet"), processed("cleaned_reviews.csv"))
+SENTIMENT = (processed("sentiment_results.parquet"), processed("sentiment_results.csv"))
+# Names the feature store artifact for the current cleaned reviews (see analysis/feature_store.py)
+FEATURES = os.path.join(os.environ.get("FEATURE_STORE_DIR", processed("features")), "current.json")
+
+STAGES = [
+    Stage("preprocess", "preprocessing/clean_translate.py",
+          [os.path.join(DATA_DIR, "raw", "Samsung_washing_machine_reviews.csv")],
+          [CLEANED]),
+    Stage("pos_ner", "analysis/pos_ner_analysis.py",
+          [CLEANED], [processed("pos_counts.csv"), processed("ner_entities.csv")]),
+    Stage("sentiment", "analysis/sentiment_analysis.py",
+          [CLEANED], [SENTIMENT]),
+    Stage("features", "analysis/feature_store.py",
+          [CLEANED], [FEATURES]),
+    Stage("semantics", "analysis/vector_semantics.py",
+          [CLEANED, FEATURES], [processed("word_similarity.csv")]),
+    Stage("topics", "analysis/topic_modeling.py",
+          [CLEANED, FEATURES], [processed("lsa_topics.csv"), processed("lsa_doc_topics.npy")]),
+    Stage("qa_index", "analysis/qa_index.py",
+          [CLEANED, FEATURES], [os.path.join(PROCESSED_DIR, "qa_index", "meta.json")]),
+    Stage("summarization", "summarization/review_summarization.py",
+          [CLEANED, FEATURES], [processed("summary_reviews.csv")]),
+    Stage("dashboard", "visualization/dashboard.py",
+          [SENTIMENT, processed("lsa_topics.csv"), processed("lsa_doc_topics.npy"),
+           processed("word_similarity.csv")],
+          [os.path.join(RESULTS_DIR, "top_topics.png")]),
+]
+
+
+def resolve_dependencies(stages):
+    """Fill in each stage's deps from which stage produces its inputs."""
+    producers = {}
+    for stage in stages:
+        for output in stage.outputs:
+            producers[output] = stage.name
+    for stage in stages:
+        stage.deps = sorted({producers[i] for i in stage.inputs
+                             if i in producers and producers[i] != stage.name})
+    return stages
+
+
+resolve_dependencies(STAGES)
+STAGES_BY_NAME = {stage.name: stage for stage in STAGES}
+
+
+# === Hashing ===
+
+def _existing(path):
+    """The path to use for an output/input spec, or None if nothing exists.
+
+    A tuple names the alternative files of one artifact; the one read_artifact
+    would read is used.
+    """
+    if isinstance(path, tuple):
+        from analysis.artifacts import resolve_artifact
+        return resolve_artifact(path[0])
+    return path if os.path.exists(path) else None
+
+
+def file_hash(path, cache):
+    """sha256 of a file, reusing the cached hash while size and mtime are unchanged."""
+    stat = os.stat(path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    entry = cache.get(path)
+    if entry and entry["stamp"] == stamp:
+        return entry["hash"]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    cache[path] = {"stamp": stamp, "hash": digest.hexdigest()}
+    return cache[path]["hash"]
+
+
+def input_files(spec):
+    """Files holding an input's content; an artifact may span a main file and appended parts."""
+    if isinstance(spec, tuple):
+        from analysis.artifacts import artifact_files
+        return artifact_files(spec[0])
+    return [spec] if os.path.exists(spec) else []
+
+
+def files_hash(paths, cache):
+    """file_hash of a single file, or one hash over several."""
+    if len(paths) == 1:
+        return file_hash(paths[0], cache)
+    return hashlib.sha256("".join(file_hash(p, cache) for p in paths).encode("utf-8")).hexdigest()
+
+
+def local_modules(script_path):
+    """The script plus every module under src/ it imports, directly or indirectly.
+
+    Imports are read from the source (including ones inside functions), and a
+    module name is looked up under src/ and next to the importing file, as the
+    scripts' sys.path setup does.
+    """
+    found, pending = set(), [os.path.abspath(script_path)]
+    while pending:
+        path = pending.pop()
+        if path in found:
+            continue
+        found.add(path)
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                # `from analysis import metrics` imports the module analysis/metrics.py
+                names = [node.module] + [f"{node.module}.{alias.name}" for alias in node.names]
+            else:
+                continue
+            for name in names:
+                for root in (SRC_DIR, os.path.dirname(path)):
+                    candidate = os.path.join(root, *name.split(".")) + ".py"
+                    if os.path.isfile(candidate):
+                        pending.append(candidate)
+    return sorted(found)
+
+
+def code_hash(script_path, cache):
+    """One hash over the script and the local modules it imports."""
+    digest = hashlib.sha256()
+    for path in local_modules(script_path):
+        digest.update(os.path.relpath(path, SRC_DIR).encode("utf-8"))
+        digest.update(file_hash(path, cache).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def input_hashes(stage, cache):
+    hashes = {"code": code_hash(stage.script_path, cache)}
+    for spec in stage.inputs:
+        files = input_files(spec)
+        key = spec if isinstance(spec, str) else "|".join(spec)
+        hashes[key] = files_hash(files, cache) if files else None
+    return hashes
+
+
+def load_state():
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    return {"stages": {}, "hash_cache": {}}
+
+
+def save_state(state):
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    tmp_path = STATE_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, STATE_FILE)
+
+
+def is_up_to_date(stage, hashes, state):
+    recorded = state["stages"].get(stage.name)
+    return (recorded is not None
+            and recorded == hashes
+            and all(_existing(output) for output in stage.outputs))
+
+
+# === Stage execution (runs in a worker process) ===
+
+def init_worker(workers):
+    # Up to `workers` stages run at once, so each stage's own pools get a share of the cores
+    share = str(max(1, (os.cpu_count() or 1) // max(1, workers)))
+    os.environ.setdefault("SENTIMENT_WORKERS", share)
+    os.environ.setdefault("POS_WORKERS", share)
+    os.environ.setdefault("MPLBACKEND", "Agg")  # no GUI windows from worker processes
+
+
+def run_stage(name):
+    """Run one stage's script in this worker, logging its output; returns seconds taken."""
+    stage = STAGES_BY_NAME[name]
+    os.makedirs(LOG_DIR, exist_ok=True)
+    sys.argv = [stage.script_path]
+    metrics.set_stage(name)
+    start = time.perf_counter()
+    with open(os.path.join(LOG_DIR, f"{name}.log"), "w", encoding="utf-8") as log, \
+            redirect_stdout(log), redirect_stderr(log), \
+            metrics.profile(name), metrics.measure("total"):
+        runpy.run_path(stage.script_path, run_name="__main__")
+    return time.perf_counter() - start
+
+
+# === Scheduler ===
+
+def select_stages(targets=None):
+    """`targets` plus everything they depend on, in declaration order."""
+    if not targets:
+        return list(STAGES)
+    unknown = [t for t in targets if t not in STAGES_BY_NAME]
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(unknown)}")
+    wanted, pending = set(), list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(STAGES_BY_NAME[name].deps)
+    return [stage for stage in STAGES if stage.name in wanted]
+
+
+def run_pipeline(targets=None, force=False, workers=PIPELINE_WORKERS):
+    """Run `targets` (default: every stage) and their dependencies; returns {stage: (status, seconds)}."""
+    stages = select_stages(targets)
+    # force=True reruns every selected stage; a list of names reruns just those
+    forced = {stage.name for stage in stages} if force is True else set(force or ())
+    state = load_state()
+    report = {}
+    running = {}  # future -> (stage name, input hashes at submission)
+    run = metrics.new_run()  # inherited by the stage processes
+    wall_start = time.perf_counter()
+
+    # spawn + one task per child: every stage gets a clean interpreter, as before
+    context = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max(1, workers), mp_context=context,
+                             max_tasks_per_child=1, initializer=init_worker,
+                             initargs=(workers,)) as pool:
+        while len(report) < len(stages):
+            submitted = {name for name, _ in running.values()}
+            for stage in stages:
+                if stage.name in report or stage.name in submitted:
+                    continue
+                dep_status = [report.get(dep, ("pending",))[0] for dep in stage.deps]
+                if any(status in ("failed", "blocked") for status in dep_status):
+                    report[stage.name] = ("blocked", 0.0)
+                    print(f"⛔ {stage.name}: blocked by a failed dependency")
+                    continue
+                if any(status == "pending" for status in dep_status):
+                    continue
+                hashes = input_hashes(stage, state["hash_cache"])
+                if stage.name not in forced and is_up_to_date(stage, hashes, state):
+                    report[stage.name] = ("skipped", 0.0)
+                    print(f"⏭  {stage.name}: up to date")
+                    continue
+                print(f"▶  {stage.name}: running")
+                running[pool.submit(run_stage, stage.name)] = (stage.name, hashes)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, hashes = running.pop(future)
+                try:
+                    seconds = future.result()
+                except BaseException as e:  # SystemExit from a script counts as a failure too
+                    report[name] = ("failed", 0.0)
+                    state["stages"].pop(name, None)
+                    print(f"✖  {name}: failed ({type(e).__name__}); see {os.path.join(LOG_DIR, name + '.log')}")
+                else:
+                    report[name] = ("ran", seconds)
+                    state["stages"][name] = hashes
+                    print(f"✔  {name}: done in {seconds:.1f}s")
+                save_state(state)
+
+    save_state(state)
+    print_report(report, stages, time.perf_counter() - wall_start)
+    metrics.print_summary(run)
+    return report
+
+
+# === In-process runner ===
+
+def run_in_memory(df=None):
+    """Run every analysis stage in this process through the stage APIs.
+
+    cleaned_reviews.csv is read once (unless `df` is given) and results are
+    passed to the dashboard in memory; each stage still writes its usual
+    artifacts. Preprocessing is not included. Returns (report, results).
+    """
+    import traceback
+
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+    from analysis import (pos_ner_analysis, sentiment_analysis, vector_semantics,
+                          topic_modeling, qa_index, feature_store)
+    from analysis.topic_index import TopicIndex
+    from analysis.artifacts import read_artifact, REVIEW_TEXT_COLUMNS
+    from summarization import review_summarization
+    from visualization import dashboard
+
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    run = metrics.new_run()
+    wall_start = time.perf_counter()
+    df = read_artifact(CLEANED[1], columns=REVIEW_TEXT_COLUMNS) if df is None else df
+    report, results = {"preprocess": ("skipped", 0.0)}, {}
+
+    def pos_ner():
+        text_col = pos_ner_analysis.text_column(df)
+        reviews = df.dropna(subset=[text_col])[text_col].tolist()
+        pos_ner_analysis.download_resources()
+        pos_counts = pos_ner_analysis.count_pos(reviews)[0]
+        pos_ner_analysis.pos_counts_frame(pos_counts).to_csv(pos_ner_analysis.POS_OUTPUT, index=False)
+        pos_ner_analysis.extract_entities(reviews)
+        return pos_counts
+
+    def sentiment():
+        sentiment_df = sentiment_analysis.analyze_sentiment(df, verbose=False)
+        sentiment_analysis.save_sentiment(sentiment_df)
+        return sentiment_df
+
+    def features():
+        text_col = topic_modeling.text_column(df)
+        return feature_store.build_feature_store(df[text_col].dropna().tolist())
+
+    def semantics():
+        similarity_df = vector_semantics.word_similarity(df, verbose=False)
+        similarity_df.to_csv(vector_semantics.output_path, index=False)
+        return similarity_df
+
+    def topics():
+        fitted = topic_modeling.fit_topics(df, verbose=False)
+        topic_modeling.save_topics(*fitted)
+        return fitted
+
+    def summarization():
+        summary_df = review_summarization.summarize(df, verbose=False)[1]
+        summary_df.to_csv(review_summarization.output_path, index=False)
+        return summary_df
+
+    def build_dashboard():
+        topics_df, review_ids, lsa_topic_matrix = results["topics"]
+        return dashboard.build_dashboard(results["sentiment"], topics_df,
+                                         TopicIndex(review_ids, lsa_topic_matrix), results["semantics"])
+
+    stage_functions = {
+        "pos_ner": pos_ner,
+        "sentiment": sentiment,
+        "features": features,
+        "semantics": semantics,
+        "topics": topics,
+        "qa_index": qa_index.build_qa_index,
+        "summarization": summarization,
+        "dashboard": build_dashboard,
+    }
+    for name, function in stage_functions.items():
+        if any(report[dep][0] in ("failed", "blocked") for dep in STAGES_BY_NAME[name].deps):
+            report[name] = ("blocked", 0.0)
+            print(f"⛔ {name}: blocked by a failed dependency")
+            continue
+        print(f"▶  {name}: running")
+        metrics.set_stage(name)
+        start = time.perf_counter()
+        try:
+            # Peak RSS here is the whole process's, so it only grows from stage to stage
+            with metrics.profile(name), metrics.measure("total", in_process=True):
+                results[name] = function()
+        except Exception:
+            report[name] = ("failed", 0.0)
+            print(f"✖  {name}: failed\n{traceback.format_exc()}")
+            continue
+        report[name] = ("ran", time.perf_counter() - start)
+
+    print_report(report, STAGES, time.perf_counter() - wall_start)
+    metrics.print_summary(run)
+    return report, results
+
+
+def print_report(report, stages, wall_seconds):
+    print("\n=== Pipeline Timing Report ===")
+    print(f"{'stage':<15}{'status':<10}{'seconds':>10}")
+    for stage in stages:
+        status, seconds = report[stage.name]
+        print(f"{stage.name:<15}{status:<10}{seconds:>10.2f}")
+    serial = sum(seconds for _, seconds in report.values())
+    print(f"{'sum of stages':<25}{serial:>10.2f}")
+    print(f"{'wall clock':<25}{wall_seconds:>10.2f}")
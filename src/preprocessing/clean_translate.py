@@ -2,24 +2,53 @@
 clean_translate.py
 ------------------
 Performs:
-1. Language detection
+1. Language detection (tiered: script check first, langdetect only when ambiguous)
 2. Translation (Hindi → English)
 3. Data cleaning (HTML tags, special chars, duplicates)
 4. Normalization (lowercasing, tokenization, stopword removal, lemmatization)
 
+Run with --stream to read the raw CSV in chunks, clean them in a process pool
+and write each finished chunk to the output as a row group (scales with
+cores; memory holds the chunks in flight plus one dedup digest per unique
+review, see preprocess_reviews_streaming):
+    python clean_translate.py --stream --workers 8 --chunksize 1000
+
+Run with --incremental to clean only raw rows not seen before. A sidecar
+manifest (cleaned_reviews.csv.manifest) records the content hash of every raw
+row already processed; new rows are appended to the existing output.
+
+The output is written through analysis/artifacts.py: Parquet by default
+(ARTIFACT_FORMAT=csv for the old format, ARTIFACT_CSV_EXPORT=1 for both).
+
+Time spent in language detection, translation, cleaning and lemmatization is
+summed per step (across workers in --stream mode) and written to the
+metrics file (see analysis/metrics.py) at the end of each run.
+
 """
 
 import os
 import re
+import sys
+import hashlib
+import argparse
+from collections import Counter, deque
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
-from langdetect import detect
-from deep_translator import GoogleTranslator
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
 from nltk import word_tokenize
 from bs4 import BeautifulSoup
 import nltk
 
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(BASE_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+from preprocessing.translation import make_translator
+from preprocessing import language_detection
+from analysis.artifacts import ArtifactWriter, append_artifact, read_artifact, resolve_artifact, write_artifact
+from analysis import metrics
+
 # Download required NLTK data (first run only)
 nltk.download('punkt', quiet=True)
 nltk.download('stopwords', quiet=True)
@@ -27,72 +56,131 @@ nltk.download('wordnet', quiet=True)
 nltk.download('omw-1.4', quiet=True)
 
 # === Paths ===
-RAW_FILE = os.path.join("flipkart_product-review-analysis\data", "raw", "Samsung_washing_machine_reviews.csv")
-OUTPUT_FILE = os.path.join("flipkart_product-review-analysis\data", "processed", "cleaned_reviews.csv")
+RAW_FILE = os.path.join(BASE_DIR, "data", "raw", "Samsung_washing_machine_reviews.csv")
+OUTPUT_FILE = os.path.join(BASE_DIR, "data", "processed", "cleaned_reviews.csv")
+MANIFEST_SUFFIX = ".manifest"
+
+OUTPUT_COLUMNS = ["Rating", "Title", "Original_Review", "Language", "Translated_Review", "Cleaned_Review"]
+
+# Bump when cleaning logic changes, so incremental runs reprocess everything
+PREPROCESS_VERSION = 1
+
+# Rows per batch in preprocess_reviews (Hindi reviews in a batch share one translation cache lookup)
+BATCH_SIZE = 50
 
 # === Initialize tools ===
-translator = GoogleTranslator(source='auto', target='en')
+translator = make_translator()  # cached; TRANSLATION_BACKEND=identity for offline runs
 lemmatizer = WordNetLemmatizer()
 stop_words = set(stopwords.words("english"))
+step_totals = metrics.StepTotals()  # per-process; workers hand theirs back with each chunk
+
+def init_worker():
+    """Build the per-process tools once, so chunks never pay the setup cost."""
+    global translator, lemmatizer, stop_words
+    translator = make_translator()
+    lemmatizer = WordNetLemmatizer()
+    lemmatizer.lemmatize("warmup")  # forces the lazy WordNet load now
+    stop_words = set(stopwords.words("english"))
 
 # === Helper Functions ===
 
 def detect_language(text):
-    try:
-        return detect(text)
-    except:
-        return "unknown"
+    return language_detection.detect_language(text)
 
 def translate_to_english(text, lang):
     if lang == "hi":  # Hindi
-        try:
-            translated = translator.translate(text)
-            return translated
-        except Exception as e:
-            print("⚠️ Translation failed:", e)
-            return text
+        return translator.translate(text)  # falls back to the original text on failure
     else:
         return text
 
-def clean_text(text):
-    # Remove HTML tags
-    text = BeautifulSoup(text, "html.parser").get_text()
+def translate_batch_to_english(texts, langs):
+    """Translate the Hindi entries of `texts` through the cached translator."""
+    hindi = [i for i, lang in enumerate(langs) if lang == "hi"]
+    translated = list(texts)
+    for i, text in zip(hindi, translator.translate_many([texts[i] for i in hindi])):
+        translated[i] = text
+    return translated
+
+# URLs first, then any other non-alphanumeric character; one scan does both
+# because URL alternatives are tried first at every position.
+NOISE_PATTERN = re.compile(r"http\S+|www\S+|https\S+|[^A-Za-z0-9\s]")
+SENTENCE_PUNCT_PATTERN = re.compile(r"[.!?]")
 
-    # Remove URLs
-    text = re.sub(r"http\S+|www\S+|https\S+", "", text, flags=re.MULTILINE)
+def clean_text(text):
+    # Remove HTML tags (only markup or entities need a parse tree)
+    if "<" in text or "&" in text:
+        text = BeautifulSoup(text, "html.parser").get_text()
 
-    # Remove non-alphanumeric characters
-    text = re.sub(r"[^A-Za-z0-9\s]", "", text)
+    # Remove URLs and non-alphanumeric characters, normalize case
+    return NOISE_PATTERN.sub("", text).lower().strip()
 
-    # Normalize case
-    text = text.lower().strip()
-    return text
+@lru_cache(maxsize=100_000)
+def lemmatize(token):
+    # Review vocabulary is very skewed, so most lookups hit the cache
+    return lemmatizer.lemmatize(token)
 
 def preprocess_text(text):
-    tokens = word_tokenize(text)
-    tokens = [t for t in tokens if t not in stop_words]
-    tokens = [lemmatizer.lemmatize(t) for t in tokens]
-    return " ".join(tokens)
+    # Cleaned text has no sentence punctuation, so sentence splitting can be skipped
+    tokens = word_tokenize(text, preserve_line=not SENTENCE_PUNCT_PATTERN.search(text))
+    return " ".join(lemmatize(t) for t in tokens if t not in stop_words)
+
+# === Manifest (content hashes of processed raw rows) ===
+
+def review_hashes(df):
+    """Content hash of each raw row (Rating, Title, Review).
+
+    Values are normalised first, so a row hashes the same whatever dtype
+    pandas inferred for its column: whole-number ratings as integers ("5",
+    not "5.0" once a NaN rating makes the column float) and missing values
+    as "".
+    """
+    cols = [c for c in ["Rating", "Title", "Review"] if c in df.columns]
+    values = df[cols].astype(object)
+    if "Rating" in cols:
+        rating = pd.to_numeric(df["Rating"], errors="coerce")
+        whole = rating.notna() & (rating % 1 == 0)
+        values.loc[whole, "Rating"] = rating[whole].astype("int64")
+    joined = values.where(values.notna(), "").astype(str).agg("\x1f".join, axis=1)
+    return joined.map(lambda text: hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest())
+
+def load_manifest(manifest_file):
+    """Return the set of processed hashes, or None if missing or from another version."""
+    if not os.path.exists(manifest_file):
+        return None
+    with open(manifest_file, encoding="utf-8") as f:
+        if f.readline().strip() != f"# clean_translate v{PREPROCESS_VERSION}":
+            return None
+        return {line.strip() for line in f if line.strip()}
+
+def write_manifest(manifest_file, hashes, append=False):
+    with open(manifest_file, "a" if append else "w", encoding="utf-8") as f:
+        if not append:
+            f.write(f"# clean_translate v{PREPROCESS_VERSION}\n")
+        f.writelines(h + "\n" for h in hashes)
 
 # === Pipeline ===
 
-def preprocess_reviews():
-    print("Loading raw reviews...")
-    df = pd.read_csv(RAW_FILE)
-    print(f"Loaded {len(df)} reviews.")
+def process_reviews(rows):
+    """Clean a batch of raw review rows; returns one record (or None to skip) per row."""
+    reviews = [str(row["Review"]) for row in rows]
+    keep = [isinstance(r, str) and r.strip() != "" for r in reviews]
+    with step_totals.time("language_detection", sum(keep)):
+        langs = [detect_language(r) if ok else None for r, ok in zip(reviews, keep)]
+    with step_totals.time("translation", langs.count("hi")):
+        translations = translate_batch_to_english(reviews, langs)
+    with step_totals.time("cleaning", sum(keep)):
+        cleaned_texts = [clean_text(t) if ok else None for t, ok in zip(translations, keep)]
+    with step_totals.time("lemmatization", sum(keep)):  # tokenize, drop stopwords, lemmatize
+        normalized_texts = [preprocess_text(t) if ok else None for t, ok in zip(cleaned_texts, keep)]
 
-    cleaned_reviews = []
-    for idx, row in df.iterrows():
-        review = str(row["Review"])
-        if not isinstance(review, str) or review.strip() == "":
+    records = []
+    for row, review, ok, lang, translated, normalized in zip(
+            rows, reviews, keep, langs, translations, normalized_texts):
+        if not ok:
+            records.append(None)
             continue
 
-        lang = detect_language(review)
-        translated = translate_to_english(review, lang)
-        cleaned = clean_text(translated)
-        normalized = preprocess_text(cleaned)
-
-        cleaned_reviews.append({
+        records.append({
             "Rating": row.get("Rating", ""),
             "Title": row.get("Title", ""),
             "Original_Review": review,
@@ -100,20 +188,168 @@ def preprocess_reviews():
             "Translated_Review": translated,
             "Cleaned_Review": normalized
         })
+    return records
 
-        if idx % 20 == 0:
-            print(f"Processed {idx} reviews...")
+def preprocess_reviews(raw_file=RAW_FILE, output_file=OUTPUT_FILE):
+    print("Loading raw reviews...")
+    df = pd.read_csv(raw_file)
+    print(f"Loaded {len(df)} reviews.")
+    step_totals.reset()
+
+    rows = df.to_dict("records")
+    cleaned_reviews = []
+    for start in range(0, len(rows), BATCH_SIZE):
+        records = process_reviews(rows[start:start + BATCH_SIZE])
+        cleaned_reviews.extend(r for r in records if r is not None)
+        print(f"Processed {min(start + BATCH_SIZE, len(rows))} reviews...")
 
     df_cleaned = pd.DataFrame(cleaned_reviews)
     df_cleaned.drop_duplicates(subset="Cleaned_Review", inplace=True)
     df_cleaned.dropna(subset=["Cleaned_Review"], inplace=True)
 
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-    df_cleaned.to_csv(OUTPUT_FILE, index=False, encoding="utf-8")
+    written = write_artifact(df_cleaned, output_file)
+    write_manifest(output_file + MANIFEST_SUFFIX, review_hashes(df))
 
     print(f"\nPreprocessing complete!")
-    print(f"Saved cleaned data to {OUTPUT_FILE}")
+    print(f"Saved cleaned data to {written}")
     print(f"Final reviews count: {len(df_cleaned)}")
+    print(language_detection.format_stats())
+    step_totals.record(mode="full")
+
+# === Streaming Pipeline ===
+
+def process_chunk(chunk):
+    """Worker entry point: clean one chunk of raw rows.
+
+    Returns (row hashes, DataFrame, language-detection tier hits, tier
+    seconds, step totals).
+    """
+    language_detection.reset_stats()
+    step_totals.reset()
+    records = process_reviews(chunk.to_dict("records"))
+    hashes = review_hashes(chunk).tolist()
+    df = pd.DataFrame([r for r in records if r is not None], columns=OUTPUT_COLUMNS)
+    return (hashes, df, dict(language_detection.tier_hits), dict(language_detection.tier_seconds),
+            step_totals.as_dict())
+
+def _ordered_results(executor, chunks, max_pending):
+    """Like executor.map, but never holds more than `max_pending` chunks in flight."""
+    pending = deque()
+    for chunk in chunks:
+        pending.append(executor.submit(process_chunk, chunk))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def preprocess_reviews_streaming(raw_file=RAW_FILE, output_file=OUTPUT_FILE, chunksize=1000, workers=None):
+    """Chunked, parallel version of preprocess_reviews with the same output.
+
+    Chunks are written in input order as soon as they are cleaned. Duplicates
+    of Cleaned_Review are dropped across the whole file by keeping an 8-byte
+    digest of every review already written, so memory is not constant: it
+    grows by about 75 bytes per unique review (~75 MB per million) on top of
+    the 2 * workers chunks in flight.
+    """
+    workers = workers or os.cpu_count() or 1
+    print(f"Streaming raw reviews from {raw_file} ({workers} workers, {chunksize} rows/chunk)...")
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+
+    seen = set()
+    total_in = total_out = 0
+    tier_hits, tier_seconds = Counter(), Counter()
+    totals = metrics.StepTotals()
+    manifest_file = output_file + MANIFEST_SUFFIX
+    # The manifest is published together with the output, so an interrupted
+    # run leaves the previous output and manifest untouched
+    manifest_tmp = manifest_file + ".tmp"
+    write_manifest(manifest_tmp, [])
+    chunks = pd.read_csv(raw_file, chunksize=chunksize)
+    # Each cleaned chunk becomes its own row group
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor, \
+            ArtifactWriter(output_file) as out:
+        results = _ordered_results(executor, chunks, max_pending=2 * workers)
+        for hashes, df_chunk, hits, seconds, chunk_totals in results:
+            tier_hits.update(hits)
+            tier_seconds.update(seconds)
+            totals.merge(chunk_totals)
+            df_chunk = df_chunk.dropna(subset=["Cleaned_Review"])
+            digests = df_chunk["Cleaned_Review"].map(
+                lambda text: hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest())
+            keep = ~digests.duplicated() & ~digests.isin(seen)
+            seen.update(digests[keep])
+            df_chunk = df_chunk[keep]
+
+            out.write(df_chunk)
+            write_manifest(manifest_tmp, hashes, append=True)
+            total_in += len(hashes)
+            total_out += len(df_chunk)
+            print(f"Processed {total_in} reviews ({total_out} kept)...")
+        out.close(columns=OUTPUT_COLUMNS)
+    os.replace(manifest_tmp, manifest_file)
+
+    print("\nPreprocessing complete!")
+    print(f"Saved cleaned data to {out.path}")
+    print(f"Final reviews count: {total_out}")
+    print(language_detection.format_stats(tier_hits, tier_seconds))
+    # Summed over workers, so wall time here is worker time, not elapsed time
+    totals.record(mode="stream", workers=workers)
+
+# === Incremental Pipeline ===
+
+def preprocess_reviews_incremental(raw_file=RAW_FILE, output_file=OUTPUT_FILE):
+    """Clean only raw rows whose content hash is not in the manifest yet.
+
+    New rows are added to the existing output; a Cleaned_Review already
+    present there is skipped, matching drop_duplicates on a full run. Changed
+    reviews hash differently and are treated as new rows. Falls back to a
+    full run when the output or manifest is missing or from another version.
+    """
+    manifest_file = output_file + MANIFEST_SUFFIX
+    processed = load_manifest(manifest_file)
+    if processed is None or resolve_artifact(output_file) is None:
+        print("No valid manifest found, running full preprocessing...")
+        return preprocess_reviews(raw_file, output_file)
+
+    print("Loading raw reviews...")
+    df = pd.read_csv(raw_file)
+    hashes = review_hashes(df)
+    new_mask = ~hashes.isin(processed) & ~hashes.duplicated()
+    df_new = df[new_mask]
+    print(f"Loaded {len(df)} reviews, {len(df_new)} new since last run.")
+    if df_new.empty:
+        print("Nothing to do, cleaned data is up to date.")
+        return
+
+    step_totals.reset()
+    records = [r for r in process_reviews(df_new.to_dict("records")) if r is not None]
+    df_cleaned = pd.DataFrame(records, columns=OUTPUT_COLUMNS)
+    df_cleaned.dropna(subset=["Cleaned_Review"], inplace=True)
+    existing = read_artifact(output_file, columns=["Cleaned_Review"])["Cleaned_Review"].dropna()
+    df_cleaned = df_cleaned[~df_cleaned["Cleaned_Review"].isin(set(existing))]
+    df_cleaned = df_cleaned.drop_duplicates(subset="Cleaned_Review")
+
+    written = append_artifact(df_cleaned, output_file)
+    write_manifest(manifest_file, hashes[new_mask], append=True)
+
+    print("\nIncremental preprocessing complete!")
+    print(f"Appended {len(df_cleaned)} cleaned reviews to {written}")
+    print(language_detection.format_stats())
+    step_totals.record(mode="incremental")
 
 if __name__ == "__main__":
-    preprocess_reviews()
+    parser = argparse.ArgumentParser(description="Clean and translate raw reviews")
+    parser.add_argument("--stream", action="store_true", help="chunked, parallel, incremental output")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunksize", type=int, default=1000, help="raw rows per chunk")
+    parser.add_argument("--incremental", action="store_true", help="only clean rows not in the manifest")
+    args = parser.parse_args()
+    if args.incremental and args.stream:
+        parser.error("--incremental cannot be combined with --stream")
+
+    if args.incremental:
+        preprocess_reviews_incremental()
+    elif args.stream:
+        preprocess_reviews_streaming(chunksize=args.chunksize, workers=args.workers)
+    else:
+        preprocess_reviews()
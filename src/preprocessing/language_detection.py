@@ -0,0 +1,98 @@
+"""
+language_detection.py
+---------------------
+Tiered language detection for the preprocessing stage.
+
+1. "empty":      no letters at all                      -> "unknown"
+2. "ascii":      ASCII-only, no romanized-Hindi markers  -> "en"
+3. "devanagari": letters are (almost) all Devanagari     -> "hi"
+4. "full":       everything else (romanized Hindi, mixed script, other
+                 scripts) goes to langdetect, seeded so results are
+                 deterministic across runs.
+
+Per-tier hit counts and time are kept in `tier_hits` / `tier_seconds` so the
+caller can report how much of the corpus skipped the full detector.
+"""
+
+import re
+import time
+from collections import Counter
+from langdetect import detect, DetectorFactory
+
+DetectorFactory.seed = 0  # langdetect is random without a fixed seed
+
+# Share of letters that must be Devanagari to skip the full detector
+DEVANAGARI_THRESHOLD = 0.9
+
+# Frequent romanized-Hindi function words; any of these makes ASCII text ambiguous
+ROMANIZED_HINDI_MARKERS = {
+    "hai", "hain", "nahi", "nahin", "bahut", "bahot", "accha", "acha", "achha",
+    "kya", "kyu", "kyun", "mein", "mai", "hum", "aap", "yeh", "ye", "woh", "wo",
+    "ka", "ki", "ke", "ko", "se", "bhi", "aur", "tha", "thi", "raha", "rahi",
+    "karta", "karti", "kar", "diya", "liya", "hoga", "bilkul", "sahi", "bekar",
+}
+
+_WORD = re.compile(r"[a-z]+")
+_DEVANAGARI = re.compile(r"[\u0900-\u097F]")
+
+tier_hits = Counter()
+tier_seconds = Counter()
+
+
+def _full_detect(text):
+    try:
+        return detect(text)
+    except Exception:
+        return "unknown"
+
+
+def _classify(text):
+    """Return (tier, language) for `text`."""
+    letters = sum(ch.isalpha() for ch in text)
+    if letters == 0:
+        return "empty", "unknown"
+
+    if text.isascii():
+        if ROMANIZED_HINDI_MARKERS.isdisjoint(_WORD.findall(text.lower())):
+            return "ascii", "en"
+        return "full", _full_detect(text)
+
+    if len(_DEVANAGARI.findall(text)) >= DEVANAGARI_THRESHOLD * letters:
+        return "devanagari", "hi"
+
+    return "full", _full_detect(text)
+
+
+def detect_language(text):
+    start = time.perf_counter()
+    tier, lang = _classify(str(text))
+    tier_hits[tier] += 1
+    tier_seconds[tier] += time.perf_counter() - start
+    return lang
+
+
+def reset_stats():
+    tier_hits.clear()
+    tier_seconds.clear()
+
+
+def format_stats(hits=None, seconds=None):
+    """Human-readable per-tier report, with the time saved versus running langdetect on everything."""
+    hits = tier_hits if hits is None else hits
+    seconds = tier_seconds if seconds is None else seconds
+    total = sum(hits.values())
+    if not total:
+        return "Language detection: no reviews."
+
+    lines = ["Language detection tiers:"]
+    for tier in ["empty", "ascii", "devanagari", "full"]:
+        n = hits.get(tier, 0)
+        avg_us = seconds.get(tier, 0.0) / n * 1e6 if n else 0.0
+        lines.append(f"  {tier:<11}{n:>8} ({n / total:6.1%})  avg {avg_us:8.1f} µs")
+
+    if hits.get("full"):
+        full_avg = seconds["full"] / hits["full"]
+        fast = total - hits["full"]
+        fast_time = sum(seconds.get(t, 0.0) for t in ["empty", "ascii", "devanagari"])
+        lines.append(f"  ~{fast * full_avg - fast_time:.2f}s saved versus langdetect on every review")
+    return "\n".join(lines)
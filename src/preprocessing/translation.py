@@ -0,0 +1,174 @@
+"""
+translation.py
+--------------
+Batched, cached translation for the preprocessing stage.
+
+1. TranslationCache: SQLite cache keyed by backend + language pair +
+   normalized text, bounded to `max_entries` rows (least recently used rows
+   are evicted).
+2. Backends: anything with a `name` and translate_batch(texts, source, target).
+   - GoogleBackend:   deep_translator's GoogleTranslator (needs network).
+                      Its translate_batch sends one request per text, so
+                      the saving comes from the cache, not from batching.
+   - IdentityBackend: returns texts unchanged, for tests and offline runs.
+                      Never cached, so offline runs cannot leave untranslated
+                      text behind for the real backend.
+3. BatchTranslator: looks texts up in the cache in one query, sends only the
+   misses to the backend in groups of `batch_size` and stores the results.
+   When a group fails, its texts are retried one by one, so a single bad
+   text does not leave the rest of the group untranslated.
+
+The backend is picked by the TRANSLATION_BACKEND environment variable
+("google" by default, "identity" for offline runs); TRANSLATION_CACHE
+overrides the cache file location.
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import unicodedata
+
+# === Paths & Settings ===
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CACHE_FILE = os.environ.get("TRANSLATION_CACHE", os.path.join(BASE_DIR, "data", "processed", "translation_cache.sqlite"))
+MAX_CACHE_ENTRIES = 200_000
+BATCH_SIZE = 50
+
+
+def normalize_text(text):
+    """Cache key form of a text: NFC, case-folded, whitespace collapsed."""
+    text = unicodedata.normalize("NFC", str(text))
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+# === Cache ===
+
+class TranslationCache:
+    def __init__(self, path=CACHE_FILE, max_entries=MAX_CACHE_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._conn = None
+        self._pid = None
+
+    def _connect(self):
+        # SQLite connections must not cross a fork, so each process opens its own
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " key TEXT PRIMARY KEY, translated TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON translations(last_used)")
+            self._pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def key(text, source, target, backend):
+        raw = f"{backend}\x1f{source}\x1f{target}\x1f{normalize_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys):
+        conn = self._connect()
+        found = {}
+        keys = list(keys)
+        for i in range(0, len(keys), 500):  # stay under SQLite's variable limit
+            part = keys[i:i + 500]
+            marks = ",".join("?" * len(part))
+            found.update(conn.execute(
+                f"SELECT key, translated FROM translations WHERE key IN ({marks})", part))
+        if found:
+            now = time.time()
+            with conn:
+                conn.executemany("UPDATE translations SET last_used = ? WHERE key = ?",
+                                 [(now, k) for k in found])
+        return found
+
+    def put_many(self, items):
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO translations (key, translated, last_used) VALUES (?, ?, ?)",
+                [(k, v, now) for k, v in items])
+            excess = conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM translations WHERE key IN ("
+                    " SELECT key FROM translations ORDER BY last_used LIMIT ?)", (excess,))
+
+
+# === Backends ===
+
+class GoogleBackend:
+    name = "google"
+
+    def translate_batch(self, texts, source, target):
+        from deep_translator import GoogleTranslator
+        return GoogleTranslator(source=source, target=target).translate_batch(list(texts))
+
+
+class IdentityBackend:
+    """Offline stand-in: 'translates' every text to itself."""
+
+    name = "identity"
+    cacheable = False
+
+    def translate_batch(self, texts, source, target):
+        return list(texts)
+
+
+BACKENDS = {"google": GoogleBackend, "identity": IdentityBackend}
+
+
+# === Batched, cached translator ===
+
+class BatchTranslator:
+    def __init__(self, backend, cache=None, batch_size=BATCH_SIZE):
+        self.backend = backend
+        self.cache = cache
+        self.batch_size = batch_size
+
+    def translate_many(self, texts, source="auto", target="en"):
+        """Translate `texts`, returning originals for anything the backend fails on."""
+        texts = [str(t) for t in texts]
+        keys = [TranslationCache.key(t, source, target, self.backend.name) for t in texts]
+        known = self.cache.get_many(set(keys)) if self.cache else {}
+
+        # One backend call per distinct uncached text
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in known and key not in missing:
+                missing[key] = text
+        pending = list(missing.items())
+        for i in range(0, len(pending), self.batch_size):
+            batch = pending[i:i + self.batch_size]
+            results = [(k, out) for (k, _), out in zip(batch, self._translate_batch(batch, source, target)) if out]
+            known.update(results)
+            if self.cache:
+                self.cache.put_many(results)
+
+        return [known.get(key, text) for key, text in zip(keys, texts)]
+
+    def _translate_batch(self, batch, source, target):
+        """Backend results for [(key, text), ...]; None for each text that failed."""
+        try:
+            return self.backend.translate_batch([t for _, t in batch], source, target)
+        except Exception as e:
+            if len(batch) == 1:
+                print("⚠️ Translation failed:", e)
+                return [None]
+        # Retry one by one, so only the texts that fail on their own stay untranslated
+        return [self._translate_batch([item], source, target)[0] for item in batch]
+
+    def translate(self, text, source="auto", target="en"):
+        return self.translate_many([text], source, target)[0]
+
+
+def make_translator(backend=None, cache_path=CACHE_FILE):
+    backend = BACKENDS[backend or os.environ.get("TRANSLATION_BACKEND", "google")]()
+    cache = TranslationCache(cache_path) if getattr(backend, "cacheable", True) else None
+    return BatchTranslator(backend, cache)
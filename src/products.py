@@ -0,0 +1,486 @@
+"""
+products.py
+-----------
+Multi-product mode: one partition per product, analysed in parallel.
+
+Layout (the scraper writes raw/reviews.csv directly):
+
+    data/products/<product_id>/
+        raw/reviews.csv
+        processed/   cleaned_reviews, sentiment_results, lsa_topics.csv,
+                     lsa_doc_topics.npy, summary_reviews.csv, features/, ...
+                     product_state.json (input hashes of each finished stage)
+        results/     dashboard charts
+        pipeline.log
+    data/products/_rollup/
+        sentiment_by_product.csv, topics_by_product.csv,
+        summaries_by_product.csv, product_status.csv
+
+Products are the unit of work: a process pool runs every selected stage of
+one product per task, through the same stage APIs the single-corpus pipeline
+uses. A failing stage only blocks the stages after it in that product, and a
+crashed worker breaks the shared pool, so every product it took down is
+retried once in a process of its own: a product that crashes its worker
+again only fails itself. Stages whose inputs and code are unchanged are skipped, as
+in pipeline.py.
+
+    python src/products.py add data/raw/Samsung_washing_machine_reviews.csv --product-id WMNH7SPNGXDGUKVE
+    python src/products.py run [PRODUCT_ID ...] [--stages ...] [--workers N] [--force]
+    python src/products.py rollup
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import traceback
+from contextlib import redirect_stdout, redirect_stderr
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing as mp
+import pandas as pd
+
+from pipeline import DATA_DIR, SRC_DIR, STAGES_BY_NAME, code_hash, files_hash
+from analysis import metrics
+
+# === Paths & Settings ===
+PRODUCTS_DIR = os.path.join(DATA_DIR, "products")
+PRODUCT_WORKERS = int(os.environ.get("PRODUCT_WORKERS", os.cpu_count() or 1))
+# Workers are recycled after this many products, bounding per-process caches
+PRODUCTS_PER_WORKER = 50
+
+# Stages available per product, in run order; preprocess always runs first
+PRODUCT_STAGES = ["preprocess", "sentiment", "topics", "summarization", "semantics", "pos_ner", "dashboard"]
+DEFAULT_STAGES = ["preprocess", "sentiment", "topics", "summarization", "semantics"]
+STAGE_INPUTS = {
+    "preprocess": ["raw"],
+    "dashboard": ["sentiment", "topics", "doc_topics", "similarity"],
+}
+STAGE_OUTPUTS = {
+    "preprocess": ["cleaned"],
+    "sentiment": ["sentiment"],
+    "topics": ["topics", "doc_topics"],
+    "summarization": ["summary"],
+    "semantics": ["similarity"],
+    "pos_ner": ["pos", "ner"],
+    "dashboard": ["top_topics_png"],
+}
+STAGE_DEPS = {"dashboard": ["preprocess", "sentiment", "topics", "semantics"]}
+
+
+def product_paths(product_id, products_dir=PRODUCTS_DIR):
+    root = os.path.join(products_dir, product_id)
+    processed = os.path.join(root, "processed")
+    results = os.path.join(root, "results")
+    return {
+        "root": root,
+        "processed": processed,
+        "results": results,
+        "raw": os.path.join(root, "raw", "reviews.csv"),
+        "cleaned": os.path.join(processed, "cleaned_reviews.csv"),
+        "sentiment": os.path.join(processed, "sentiment_results.csv"),
+        "topics": os.path.join(processed, "lsa_topics.csv"),
+        "doc_topics": os.path.join(processed, "lsa_doc_topics.npy"),
+        "summary": os.path.join(processed, "summary_reviews.csv"),
+        "similarity": os.path.join(processed, "word_similarity.csv"),
+        "pos": os.path.join(processed, "pos_counts.csv"),
+        "ner": os.path.join(processed, "ner_entities.csv"),
+        "top_topics_png": os.path.join(results, "top_topics.png"),
+        "state": os.path.join(processed, "product_state.json"),
+        "log": os.path.join(root, "pipeline.log"),
+    }
+
+
+def rollup_dir(products_dir=PRODUCTS_DIR):
+    return os.path.join(products_dir, "_rollup")
+
+
+def discover_products(products_dir=PRODUCTS_DIR):
+    """IDs of every partition that has raw reviews."""
+    if not os.path.isdir(products_dir):
+        return []
+    return sorted(name for name in os.listdir(products_dir)
+                  if os.path.exists(product_paths(name, products_dir)["raw"]))
+
+
+def add_product(csv_path, product_id=None, products_dir=PRODUCTS_DIR):
+    """Copy an existing raw review CSV into its product partition; returns the product ID."""
+    if product_id is None:
+        product_id = os.path.splitext(os.path.basename(csv_path))[0].removesuffix("_reviews")
+    raw_path = product_paths(product_id, products_dir)["raw"]
+    os.makedirs(os.path.dirname(raw_path), exist_ok=True)
+    shutil.copyfile(csv_path, raw_path)
+    return product_id
+
+
+def _existing(path):
+    """The file backing `path` (CSV artifacts may be stored as Parquet), or None."""
+    from analysis.artifacts import resolve_artifact
+
+    if path.endswith(".csv"):
+        return resolve_artifact(path)
+    return path if os.path.exists(path) else None
+
+
+def _input_files(path):
+    """Files holding `path`'s content, including parts appended to a Parquet artifact."""
+    from analysis.artifacts import artifact_files
+
+    if path.endswith(".csv"):
+        return artifact_files(path)
+    return [path] if os.path.exists(path) else []
+
+
+# === Per-product stages (run in a worker process) ===
+
+def _cleaned_reviews(paths, loaded):
+    from analysis.artifacts import read_artifact, REVIEW_TEXT_COLUMNS
+
+    if "df" not in loaded:
+        loaded["df"] = read_artifact(paths["cleaned"], columns=REVIEW_TEXT_COLUMNS)
+    return loaded["df"]
+
+
+nlp = None  # spaCy model, loaded once per worker process rather than once per product
+
+
+def load_nlp():
+    global nlp
+    from analysis import pos_ner_analysis
+
+    if nlp is None:
+        nlp = pos_ner_analysis.load_nlp()
+    return nlp
+
+
+def stage_preprocess(paths, loaded):
+    from preprocessing import clean_translate
+
+    # Scraped partitions grow over time, so only new raw rows are cleaned
+    clean_translate.preprocess_reviews_incremental(paths["raw"], paths["cleaned"])
+
+
+def stage_sentiment(paths, loaded):
+    from analysis import sentiment_analysis
+
+    sentiment_df = sentiment_analysis.analyze_sentiment(
+        _cleaned_reviews(paths, loaded), verbose=False,
+        cache_dir=os.path.join(paths["processed"], "sentiment_cache"))
+    sentiment_analysis.save_sentiment(sentiment_df, paths["sentiment"])
+
+
+def stage_topics(paths, loaded):
+    from analysis import topic_modeling
+
+    fitted = topic_modeling.fit_topics(_cleaned_reviews(paths, loaded), verbose=False,
+                                       state_dir=os.path.join(paths["processed"], "lsa_state"))
+    topic_modeling.save_topics(*fitted, processed_dir=paths["processed"])
+
+
+def stage_summarization(paths, loaded):
+    from summarization import review_summarization
+
+    summary_df = review_summarization.summarize(_cleaned_reviews(paths, loaded), verbose=False)[1]
+    summary_df.to_csv(paths["summary"], index=False)
+
+
+def stage_semantics(paths, loaded):
+    from analysis import vector_semantics
+
+    vector_semantics.word_similarity(_cleaned_reviews(paths, loaded), verbose=False) \
+        .to_csv(paths["similarity"], index=False)
+
+
+def stage_pos_ner(paths, loaded):
+    from analysis import pos_ner_analysis
+
+    df = _cleaned_reviews(paths, loaded)
+    text_col = pos_ner_analysis.text_column(df)
+    reviews = df.dropna(subset=[text_col])[text_col].tolist()
+    pos_ner_analysis.download_resources()
+    pos_counts = pos_ner_analysis.count_pos(reviews, workers=1)[0]
+    pos_ner_analysis.pos_counts_frame(pos_counts).to_csv(paths["pos"], index=False)
+    pos_ner_analysis.extract_entities(reviews, paths["ner"], nlp=load_nlp())
+
+
+def stage_dashboard(paths, loaded):
+    from visualization import dashboard
+
+    dashboard.build_dashboard(*dashboard.load_inputs(paths["processed"]), results_dir=paths["results"])
+
+
+STAGE_FUNCTIONS = {
+    "preprocess": stage_preprocess,
+    "sentiment": stage_sentiment,
+    "topics": stage_topics,
+    "summarization": stage_summarization,
+    "semantics": stage_semantics,
+    "pos_ner": stage_pos_ner,
+    "dashboard": stage_dashboard,
+}
+
+
+def stage_hashes(name, paths, cache):
+    """Hashes of the stage's code and inputs, as pipeline.input_hashes records them."""
+    hashes = {"code": code_hash(STAGES_BY_NAME[name].script_path, cache)}
+    for key in STAGE_INPUTS.get(name, ["cleaned"]):
+        files = _input_files(paths[key])
+        hashes[key] = files_hash(files, cache) if files else None
+    return hashes
+
+
+def init_worker():
+    # One product per process at a time: stage-internal pools would only oversubscribe the cores
+    os.environ.setdefault("SENTIMENT_WORKERS", "1")
+    os.environ.setdefault("POS_WORKERS", "1")
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+
+
+def run_product(product_id, stages=DEFAULT_STAGES, force=False, products_dir=PRODUCTS_DIR):
+    """Run the selected stages for one product; returns {stage: (status, seconds)}.
+
+    Never raises for a stage failure: the traceback goes to the product's
+    pipeline.log and the stages depending on it are reported as blocked.
+    """
+    from analysis import feature_store
+
+    paths = product_paths(product_id, products_dir)
+    os.makedirs(paths["processed"], exist_ok=True)
+    # Each product keeps (and prunes) its own TF-IDF store
+    feature_store.set_store_dir(os.path.join(paths["processed"], "features"))
+    state = {"stages": {}, "hash_cache": {}}
+    if os.path.exists(paths["state"]):
+        with open(paths["state"], encoding="utf-8") as f:
+            state = json.load(f)
+
+    report, loaded = {}, {}
+    with open(paths["log"], "w", encoding="utf-8") as log, redirect_stdout(log), redirect_stderr(log):
+        for name in (s for s in PRODUCT_STAGES if s in stages or s == "preprocess"):
+            deps = STAGE_DEPS.get(name, [] if name == "preprocess" else ["preprocess"])
+            if any(report.get(dep, ("skipped",))[0] in ("failed", "blocked") for dep in deps):
+                report[name] = ("blocked", 0.0)
+                continue
+            hashes = stage_hashes(name, paths, state["hash_cache"])
+            if (not force and state["stages"].get(name) == hashes
+                    and all(_existing(paths[key]) for key in STAGE_OUTPUTS[name])):
+                report[name] = ("skipped", 0.0)
+                continue
+            print(f"=== {name} ===")
+            metrics.set_stage(name)
+            start = time.perf_counter()
+            try:
+                with metrics.profile(f"{product_id}.{name}"), metrics.measure("total", product_id=product_id):
+                    STAGE_FUNCTIONS[name](paths, loaded)
+            except Exception:
+                traceback.print_exc()
+                report[name] = ("failed", 0.0)
+                state["stages"].pop(name, None)
+                continue
+            report[name] = ("ran", time.perf_counter() - start)
+            state["stages"][name] = hashes
+
+    tmp_path = paths["state"] + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, paths["state"])
+    return report
+
+
+# === Fan-out ===
+
+def product_status(report):
+    if report is None:
+        return "crashed"
+    return "failed" if any(status in ("failed", "blocked") for status, _ in report.values()) else "ok"
+
+
+def _pool(workers):
+    return ProcessPoolExecutor(max_workers=max(1, workers), mp_context=mp.get_context("spawn"),
+                               initializer=init_worker, max_tasks_per_child=PRODUCTS_PER_WORKER)
+
+
+def run_isolated(product_id, stages=DEFAULT_STAGES, force=False, products_dir=PRODUCTS_DIR):
+    """run_product in a single-use worker process, so a crash only breaks this product's pool."""
+    with _pool(1) as pool:
+        return pool.submit(run_product, product_id, stages, force, products_dir).result()
+
+
+def run_products(product_ids=None, stages=DEFAULT_STAGES, force=False, workers=PRODUCT_WORKERS,
+                 products_dir=PRODUCTS_DIR, rollup=True):
+    """Run every product (default: all partitions) in a process pool; returns {product_id: report}.
+
+    Products caught in a broken pool are retried with run_isolated, up to
+    `workers` at a time. A product whose worker died again has report None.
+    """
+    product_ids = list(product_ids or discover_products(products_dir))
+    unknown = [s for s in stages if s not in STAGE_FUNCTIONS]
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(unknown)}")
+    print(f"Running {len(product_ids)} products with {workers} workers "
+          f"(stages: {', '.join(s for s in PRODUCT_STAGES if s in stages or s == 'preprocess')})")
+
+    reports, crashed = {}, []
+    metrics.new_run()
+    wall_start = time.perf_counter()
+    with _pool(workers) as pool:
+        futures = {pool.submit(run_product, pid, stages, force, products_dir): pid for pid in product_ids}
+        for future in as_completed(futures):
+            pid = futures[future]
+            try:
+                reports[pid] = future.result()
+            except BrokenProcessPool:
+                # The pool is gone for every product still in flight, not just the one that crashed
+                crashed.append(pid)
+                continue
+            except Exception:
+                reports[pid] = None
+            print_product(pid, reports[pid], products_dir)
+
+    if crashed:
+        print(f"A worker crashed; retrying {len(crashed)} products one per process")
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as threads:
+            futures = {threads.submit(run_isolated, pid, stages, force, products_dir): pid for pid in crashed}
+            for future in as_completed(futures):
+                pid = futures[future]
+                try:
+                    reports[pid] = future.result()
+                except Exception:
+                    reports[pid] = None
+                print_product(pid, reports[pid], products_dir)
+
+    wall_seconds = time.perf_counter() - wall_start
+    write_status(reports, products_dir)
+    failed = [pid for pid, report in reports.items() if product_status(report) != "ok"]
+    print(f"\n{len(reports) - len(failed)}/{len(reports)} products ok in {wall_seconds:.1f}s")
+    if rollup:
+        build_rollup(product_ids, products_dir)
+    return reports
+
+
+def print_product(pid, report, products_dir=PRODUCTS_DIR):
+    status = product_status(report)
+    if status == "crashed":
+        print(f"✖  {pid}: worker crashed")
+        return
+    ran = [name for name, (s, _) in report.items() if s == "ran"]
+    seconds = sum(seconds for _, seconds in report.values())
+    if status == "ok":
+        print(f"✔  {pid}: {len(ran)} ran, {len(report) - len(ran)} up to date ({seconds:.1f}s)")
+    else:
+        bad = [name for name, (s, _) in report.items() if s == "failed"]
+        print(f"✖  {pid}: {', '.join(bad)} failed; see {product_paths(pid, products_dir)['log']}")
+
+
+def write_status(reports, products_dir=PRODUCTS_DIR):
+    rows = [{
+        "product_id": pid,
+        "status": product_status(report),
+        "failed_stages": " ".join(n for n, (s, _) in (report or {}).items() if s == "failed"),
+        "seconds": round(sum(seconds for _, seconds in (report or {}).values()), 3),
+    } for pid, report in sorted(reports.items())]
+    os.makedirs(rollup_dir(products_dir), exist_ok=True)
+    pd.DataFrame(rows, columns=["product_id", "status", "failed_stages", "seconds"]).to_csv(
+        os.path.join(rollup_dir(products_dir), "product_status.csv"), index=False)
+
+
+# === Cross-product rollup ===
+
+def sentiment_summary(paths):
+    from analysis.artifacts import read_artifact
+
+    sentiments = read_artifact(paths["sentiment"], columns=["sentiment", "vader_compound"])
+    counts = sentiments["sentiment"].value_counts()
+    row = {"reviews": len(sentiments)}
+    for label in ["Positive", "Neutral", "Negative"]:
+        row[label.lower()] = int(counts.get(label, 0))
+        row[f"{label.lower()}_share"] = counts.get(label, 0) / max(len(sentiments), 1)
+    row["mean_compound"] = sentiments["vader_compound"].mean() if "vader_compound" in sentiments else None
+    ratings = read_artifact(paths["cleaned"], columns=["Rating"])
+    row["mean_rating"] = pd.to_numeric(ratings["Rating"], errors="coerce").mean() if "Rating" in ratings else None
+    return row
+
+
+def topic_summary(paths):
+    from analysis.topic_index import load_topic_index
+
+    topics = pd.read_csv(paths["topics"])
+    counts = load_topic_index(paths["processed"]).topic_counts()
+    total = max(int(counts.sum()), 1)
+    return [{"topic": i + 1, "top_words": ", ".join(topics[col].astype(str).head(5)),
+             "reviews": int(counts[i]), "share": counts[i] / total}
+            for i, col in enumerate(topics.columns)]
+
+
+def build_rollup(product_ids=None, products_dir=PRODUCTS_DIR):
+    """Combine every product's sentiment, topic and summary outputs into one table each.
+
+    Products missing an output (e.g. a failed stage) are left out of that
+    table only. Returns the directory written.
+    """
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+    product_ids = list(product_ids or discover_products(products_dir))
+    sentiment_rows, topic_rows, summary_rows = [], [], []
+    missing = {"sentiment": 0, "topics": 0, "summaries": 0}
+    for pid in product_ids:
+        paths = product_paths(pid, products_dir)
+        try:
+            sentiment_rows.append({"product_id": pid, **sentiment_summary(paths)})
+        except (FileNotFoundError, KeyError):
+            missing["sentiment"] += 1
+        try:
+            topic_rows.extend({"product_id": pid, **row} for row in topic_summary(paths))
+        except (FileNotFoundError, KeyError):
+            missing["topics"] += 1
+        try:
+            summary = pd.read_csv(paths["summary"])
+            summary_rows.extend({"product_id": pid, "cluster": i + 1, "Representative_Review": review}
+                                for i, review in enumerate(summary["Representative_Review"]))
+        except (FileNotFoundError, KeyError):
+            missing["summaries"] += 1
+
+    out_dir = rollup_dir(products_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    tables = {
+        "sentiment_by_product.csv": pd.DataFrame(sentiment_rows),
+        "topics_by_product.csv": pd.DataFrame(topic_rows),
+        "summaries_by_product.csv": pd.DataFrame(summary_rows),
+    }
+    for name, table in tables.items():
+        table.to_csv(os.path.join(out_dir, name), index=False)
+    print(f"Rollup of {len(product_ids)} products saved to {out_dir}")
+    for table, count in missing.items():
+        if count:
+            print(f"  {count} products without {table} outputs")
+    return out_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-product review analysis")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="copy a raw review CSV into its product partition")
+    add.add_argument("csv")
+    add.add_argument("--product-id", help="default: the file name without _reviews.csv")
+    run = commands.add_parser("run", help="analyse products in parallel, then roll up")
+    run.add_argument("product_ids", nargs="*", help="default: every product under data/products")
+    run.add_argument("--stages", nargs="+", default=DEFAULT_STAGES, choices=PRODUCT_STAGES)
+    run.add_argument("--workers", type=int, default=PRODUCT_WORKERS)
+    run.add_argument("--force", action="store_true", help="rerun stages even if up to date")
+    commands.add_parser("rollup", help="rebuild the cross-product tables only")
+    args = parser.parse_args()
+
+    if args.command == "add":
+        print(f"Added {add_product(args.csv, args.product_id)}")
+    elif args.command == "rollup":
+        build_rollup()
+    else:
+        reports = run_products(args.product_ids, args.stages, args.force, args.workers)
+        sys.exit(1 if any(product_status(r) != "ok" for r in reports.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
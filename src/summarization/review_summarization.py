@@ -1,57 +1,141 @@
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.cluster import KMeans
 import numpy as np
 import os
+import sys
 
 # === PATH SETUP ===
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+from analysis.artifacts import read_artifact, REVIEW_TEXT_COLUMNS
+from analysis import metrics
+
 data_path = os.path.join(BASE_DIR, "data", "processed", "cleaned_reviews.csv")
 output_path = os.path.join(BASE_DIR, "data", "processed", "summary_reviews.csv")
 
-print("Loading cleaned reviews...")
-df = pd.read_csv(data_path)
-text_col = "Cleaned_Review" if "Cleaned_Review" in df.columns else "cleaned_text"
-
-# Keep only rows with non-empty reviews
-df_valid = df[df[text_col].notna()].copy()
-reviews = df_valid[text_col].tolist()
-
-# === TF-IDF Representation ===
-print("Converting reviews to TF-IDF vectors...")
-vectorizer = TfidfVectorizer(max_features=2000, stop_words='english')
-tfidf_matrix = vectorizer.fit_transform(reviews)
-
-# === Clustering Similar Reviews ===
-n_clusters = 5  # number of summary clusters
-print(f"Clustering {len(reviews)} reviews into {n_clusters} groups...")
-kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-kmeans.fit(tfidf_matrix)
-
-# Assign cluster labels to only the valid reviews
-df_valid["Cluster"] = kmeans.labels_
-
-# === Find Representative Review (closest to centroid) ===
-print("Extracting representative reviews for each cluster...")
-summary_reviews = []
-
-for i in range(n_clusters):
-    cluster_indices = df_valid[df_valid["Cluster"] == i].index
-    cluster_vectors = tfidf_matrix[df_valid.index.get_indexer(cluster_indices)]
-    centroid = kmeans.cluster_centers_[i].reshape(1, -1)
-    similarities = cosine_similarity(cluster_vectors, centroid).flatten()
-    best_idx = cluster_indices[np.argmax(similarities)]
-    summary_reviews.append(df_valid.loc[best_idx, text_col])
-
-# === Save Results ===
-summary_df = pd.DataFrame({"Representative_Review": summary_reviews})
-summary_df.to_csv(output_path, index=False)
-
-print("\nReview summarization complete!")
-print(f"Saved representative reviews to: {output_path}")
-
-print("\nSummary:")
-for i, review in enumerate(summary_reviews, start=1):
-    print(f"\nCluster {i}:")
-    print(f"→ {review[:250]}...")
+# === Settings ===
+N_CLUSTERS = int(os.environ.get("SUMMARY_N_CLUSTERS", 5))  # number of summary clusters
+# "kmeans": full KMeans on TF-IDF (small corpora)
+# "scalable": MiniBatchKMeans on SVD-reduced vectors; TF-IDF rows are read from the
+#             memory-mapped feature store one batch at a time, so memory is bounded by
+#             the SVD sample (SVD_SAMPLE_SIZE rows) and one batch, plus a label per review
+SUMMARY_MODE = os.environ.get("SUMMARY_MODE", "kmeans")
+SVD_COMPONENTS = 100
+SVD_SAMPLE_SIZE = 50_000  # rows used to fit the SVD basis in scalable mode
+BATCH_SIZE = int(os.environ.get("SUMMARY_BATCH_SIZE", 4096))
+
+def text_column(df):
+    return "Cleaned_Review" if "Cleaned_Review" in df.columns else "cleaned_text"
+
+# === Representative selection (one vectorized pass) ===
+def closest_per_cluster(labels, scores, n_clusters):
+    """Index of the best-scoring (highest) row in each cluster; first row wins ties."""
+    order = np.lexsort((-scores, labels))
+    clusters, first = np.unique(labels[order], return_index=True)
+    best = np.full(n_clusters, -1)
+    best[clusters] = order[first]
+    return best
+
+def cluster_full(tfidf_matrix, n_clusters):
+    from sklearn.cluster import KMeans
+
+    n_clusters = max(1, min(n_clusters, tfidf_matrix.shape[0]))
+    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+    with metrics.measure("kmeans", items=tfidf_matrix.shape[0], mode="kmeans"):
+        labels = kmeans.fit_predict(tfidf_matrix)
+
+    # Cosine similarity of every review to its own centroid
+    centers = kmeans.cluster_centers_
+    dots = np.asarray(tfidf_matrix @ centers.T)[np.arange(len(labels)), labels]
+    row_norms = np.sqrt(np.asarray(tfidf_matrix.multiply(tfidf_matrix).sum(axis=1))).ravel()
+    denom = row_norms * np.linalg.norm(centers, axis=1)[labels]
+    similarities = np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+    return labels, closest_per_cluster(labels, similarities, n_clusters)
+
+def cluster_scalable(tfidf_matrix, n_clusters, batch_size=BATCH_SIZE):
+    """Cluster `tfidf_matrix` (a sparse matrix or feature_store.TfidfRows) batch by batch."""
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.preprocessing import normalize
+
+    n_rows = tfidf_matrix.shape[0]
+    # The first partial_fit needs at least n_clusters rows to initialise centroids
+    n_clusters = max(1, min(n_clusters, n_rows))
+    batch_size = max(batch_size, n_clusters)
+    n_components = max(1, min(SVD_COMPONENTS, tfidf_matrix.shape[1] - 1))
+    rng = np.random.default_rng(42)
+    sample = rng.choice(n_rows, size=min(n_rows, SVD_SAMPLE_SIZE), replace=False)
+    with metrics.measure("svd", items=len(sample), mode="scalable"):
+        svd = TruncatedSVD(n_components=n_components, random_state=42).fit(tfidf_matrix[np.sort(sample)])
+
+    def reduced_batches():
+        for start in range(0, n_rows, batch_size):
+            yield start, normalize(svd.transform(tfidf_matrix[start:start + batch_size]))
+
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size, random_state=42)
+    with metrics.measure("kmeans", items=n_rows, mode="scalable"):
+        for _, batch in reduced_batches():
+            kmeans.partial_fit(batch)
+
+    # Second pass: labels plus distance to own centroid, keeping the running best per cluster
+    labels = np.empty(n_rows, dtype=np.int64)
+    best_idx = np.full(n_clusters, -1)
+    best_dist = np.full(n_clusters, np.inf)
+    for start, batch in reduced_batches():
+        batch_labels = kmeans.predict(batch)
+        dist = np.linalg.norm(batch - kmeans.cluster_centers_[batch_labels], axis=1)
+        labels[start:start + len(batch)] = batch_labels
+        local = closest_per_cluster(batch_labels, -dist, n_clusters)
+        found = local >= 0
+        improved = found & (dist[np.maximum(local, 0)] < best_dist)
+        best_dist[improved] = dist[local[improved]]
+        best_idx[improved] = start + local[improved]
+    return labels, best_idx
+
+# === Stage API ===
+def summarize(df, n_clusters=N_CLUSTERS, mode=SUMMARY_MODE, verbose=True):
+    """Cluster the reviews in `df` and pick one representative per cluster.
+
+    Returns (df_valid, summary_df): the rows with a review plus their Cluster
+    label, and a Representative_Review frame with one row per cluster.
+    """
+    from analysis.feature_store import load_tfidf, load_tfidf_rows
+
+    text_col = text_column(df)
+    # Keep only rows with non-empty reviews
+    df_valid = df[df[text_col].notna()].copy()
+    reviews = df_valid[text_col].tolist()
+
+    # === Clustering Similar Reviews ===
+    if verbose:
+        print(f"Clustering {len(reviews)} reviews into {n_clusters} groups ({mode})...")
+    if mode == "scalable":
+        # TF-IDF rows are read from the store batch by batch, never as one matrix
+        vectorizer, tfidf_rows = load_tfidf_rows(reviews, max_features=2000)
+        labels, best_rows = cluster_scalable(tfidf_rows, n_clusters)
+    else:
+        vectorizer, tfidf_matrix = load_tfidf(reviews, max_features=2000)
+        labels, best_rows = cluster_full(tfidf_matrix, n_clusters)
+    df_valid["Cluster"] = labels
+
+    # === Find Representative Review (closest to centroid) ===
+    summary_reviews = [reviews[i] for i in best_rows if i >= 0]
+    return df_valid, pd.DataFrame({"Representative_Review": summary_reviews})
+
+def main():
+    print("Loading cleaned reviews...")
+    df = read_artifact(data_path, columns=REVIEW_TEXT_COLUMNS)
+    _, summary_df = summarize(df)
+
+    # === Save Results ===
+    summary_df.to_csv(output_path, index=False)
+
+    print("\nReview summarization complete!")
+    print(f"Saved representative reviews to: {output_path}")
+
+    print("\nSummary:")
+    for i, review in enumerate(summary_df["Representative_Review"], start=1):
+        print(f"\nCluster {i}:")
+        print(f"→ {review[:250]}...")
+
+if __name__ == "__main__":
+    main()
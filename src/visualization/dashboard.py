@@ -1,54 +1,75 @@
 import os
+import sys
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 
 # === PATH SETUP ===
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-processed_dir = os.path.join(BASE_DIR, "flipkart_product-review-analysis/data", "processed")
-results_dir = os.path.join(BASE_DIR, "flipkart_product-review-analysis/results")
-os.makedirs(results_dir, exist_ok=True)
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+from analysis.topic_index import load_topic_index
+from analysis.artifacts import read_artifact
+processed_dir = os.path.join(BASE_DIR, "data", "processed")
+results_dir = os.path.join(BASE_DIR, "results")
+
 
 # === LOAD DATASETS ===
-sentiment_path = os.path.join(processed_dir, "sentiment_results.csv")
-topic_path = os.path.join(processed_dir, "lsa_topics.csv")
-similarity_path = os.path.join(processed_dir, "word_similarity.csv")
+def load_inputs(processed_dir=processed_dir):
+    """Return (sentiments, topics, topic_index, similarity) from the processed folder."""
+    sentiment_path = os.path.join(processed_dir, "sentiment_results.csv")
+    topic_path = os.path.join(processed_dir, "lsa_topics.csv")
+    similarity_path = os.path.join(processed_dir, "word_similarity.csv")
 
-print("Loading data for visualization...")
+    # Only the label column is needed, not the review texts and scores
+    sentiments = read_artifact(sentiment_path, columns=["sentiment"])
+    topics = pd.read_csv(topic_path)
+    topic_index = load_topic_index(processed_dir)
+    similarity = pd.read_csv(similarity_path)
+    return sentiments, topics, topic_index, similarity
 
-sentiments = pd.read_csv(sentiment_path)
-topics = pd.read_csv(topic_path)
-similarity = pd.read_csv(similarity_path)
 
 # === SENTIMENT DISTRIBUTION ===
-plt.figure(figsize=(6, 4))
-sns.countplot(x="sentiment", data=sentiments, palette="coolwarm", hue="sentiment", legend=False)
-plt.title("Sentiment Distribution of Reviews")
-plt.xlabel("Sentiment Category")
-plt.ylabel("Review Count")
-plt.tight_layout()
-plt.savefig(os.path.join(results_dir, "sentiment_distribution.png"))
-plt.close()
+def plot_sentiment_distribution(sentiments, results_dir=results_dir):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.figure(figsize=(6, 4))
+    sns.countplot(x="sentiment", data=sentiments, palette="coolwarm", hue="sentiment", legend=False)
+    plt.title("Sentiment Distribution of Reviews")
+    plt.xlabel("Sentiment Category")
+    plt.ylabel("Review Count")
+    plt.tight_layout()
+    plt.savefig(os.path.join(results_dir, "sentiment_distribution.png"))
+    plt.close()
+
 
 # === TOP TOPICS (from LSA) ===
-plt.figure(figsize=(8, 4))
+def plot_topics(topics, topic_index, results_dir=results_dir):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.figure(figsize=(8, 4))
 
-# Combine all Topic columns into a single Series using pd.concat
-topic_columns = [col for col in topics.columns if col.lower().startswith("topic")]
-all_topics = pd.concat([topics[col].astype(str) for col in topic_columns], ignore_index=True)
+    # Reviews per dominant topic, labelled with each topic's top keywords
+    topic_columns = [col for col in topics.columns if col.lower().startswith("topic")]
+    topic_counts = pd.Series(topic_index.topic_counts(), index=[
+        f"{col.replace('_', ' ')}\n({', '.join(topics[col].astype(str).head(3))})" for col in topic_columns
+    ])
 
-topic_counts = all_topics.value_counts().head(5)
+    sns.barplot(x=topic_counts.index, y=topic_counts.values, palette="viridis", hue=topic_counts.index, legend=False)
+    plt.title("Reviews per Dominant Topic (LSA)")
+    plt.xlabel("Topic")
+    plt.ylabel("Review Count")
+    plt.tight_layout()
+    plt.savefig(os.path.join(results_dir, "top_topics.png"))
+    plt.close()
 
-sns.barplot(x=topic_counts.index, y=topic_counts.values, palette="viridis")
-plt.title("Top 5 Topics in Reviews (LSA)")
-plt.xlabel("Topic ID")
-plt.ylabel("Frequency")
-plt.tight_layout()
-plt.savefig(os.path.join(results_dir, "top_topics.png"))
-plt.close()
 
 # === WORD SIMILARITY HEATMAP ===
-if not similarity.empty:
+def plot_similarity(similarity, results_dir=results_dir):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    if similarity.empty:
+        return
     pivot_table = similarity.pivot(index="Target", columns="Similar_Word", values="Cosine_Similarity")
     plt.figure(figsize=(8, 5))
     sns.heatmap(pivot_table, annot=True, cmap="Blues", fmt=".2f")
@@ -57,7 +78,26 @@ if not similarity.empty:
     plt.savefig(os.path.join(results_dir, "word_similarity_heatmap.png"))
     plt.close()
 
-# === COMBINE REPORT SUMMARY ===
-print("\nVisualizations saved in 'results/' folder:")
-for file in os.listdir(results_dir):
-    print("  -", file)
+
+# === Stage API ===
+def build_dashboard(sentiments, topics, topic_index, similarity, results_dir=results_dir):
+    """Render every dashboard chart into `results_dir`; returns the files written there."""
+    os.makedirs(results_dir, exist_ok=True)
+    plot_sentiment_distribution(sentiments, results_dir)
+    plot_topics(topics, topic_index, results_dir)
+    plot_similarity(similarity, results_dir)
+    return sorted(os.listdir(results_dir))
+
+
+def main():
+    print("Loading data for visualization...")
+    files = build_dashboard(*load_inputs())
+
+    # === COMBINE REPORT SUMMARY ===
+    print("\nVisualizations saved in 'results/' folder:")
+    for file in files:
+        print("  -", file)
+
+
+if __name__ == "__main__":
+    main()
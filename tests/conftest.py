@@ -0,0 +1,19 @@
+"""Shared test setup: src/ on the path, and every store or cache the code under test writes kept out of data/."""
+
+import os
+import sys
+import tempfile
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(TESTS_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+
+# Read at import time by the modules under test, so set before any of them is imported
+_scratch = tempfile.mkdtemp(prefix="review-analysis-tests-")
+os.environ["FEATURE_STORE_DIR"] = os.path.join(_scratch, "features")
+os.environ["TRANSLATION_CACHE"] = os.path.join(_scratch, "translation_cache.sqlite")
+os.environ["TRANSLATION_BACKEND"] = "identity"
+os.environ["METRICS"] = "0"
+os.environ["MPLBACKEND"] = "Agg"
+os.environ.setdefault("SENTIMENT_VADER", "0")  # VADER needs the vader_lexicon download; TextBlob does not
+os.environ.setdefault("SENTIMENT_WORKERS", "1")
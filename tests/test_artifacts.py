@@ -0,0 +1,70 @@
+"""Parquet/CSV artifacts: appended part files, compaction and keeping the two formats in step."""
+
+import os
+import warnings
+
+import pandas as pd
+import pytest
+
+from analysis.artifacts import (append_artifact, artifact_files, iter_artifact_batches, parts_dir,
+                                read_artifact, resolve_artifact, write_artifact)
+
+
+def rows(start, stop):
+    return pd.DataFrame({"Rating": range(start, stop), "Cleaned_Review": [f"review {i}" for i in range(start, stop)]})
+
+
+def test_append_writes_part_files_and_readers_see_them(tmp_path):
+    path = str(tmp_path / "cleaned_reviews.csv")
+    main = write_artifact(rows(0, 5), path, fmt="parquet")
+    stat = os.stat(main)
+
+    append_artifact(rows(5, 8), path)
+    append_artifact(rows(8, 10), path)
+    assert os.stat(main).st_mtime_ns == stat.st_mtime_ns  # the main file is not rewritten
+    assert len(artifact_files(path)) == 3
+
+    assert read_artifact(path)["Rating"].tolist() == list(range(10))
+    assert read_artifact(path, columns=["Cleaned_Review"]).columns.tolist() == ["Cleaned_Review"]
+    batches = list(iter_artifact_batches(path, batch_size=4))
+    assert pd.concat(batches)["Rating"].tolist() == list(range(10))
+
+
+def test_parts_are_compacted_and_dropped_by_a_rewrite(tmp_path):
+    path = str(tmp_path / "cleaned_reviews.csv")
+    write_artifact(rows(0, 2), path, fmt="parquet")
+    for i in range(2, 6):
+        append_artifact(rows(i, i + 1), path, max_parts=2)
+    assert len(artifact_files(path)) <= 3
+    assert read_artifact(path)["Rating"].tolist() == list(range(6))
+
+    write_artifact(rows(0, 1), path, fmt="parquet")
+    assert not os.path.exists(parts_dir(path))
+    assert read_artifact(path)["Rating"].tolist() == [0]
+
+
+def test_existing_csv_copy_is_kept_in_step(tmp_path):
+    path = str(tmp_path / "cleaned_reviews.csv")
+    write_artifact(rows(0, 3), path, fmt="csv")
+    write_artifact(rows(0, 4), path, fmt="parquet")
+    assert len(pd.read_csv(path)) == 4
+    append_artifact(rows(4, 6), path)
+    assert pd.read_csv(path)["Rating"].tolist() == list(range(6))
+
+    # Writing CSV removes the Parquet file and its parts instead of leaving them stale
+    write_artifact(rows(0, 1), path, fmt="csv")
+    assert artifact_files(path) == [path]
+
+
+def test_newer_sibling_is_reported(tmp_path):
+    path = str(tmp_path / "cleaned_reviews.csv")
+    main = write_artifact(rows(0, 3), path, fmt="parquet", csv_export=True)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert resolve_artifact(path) == main
+
+    rows(0, 1).to_csv(path, index=False)  # edited outside the artifact API
+    stamp = os.stat(main).st_mtime + 10
+    os.utime(path, (stamp, stamp))
+    with pytest.warns(UserWarning, match="newer"):
+        assert resolve_artifact(path) == main
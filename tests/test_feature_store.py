@@ -0,0 +1,74 @@
+"""The shared TF-IDF store must give exactly what TfidfVectorizer would, at every vocabulary size."""
+
+import os
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from analysis.feature_store import MAX_FEATURES, build_feature_store, load_tfidf, prune_store
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORDS = ["wash", "drum", "noise", "steam", "spin", "dryer", "water", "install", "service", "price",
+         "quality", "motor", "door", "cycle", "heater", "delivery", "display", "wifi", "smell", "rinse"]
+
+
+def bundled_reviews():
+    df = pd.read_csv(os.path.join(BASE_DIR, "data", "processed", "cleaned_reviews.csv"))
+    return df["Cleaned_Review"].dropna().tolist()
+
+
+def synthetic_reviews(n, seed=0):
+    # Few distinct words, so many terms tie on corpus count at the max_features cut-off
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 8))) for _ in range(n)]
+
+
+def assert_same_as_sklearn(reviews, max_features, store_dir):
+    vectorizer, matrix = load_tfidf(reviews, max_features=max_features, store_dir=str(store_dir))
+    expected_vectorizer = TfidfVectorizer(max_features=max_features, stop_words="english")
+    expected = expected_vectorizer.fit_transform(reviews)
+    assert vectorizer.get_feature_names_out().tolist() == expected_vectorizer.get_feature_names_out().tolist()
+    np.testing.assert_allclose(vectorizer.idf_, expected_vectorizer.idf_)
+    np.testing.assert_allclose(matrix.toarray(), expected.toarray(), atol=1e-12)
+    # Transforming new text with the rebuilt vectorizer matches too
+    np.testing.assert_allclose(vectorizer.transform(reviews[:5]).toarray(),
+                               expected_vectorizer.transform(reviews[:5]).toarray(), atol=1e-12)
+
+
+@pytest.mark.parametrize("max_features", [50, 200, 1000, MAX_FEATURES])
+def test_projection_matches_tfidf_vectorizer(tmp_path, max_features):
+    assert_same_as_sklearn(bundled_reviews(), max_features, tmp_path)
+
+
+@pytest.mark.parametrize("max_features", [3, 7, 15, 20])
+def test_projection_with_tied_counts(tmp_path, max_features):
+    assert_same_as_sklearn(synthetic_reviews(300), max_features, tmp_path)
+
+
+def test_full_matrix_is_read_only(tmp_path):
+    reviews = synthetic_reviews(50)
+    _, matrix = load_tfidf(reviews, max_features=MAX_FEATURES, store_dir=str(tmp_path))
+    with pytest.raises(ValueError):
+        matrix.data[0] = 1.0
+
+
+def test_publishing_prunes_least_recently_used(tmp_path):
+    store_dir = str(tmp_path)
+    first = os.path.basename(build_feature_store(synthetic_reviews(40, seed=1), store_dir))
+    second = os.path.basename(build_feature_store(synthetic_reviews(40, seed=2), store_dir))
+    assert sorted(os.listdir(store_dir)) == sorted([first, second])
+
+    build_feature_store(synthetic_reviews(40, seed=1), store_dir)  # reuse marks `first` as used
+    third = os.path.basename(build_feature_store(synthetic_reviews(40, seed=3), store_dir))
+    assert sorted(os.listdir(store_dir)) == sorted([first, third])
+
+
+def test_prune_keeps_current(tmp_path):
+    store_dir = str(tmp_path)
+    names = [os.path.basename(build_feature_store(synthetic_reviews(40, seed=s), store_dir)) for s in range(3)]
+    assert sorted(os.listdir(store_dir)) == sorted(names[1:])
+    assert prune_store(store_dir, keep=0, current=names[2]) == [names[1]]
+    assert os.listdir(store_dir) == [names[2]]
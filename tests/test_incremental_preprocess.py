@@ -0,0 +1,54 @@
+"""Incremental preprocessing must end with the same cleaned reviews as a full run on the same input."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+try:
+    from preprocessing import clean_translate
+except LookupError:  # NLTK corpora (stopwords, wordnet, punkt) not downloaded
+    pytest.skip("NLTK data not available", allow_module_level=True)
+from analysis.artifacts import read_artifact
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def raw():
+    return pd.read_csv(os.path.join(BASE_DIR, "data", "raw", "Samsung_washing_machine_reviews.csv")).head(60)
+
+
+def run_full(df, tmp_path, name):
+    raw_file, output_file = str(tmp_path / f"{name}_raw.csv"), str(tmp_path / f"{name}_cleaned.csv")
+    df.to_csv(raw_file, index=False)
+    clean_translate.preprocess_reviews(raw_file, output_file)
+    return raw_file, output_file
+
+
+def test_incremental_matches_full(raw, tmp_path):
+    raw_file, output_file = run_full(raw.head(40), tmp_path, "incremental")
+    raw.to_csv(raw_file, index=False)
+    clean_translate.preprocess_reviews_incremental(raw_file, output_file)
+
+    _, full_output = run_full(raw, tmp_path, "full")
+    pd.testing.assert_frame_equal(read_artifact(output_file), read_artifact(full_output))
+
+
+def test_rerun_with_no_new_rows_changes_nothing(raw, tmp_path):
+    raw_file, output_file = run_full(raw.head(20), tmp_path, "rerun")
+    before = read_artifact(output_file)
+    clean_translate.preprocess_reviews_incremental(raw_file, output_file)
+    pd.testing.assert_frame_equal(read_artifact(output_file), before)
+
+
+def test_row_hashes_ignore_inferred_dtype(raw):
+    df = raw.head(10).copy()
+    with_missing = pd.concat([df, pd.DataFrame([{"Rating": np.nan, "Title": "x", "Review": "y"}])],
+                             ignore_index=True)
+    assert with_missing["Rating"].dtype == float
+    hashes = clean_translate.review_hashes(with_missing)
+    assert hashes.head(10).tolist() == clean_translate.review_hashes(df).tolist()
+    assert hashes.iloc[10] == clean_translate.review_hashes(
+        pd.DataFrame([{"Rating": None, "Title": "x", "Review": "y"}]).astype(object)).iloc[0]
@@ -0,0 +1,65 @@
+"""Online LSA: folding new reviews in must track a full refit, and an off-topic batch must trigger one."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import online_lsa
+from analysis.online_lsa import align_components, fit_full, reference_components, relative_residual, update
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+N_TOPICS = 5
+
+
+@pytest.fixture(scope="module")
+def reviews():
+    df = pd.read_csv(os.path.join(BASE_DIR, "data", "processed", "cleaned_reviews.csv"))
+    return df["Cleaned_Review"].dropna().tolist()
+
+
+def test_fold_in_tracks_full_fit(reviews, tmp_path):
+    n_initial = int(len(reviews) * 0.7)
+    fit_full(reviews[:n_initial], N_TOPICS, str(tmp_path / "online"))
+    folded, action = update(reviews, N_TOPICS, str(tmp_path / "online"))
+    assert action.startswith("folded in")
+    assert folded["doc_topics"].shape == (len(reviews), N_TOPICS)
+
+    full = fit_full(reviews, N_TOPICS, str(tmp_path / "full"))
+    full_components = reference_components(full, folded["vectorizer"])
+    matrix = folded["vectorizer"].transform(reviews)
+    # The updated basis explains the whole corpus about as well as a refit does
+    assert relative_residual(matrix, folded["components"]) <= relative_residual(matrix, full_components) + 0.02
+    order, _ = align_components(full_components, folded["components"])
+    cosines = np.abs(np.sum(folded["components"] * full_components[order], axis=1))
+    assert cosines.mean() > 0.85
+
+
+def test_reload_serves_saved_weights(reviews, tmp_path):
+    fit_full(reviews[:150], N_TOPICS, str(tmp_path))
+    state, _ = update(reviews, N_TOPICS, str(tmp_path))
+    reloaded = online_lsa.load_state(str(tmp_path))
+    np.testing.assert_array_equal(reloaded["doc_topics"], state["doc_topics"])
+    np.testing.assert_array_equal(online_lsa.transform(reloaded, reviews), state["doc_topics"])
+    assert update(reviews, N_TOPICS, str(tmp_path))[1] == "up to date"
+
+
+def test_off_topic_batch_in_vocabulary_triggers_refit(reviews, tmp_path):
+    state = fit_full(reviews, N_TOPICS, str(tmp_path))
+    assert state["baseline_residual"] > 0.5  # the regime where a relative bound could never fire
+
+    # Reviews made only of known terms that none of the topics loads on
+    terms = state["vectorizer"].get_feature_names_out()
+    weakest = terms[np.argsort(np.abs(state["components"]).max(axis=0))[:40]]
+    shifted = [" ".join(weakest[i:i + 4]) for i in range(0, 40, 4)] * 5
+    assert online_lsa.oov_rate(state["vectorizer"], shifted) == 0.0
+
+    _, action = update(reviews + shifted, N_TOPICS, str(tmp_path), batch_size=len(shifted))
+    assert action == "full fit (drift)"
+
+
+def test_drift_test_uses_headroom():
+    assert not online_lsa.drifted(0.85, 0.82)
+    assert online_lsa.drifted(0.95, 0.82)
+    assert online_lsa.drifted(0.5, 0.2) and not online_lsa.drifted(0.3, 0.2)
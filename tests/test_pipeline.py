@@ -0,0 +1,27 @@
+"""Stage graph and skip hashing of the pipeline runner."""
+
+import os
+
+from pipeline import SRC_DIR, STAGES, STAGES_BY_NAME, code_hash, local_modules
+
+
+def test_feature_store_users_wait_for_features_stage():
+    for name in ("semantics", "topics", "qa_index", "summarization"):
+        assert "features" in STAGES_BY_NAME[name].deps
+        modules = local_modules(STAGES_BY_NAME[name].script_path)
+        assert os.path.join(SRC_DIR, "analysis", "feature_store.py") in modules
+    names = [stage.name for stage in STAGES]
+    assert names.index("features") < names.index("semantics")
+
+
+def test_code_hash_follows_imported_modules(tmp_path):
+    script = tmp_path / "stage.py"
+    helper = tmp_path / "helper.py"
+    script.write_text("def main():\n    import helper\n")
+    helper.write_text("X = 1\n")
+    assert local_modules(str(script)) == sorted([str(helper), str(script)])
+
+    cache = {}
+    before = code_hash(str(script), cache)
+    helper.write_text("X = 22\n")
+    assert code_hash(str(script), cache) != before
@@ -0,0 +1,71 @@
+"""MaxScore retrieval must return the same top-k as scoring every review."""
+
+import os
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.sparse import csc_matrix
+
+from analysis.feature_store import load_tfidf
+from analysis.qa_index import QAIndex
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUESTIONS = [
+    "How is the washing performance?",
+    "Is the machine noisy?",
+    "How is the installation service?",
+    "Is it value for money?",
+    "Does the dryer work well and is the steam wash good?",
+    "good good good",
+    "delivery installation late technician",
+]
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    df = pd.read_csv(os.path.join(BASE_DIR, "data", "processed", "cleaned_reviews.csv"))
+    reviews = df["Cleaned_Review"].dropna().tolist()
+    vectorizer, matrix = load_tfidf(reviews, store_dir=str(tmp_path_factory.mktemp("features")))
+    postings = csc_matrix(matrix)
+    postings.sort_indices()
+    upper_bounds = np.asarray(postings.max(axis=0).todense()).ravel()
+    empty = np.array([], dtype=np.int32)
+    return QAIndex(vectorizer, postings, upper_bounds, reviews, [], empty, empty.astype(np.int8),
+                   np.zeros(len(reviews) + 1, dtype=np.int64))
+
+
+def random_questions(index, n=50, seed=0):
+    rng = random.Random(seed)
+    terms = index.vectorizer.get_feature_names_out().tolist()
+    return [" ".join(rng.choice(terms) for _ in range(rng.randint(1, 6))) for _ in range(n)]
+
+
+def brute_force(index, question):
+    return np.asarray((index.vectorizer.transform([question]) @ index.postings.T).todense()).ravel()
+
+
+@pytest.mark.parametrize("top_n", [1, 3, 10])
+def test_maxscore_matches_brute_force(index, top_n):
+    for question in QUESTIONS + random_questions(index):
+        docs, scores = index.search(question, top_n)
+        all_scores = brute_force(index, question)
+        assert len(docs) == top_n
+        np.testing.assert_allclose(scores, np.sort(all_scores)[::-1][:top_n], atol=1e-12)
+        np.testing.assert_allclose(all_scores[docs], scores, atol=1e-12)
+
+
+def test_batch_matches_single(index):
+    questions = QUESTIONS + random_questions(index, seed=1)
+    for question, (docs, scores) in zip(questions, index.search_batch(questions, 5)):
+        single_docs, single_scores = index.search(question, 5)
+        np.testing.assert_allclose(scores, single_scores, atol=1e-12)
+        assert docs.tolist() == single_docs.tolist()
+
+
+def test_question_without_known_terms_still_gets_reviews(index):
+    docs, scores = index.search("zzzz qqqq", 3)
+    assert docs.tolist() == [len(index.reviews) - 1, len(index.reviews) - 2, len(index.reviews) - 3]
+    assert scores.tolist() == [0.0, 0.0, 0.0]
+    assert index.search_batch(["zzzz qqqq"], 3)[0][0].tolist() == docs.tolist()
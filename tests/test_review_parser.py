@@ -0,0 +1,98 @@
+"""Offline tests for the review page parser and the scraper's crawl loop, run against saved HTML."""
+
+import os
+import sys
+import json
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(TESTS_DIR, "fixtures")
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS_DIR), "src", "data_collection"))
+from review_parser import parse_page, load_extracted, product_id, page_url
+from scrape import Checkpoint, HostRateLimiter, PageTimeout, scrape_product
+
+URL = "https://www.flipkart.com/samsung-washer/product-reviews/itm6c8a617aef39c?pid=WMNH7SPNGXDGUKVE&marketplace=FLIPKART"
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+# === Parser ===
+
+def test_parse_page_reads_every_card_with_text():
+    reviews, has_next = parse_page(fixture("review_page.html"))
+    assert has_next
+    assert reviews == [
+        {"Rating": "5", "Title": "Terrific purchase",
+         "Review": "Washes well and is very quiet.\nSteam mode works great."},
+        {"Rating": "2", "Title": "Not good", "Review": "बहुत शोर करती है"},
+    ]
+
+
+def test_parse_page_last_page_has_no_next():
+    reviews, has_next = parse_page(fixture("review_page_last.html"))
+    assert not has_next
+    assert [r["Title"] for r in reviews] == ["Decent product"]
+
+
+def test_parse_page_without_cards():
+    assert parse_page("<html><body><span>Next</span></body></html>") == ([], True)
+
+
+def test_load_extracted_matches_parse_page():
+    reviews, has_next = parse_page(fixture("review_page.html"))
+    payload = json.dumps({"reviews": reviews, "has_next": has_next})
+    assert load_extracted(payload) == (reviews, has_next)
+
+
+def test_url_helpers():
+    assert product_id(URL) == "WMNH7SPNGXDGUKVE"
+    assert product_id("https://www.flipkart.com/x/product-reviews/itmabc123") == "itmabc123"
+    assert "page=3" in page_url(page_url(URL, 2), 3)
+    assert "page=2" not in page_url(page_url(URL, 2), 3)
+
+
+# === Crawl loop ===
+
+def replay(pages):
+    """fetch() serving saved pages by page number; missing pages time out."""
+    def fetch(url):
+        page = int(url.rsplit("page=", 1)[1].split("&")[0])
+        if page not in pages:
+            raise PageTimeout(url)
+        return parse_page(fixture(pages[page]))
+    return fetch
+
+
+def crawl(tmp_path, pages, target_count=100):
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"))
+    limiter = HostRateLimiter(interval=0, jitter=0)
+    result = scrape_product(URL, replay(pages), limiter, checkpoint, target_count, str(tmp_path))
+    return result, checkpoint.get("WMNH7SPNGXDGUKVE")
+
+
+def test_crawl_stops_at_last_page_and_marks_done(tmp_path):
+    (pid, count), state = crawl(tmp_path, {1: "review_page.html", 2: "review_page_last.html"})
+    assert (pid, count) == ("WMNH7SPNGXDGUKVE", 3)
+    assert state["done"] and state["last_page"] == 2
+
+
+def test_crawl_marks_done_at_target(tmp_path):
+    (_, count), state = crawl(tmp_path, {1: "review_page.html"}, target_count=1)
+    assert count == 1 and state["done"]
+
+
+def test_timeout_leaves_product_resumable(tmp_path):
+    with pytest.raises(PageTimeout):
+        crawl(tmp_path, {1: "review_page.html"})
+    state = Checkpoint(str(tmp_path / "checkpoint.json")).get("WMNH7SPNGXDGUKVE")
+    assert not state.get("done") and state["last_page"] == 1
+
+    # A rerun resumes at the page that timed out
+    (_, count), state = crawl(tmp_path, {2: "review_page_last.html"})
+    assert count == 3 and state["done"]
+    with open(tmp_path / "WMNH7SPNGXDGUKVE" / "raw" / "reviews.csv", encoding="utf-8") as f:
+        assert f.read().count("Decent product") == 1
@@ -0,0 +1,64 @@
+"""The sentiment score cache: hits are never rescored, new scores land in part files, and the cache stays bounded."""
+
+import pandas as pd
+import pytest
+
+from analysis import sentiment_analysis
+from analysis.sentiment_analysis import cache_parts, load_score_cache, score_reviews, score_reviews_cached
+
+REVIEWS = ["great washing machine", "very noisy and bad", "installation was late",
+           "good value for money", "terrible service", "steam wash works well"]
+
+
+def counting_scorer(monkeypatch):
+    scored = []
+
+    def score(reviews, *args, **kwargs):
+        scored.extend(reviews)
+        return score_reviews(reviews, *args, **kwargs)
+    monkeypatch.setattr(sentiment_analysis, "score_reviews", score)
+    return scored
+
+
+def test_hits_are_served_from_cache(tmp_path, monkeypatch):
+    scored = counting_scorer(monkeypatch)
+    first, n_first = score_reviews_cached(REVIEWS + REVIEWS[:2], str(tmp_path))
+    assert n_first == len(REVIEWS) and sorted(scored) == sorted(REVIEWS)
+
+    scored.clear()
+    second, n_second = score_reviews_cached(REVIEWS, str(tmp_path))
+    assert n_second == 0 and scored == []
+    pd.testing.assert_frame_equal(second, first.head(len(REVIEWS)))
+    pd.testing.assert_frame_equal(second, score_reviews(REVIEWS))
+
+
+def test_new_scores_go_to_a_new_part(tmp_path, monkeypatch):
+    scored = counting_scorer(monkeypatch)
+    score_reviews_cached(REVIEWS[:3], str(tmp_path))
+    scores, n_scored = score_reviews_cached(REVIEWS, str(tmp_path))
+    assert n_scored == 3 and sorted(scored[3:]) == sorted(REVIEWS[3:])
+    assert len(cache_parts(str(tmp_path))) == 2
+    assert len(load_score_cache(str(tmp_path))) == len(REVIEWS)
+    pd.testing.assert_frame_equal(scores, score_reviews(REVIEWS))
+
+
+def test_parts_are_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(sentiment_analysis, "MAX_CACHE_PARTS", 2)
+    for review in REVIEWS[:3]:
+        score_reviews_cached([review], str(tmp_path))
+    assert len(cache_parts(str(tmp_path))) == 1
+    assert sorted(load_score_cache(str(tmp_path)).index) == sorted(
+        sentiment_analysis.review_key(r) for r in REVIEWS[:3])
+
+
+@pytest.mark.parametrize("max_entries", [4, 5])
+def test_cache_is_trimmed_to_the_bound(tmp_path, monkeypatch, max_entries):
+    monkeypatch.setattr(sentiment_analysis, "MAX_CACHE_ENTRIES", max_entries)
+    score_reviews_cached(REVIEWS[:3], str(tmp_path))
+    scores, _ = score_reviews_cached(REVIEWS[3:], str(tmp_path))
+    cache = load_score_cache(str(tmp_path))
+    assert len(cache) == max_entries * 4 // 5
+    assert len(cache_parts(str(tmp_path))) == 1
+    # Scores just served are kept before older ones
+    assert {sentiment_analysis.review_key(r) for r in REVIEWS[3:]} <= set(cache.index)
+    pd.testing.assert_frame_equal(scores, score_reviews(REVIEWS[3:]))
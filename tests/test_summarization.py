@@ -0,0 +1,44 @@
+"""Review summarization: the batched (scalable) path and corpora smaller than the cluster count."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.feature_store import load_tfidf, load_tfidf_rows
+from summarization.review_summarization import cluster_scalable, summarize
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def bundled_reviews():
+    df = pd.read_csv(os.path.join(BASE_DIR, "data", "processed", "cleaned_reviews.csv"))
+    return df["Cleaned_Review"].dropna().tolist()
+
+
+def test_store_rows_match_projected_matrix(tmp_path):
+    reviews = bundled_reviews()
+    _, matrix = load_tfidf(reviews, max_features=2000, store_dir=str(tmp_path))
+    _, rows = load_tfidf_rows(reviews, max_features=2000, store_dir=str(tmp_path))
+    assert rows.shape == matrix.shape
+    np.testing.assert_allclose(rows[10:50].toarray(), matrix[10:50].toarray())
+    index = np.array([0, 7, 99])
+    np.testing.assert_allclose(rows[index].toarray(), matrix[index].toarray())
+
+
+def test_scalable_reads_store_in_batches(tmp_path):
+    reviews = bundled_reviews()
+    _, matrix = load_tfidf(reviews, max_features=2000, store_dir=str(tmp_path))
+    _, rows = load_tfidf_rows(reviews, max_features=2000, store_dir=str(tmp_path))
+    labels, best = cluster_scalable(rows, 5, batch_size=64)
+    expected_labels, expected_best = cluster_scalable(matrix, 5, batch_size=64)
+    assert labels.tolist() == expected_labels.tolist() and best.tolist() == expected_best.tolist()
+
+
+@pytest.mark.parametrize("mode", ["kmeans", "scalable"])
+def test_fewer_reviews_than_clusters(mode):
+    df = pd.DataFrame({"Cleaned_Review": ["great wash quality", "noisy spin cycle", "late installation"]})
+    df_valid, summary_df = summarize(df, n_clusters=5, mode=mode, verbose=False)
+    assert len(summary_df) == 3
+    assert sorted(df_valid["Cluster"]) == [0, 1, 2]
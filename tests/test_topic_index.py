@@ -0,0 +1,38 @@
+"""Per-review topic weights: IDs and weights are always read as the pair that was written together."""
+
+import os
+
+import numpy as np
+import pytest
+
+from analysis.topic_index import IDS_FILE, MATRIX_FILE, load_topic_index, save_doc_topics
+
+
+def test_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    ids, weights = np.arange(100, 150), rng.normal(size=(50, 4)).astype(np.float32)
+    save_doc_topics(ids, weights, str(tmp_path))
+    assert os.listdir(tmp_path) == [MATRIX_FILE]
+
+    index = load_topic_index(str(tmp_path))
+    assert index.review_ids.tolist() == ids.tolist()
+    np.testing.assert_array_equal(np.asarray(index.topic_matrix), weights)
+    np.testing.assert_array_equal(index.weights(120), weights[20])
+    assert index.topic_counts().sum() == 50
+
+
+def test_save_removes_ids_file_of_older_layout(tmp_path):
+    np.save(tmp_path / IDS_FILE, np.arange(3))
+    save_doc_topics(np.arange(5), np.ones((5, 2)), str(tmp_path))
+    assert not (tmp_path / IDS_FILE).exists()
+    assert len(load_topic_index(str(tmp_path)).review_ids) == 5
+
+
+def test_older_layout_is_checked(tmp_path):
+    np.save(tmp_path / MATRIX_FILE, np.ones((4, 2), dtype=np.float32))
+    np.save(tmp_path / IDS_FILE, np.arange(4))
+    assert load_topic_index(str(tmp_path)).review_ids.tolist() == [0, 1, 2, 3]
+
+    np.save(tmp_path / IDS_FILE, np.arange(3))
+    with pytest.raises(ValueError, match="rerun the topics stage"):
+        load_topic_index(str(tmp_path))